@@ -1,55 +1,61 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import os
+import tempfile
+from databank import afgeleid, dataset_afwijkingen, dataset_lijnen, dataset_locaties, dataset_periode, dataset_view, gedeelde_dataset, logboek_per_machine, verbind, ververs_dataset, views
+from dataset import nieuwe_staat
+from export import FORMATEN, ROLLUPS, maak_download
+from validatie import MELDINGEN, valideer_werkboek
+from profiel import importeer, start_meting, toon_meting
+from analyse import (bereken_kpis, bezetting_verschil, filter_data, heatmap_bezetting,
+                     product_statistieken, slechtste_dagen)
+from grafieken import maak_boxplot, maak_figuren_apart, maak_figuur_samen, maak_waterval, plot_config
+from schijfcache import onthoud
+from voorspelling import voorspel
+from vergelijking import ALFA, vergelijk
+from omstellingen import machines, matrix, matrix_breed, werk_bij, nieuwe_staat as nieuwe_omstel_staat
+from tabellen import toon_tabel
+from verliezen import percentages, waterval
+
+meting = start_meting()
 
 # 1. Pagina instellingen
 st.set_page_config(page_title="OEE Dashboard", layout="wide")
-
-@st.cache_data
-def load_data():
-    file_path = 'Data Lijnen boven OEE .xlsx'
-    tabbladen = ['2', '11', '24', '25', '29', '31']
-    all_sheets = []
-    
-    try:
-        xls = pd.ExcelFile(file_path)
-        for sheet in tabbladen:
-            if sheet in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name=sheet)
-                df['Lijn'] = str(sheet)
-                df['DD-MM-YY'] = pd.to_datetime(df['DD-MM-YY'], errors='coerce')
-                for col in ['OEE', 'Hoeveelheid', 'Aantal personen']:
-                     if col in df.columns:
-                        if df[col].dtype == 'object':
-                            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
-                        else:
-                            df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                if 'Bandleidster' in df.columns:
-                    df['Bandleidster'] = df['Bandleidster'].astype(str)
-                    
-                all_sheets.append(df)
-        full_df = pd.concat(all_sheets, ignore_index=True)
-        return full_df.dropna(subset=['DD-MM-YY', 'OEE'])
-    except Exception as e:
-        st.error(f"Fout bij laden bestand: {e}")
-        return pd.DataFrame()
-
-df = load_data()
-
-# --- HELPER FUNCTIE VOOR LINEAIRE REGRESSIE ---
-def bereken_lineaire_trend(df_in, x_col, y_col):
-    df_clean = df_in.dropna(subset=[x_col, y_col])
-    if len(df_clean) < 2:
-        return None, None
-    x_dates = df_clean[x_col]
-    x_num = (x_dates - x_dates.min()).dt.days
-    y = df_clean[y_col]
-    z = np.polyfit(x_num, y, 1)
-    p = np.poly1d(z)
-    return x_dates, p(x_num)
+MAX_WATERVALLEN = 6   # meer groepen: kiezen welke naast elkaar
+
+# Eén DuckDB database voor alle sessies; elke sessie haalt alleen de rijen op
+# van de lijnen die hij tekent in plaats van een eigen kopie van het werkboek.
+# De dataset combineert het werkboek met de logboeken en wordt per rerun
+# incrementeel bijgewerkt (ongewijzigde bestanden kosten alleen een stat)
+@st.cache_resource
+def verbinding():
+    return verbind(), nieuwe_staat(), nieuwe_omstel_staat()
+
+try:
+    con, dataset_staat, omstel_staat = verbinding()
+    ververs_dataset(con, dataset_staat)
+    werk_bij(omstel_staat)
+    alle_lijnen = dataset_lijnen(con)
+    lijn_locatie = dataset_locaties(con)
+    periode_van, periode_tot = dataset_periode(con)
+except Exception as e:
+    st.error(f"Fout bij laden bestand: {e}")
+    st.stop()
+
+# Met meerdere locaties in het bronnenregister staat de locatie achter het lijnnummer
+def lijn_label(lijn):
+    return f"{lijn} ({lijn_locatie[lijn]})" if lijn in lijn_locatie else lijn
+
+# Bootstrap/permutatie tabel (vergelijking.py): is een verschil groter dan de ruis?
+def toon_vergelijking(tabel, groep_naam):
+    if tabel.empty:
+        st.caption("Te weinig dagen per groep om te toetsen.")
+        return
+    st.caption(f"Gemiddelde OEE met {100 * (1 - ALFA):.0f}% bootstrap-interval; verschil t.o.v. de grootste groep "
+               "met permutatietoets (p gecorrigeerd voor het aantal vergelijkingen).")
+    st.dataframe(tabel.rename(columns={'groep': groep_naam}).style.format(
+        {'gemiddelde': '{:.1f}', 'ci_onder': '{:.1f}', 'ci_boven': '{:.1f}', 'verschil': '{:+.1f}',
+         'verschil_onder': '{:+.1f}', 'verschil_boven': '{:+.1f}', 'p_waarde': '{:.3f}', 'p_holm': '{:.3f}'}, na_rep='-'),
+        use_container_width=True, hide_index=True)
 
 # --- SIDEBAR NAVIGATIE ---
 st.sidebar.header("Analyse Selectie")
@@ -64,7 +70,8 @@ if analyse_type == "Losse productielijn analyseren":
     st.sidebar.subheader("Instellingen Individueel")
     geselecteerde_lijnen = [st.sidebar.selectbox(
         "Kies een machine lijn", 
-        options=sorted(df['Lijn'].unique())
+        options=alle_lijnen,
+        format_func=lijn_label
     )]
     weergave = st.sidebar.radio("Weergave methode:", ["Samen", "Apart"])
     modus = "Single"
@@ -74,28 +81,40 @@ else:
     st.sidebar.subheader("Instellingen Vergelijking")
     geselecteerde_lijnen = st.sidebar.multiselect(
         "Selecteer lijnen om te vergelijken", 
-        options=sorted(df['Lijn'].unique()),
-        default=[sorted(df['Lijn'].unique())[0], sorted(df['Lijn'].unique())[1]]
+        options=alle_lijnen,
+        default=alle_lijnen[:2],
+        format_func=lijn_label
     )
     weergave = st.sidebar.radio("Weergave methode:", ["Samen", "Apart"])
     modus = "Multi"
     st.title("Vergelijking Productielijnen")
 
+# --- PERIODE ---
+# Met een archief (archief.py) worden alleen de maanden binnen de periode gelezen
+periode = st.sidebar.date_input("Periode", value=(periode_van, periode_tot),
+                                min_value=periode_van, max_value=periode_tot, format="DD-MM-YYYY")
+van, tot = periode if len(periode) == 2 else (periode[0], periode_tot)
+
 # --- DATA BASIS FILTERING ---
-df_lijn_basis = df[df['Lijn'].isin(geselecteerde_lijnen)].sort_values('DD-MM-YY')
+# Eén gedeelde dataset per proces (databank.gedeelde_dataset); deze sessie krijgt een
+# view met de gekozen lijnen en periode, op datum gesorteerd, zonder eigen kopie
+gedeeld = gedeelde_dataset(con, dataset_staat)
+df_lijn_basis = dataset_view(gedeeld, lijnen=geselecteerde_lijnen, van=van, tot=tot)
 
 # ==========================================
 # FILTERS
 # ==========================================
 toon_filters = st.toggle("Filters op Bezetting of Leiding")
 
-df_filtered = df_lijn_basis.copy()
+df_filtered = df_lijn_basis
+echte_namen, echte_aantallen = None, None
 
 if toon_filters:
     st.markdown("##### Selecteer specifieke medewerkers of leidinggevenden")
     f_col1, f_col2 = st.columns(2)
 
     lead_counts = df_lijn_basis['Bandleidster'].value_counts()
+    lead_counts = lead_counts[lead_counts > 0]  # categorieën van andere lijnen overslaan
     lead_options = [f"{naam} ({count}x)" for naam, count in lead_counts.items()]
     lead_map = {f"{naam} ({count}x)": naam for naam, count in lead_counts.items()}
 
@@ -109,13 +128,9 @@ if toon_filters:
     with f_col2:
         gekozen_pers = st.multiselect("Selecteer Bezetting:", options=pers_options, placeholder="Kies bezetting (leeg = alles)")
 
-    if gekozen_leads:
-        echte_namen = [lead_map[x] for x in gekozen_leads]
-        df_filtered = df_filtered[df_filtered['Bandleidster'].isin(echte_namen)]
-    
-    if gekozen_pers:
-        echte_aantallen = [pers_map[x] for x in gekozen_pers]
-        df_filtered = df_filtered[df_filtered['Aantal personen'].isin(echte_aantallen)]
+    echte_namen = [lead_map[x] for x in gekozen_leads]
+    echte_aantallen = [pers_map[x] for x in gekozen_pers]
+    df_filtered = filter_data(df_lijn_basis, bandleidsters=echte_namen, bezetting=echte_aantallen)
 
 # ==========================================
 # KPI DASHBOARD
@@ -125,32 +140,65 @@ if not df_filtered.empty:
     st.markdown("### Key Performance Indicators")
     kpi1, kpi2, kpi3, kpi4 = st.columns(4)
     
-    avg_oee = df_filtered['OEE'].mean()
-    total_prod = df_filtered['Hoeveelheid'].sum()
-    max_oee = df_filtered['OEE'].max()
+    kpis = bereken_kpis(df_filtered)
+    best_day_str = kpis['beste_dag'].strftime('%d-%m') if kpis['beste_dag'] is not None else "-"
     
-    if pd.notna(max_oee):
-        best_day_row = df_filtered.loc[df_filtered['OEE'].idxmax()]
-        best_day_str = best_day_row['DD-MM-YY'].strftime('%d-%m')
-    else:
-        best_day_str = "-"
-    
-    kpi1.metric("Gemiddelde OEE", f"{avg_oee:.1f}%", delta_color="normal")
-    kpi2.metric("Totale Productie", f"{total_prod:,.0f}".replace(",", "."), "Stuks")
-    kpi3.metric("Hoogste Piek", f"{max_oee:.1f}%", f"op {best_day_str}")
-    kpi4.metric("Dagen in Selectie", len(df_filtered), "Records")
+    kpi1.metric("Gemiddelde OEE", f"{kpis['gem_oee']:.1f}%", delta_color="normal")
+    kpi2.metric("Totale Productie", f"{kpis['totale_productie']:,.0f}".replace(",", "."), "Stuks")
+    kpi3.metric("Hoogste Piek", f"{kpis['max_oee']:.1f}%", f"op {best_day_str}")
+    kpi4.metric("Dagen in Selectie", kpis['dagen'], "Records")
 else:
     st.warning("Geen data gevonden met deze combinatie van filters.")
 
 # --- RUWE DATA ---
 with st.expander("📂 Bekijk data tabel"):
-    st.dataframe(df_filtered, use_container_width=True)
+    # Per pagina: alleen de zichtbare rijen gaan naar de browser
+    toon_tabel(df_filtered, 'data_tabel', use_container_width=True)
+
+# --- DATAKWALITEIT ---
+# Eén gevectoriseerde controle over de opgehaalde lijnen, getoond voor de huidige selectie
+problemen = valideer_werkboek(df_lijn_basis)
+problemen = problemen[problemen['rij'].isin(df_filtered.index)]
+if not problemen.empty:
+    with st.expander(f"🩺 Datakwaliteit ({len(problemen)} meldingen)"):
+        st.dataframe(problemen.assign(melding=problemen['regel'].map(MELDINGEN)), use_container_width=True, hide_index=True)
+
+# --- AFWIJKENDE DIENSTEN ---
+# Gescoord over de hele historie (afwijkingen.py), hier alleen de huidige selectie
+df_afwijkingen = filter_data(dataset_afwijkingen(con, dataset_staat), lijnen=geselecteerde_lijnen,
+                             bandleidsters=echte_namen, bezetting=echte_aantallen, van=van, tot=tot)
+if not df_afwijkingen.empty:
+    with st.expander(f"🚨 Afwijkende diensten ({len(df_afwijkingen)})"):
+        st.dataframe(df_afwijkingen.style.format({'OEE': '{:.1f}%', 'Hoeveelheid': '{:.0f}', 'Score': '{:.1f}'}),
+                     use_container_width=True, hide_index=True)
+
+# --- LOGBOEKEN ---
+# Dagtotalen uit de OEE invoer (OEE.py / rodepet.py) voor dezelfde lijnen, geaggregeerd in DuckDB
+if 'logboek' in views(con):
+    with st.expander("📒 Logboeken (dagelijkse invoer)"):
+        st.dataframe(logboek_per_machine(con, lijnen=geselecteerde_lijnen, van=van, tot=tot).to_pandas(), use_container_width=True, hide_index=True)
+
+# --- EXPORT ---
+with st.expander("📤 Exporteer selectie"):
+    e_col1, e_col2 = st.columns(2)
+    with e_col1:
+        export_formaat = st.radio("Formaat:", list(FORMATEN), format_func=FORMATEN.get, horizontal=True)
+    with e_col2:
+        export_rollups = st.multiselect("Rollups toevoegen:", list(ROLLUPS), placeholder="Alleen de rijen")
+
+    if st.button("Maak exportbestand", disabled=df_filtered.empty):
+        # Het bestand wordt in blokken op schijf geschreven; na het klaarzetten
+        # van de download ruimt de tijdelijke map zichzelf op
+        with tempfile.TemporaryDirectory() as tmp_map:
+            pad, mime = maak_download(df_filtered, export_formaat, export_rollups, tmp_map)
+            with open(pad, 'rb') as f:
+                st.download_button("⬇️ Download export", f, file_name=os.path.basename(pad), mime=mime)
 
 # ==========================================
 # GRAFIEK INSTELLINGEN
 # ==========================================
 st.markdown("#### Grafiek Instellingen")
-c1, c2, c3 = st.columns(3)
+c1, c2, c3, c4 = st.columns(4)
 with c1:
     # AANGEPASTE KNOP: Weekgemiddelde
     toon_week_gem = st.toggle("Weekgemiddelde", value=False)
@@ -158,15 +206,24 @@ with c2:
     toon_linear = st.toggle("Lineaire Trend", value=True)
 with c3:
     toon_gemiddelde = st.toggle("Totaal Gemiddelde")
-
-kleuren_palet = ['#1f77b4', '#9467bd', '#2ca02c', '#d62728', '#8c564b', '#e377c2']
-hover_cols_basis = ['Bandleidster', 'Product', 'Aantal personen']
-
-plot_config = {
-    'displayModeBar': True,
-    'displaylogo': False,
-    'toImageButtonOptions': {'format': 'png', 'filename': 'oee_export', 'height': 800, 'width': 1200, 'scale': 2}
-}
+with c4:
+    toon_afwijkingen = st.toggle("Afwijkingen markeren", value=True)
+markeer = df_afwijkingen if toon_afwijkingen else None
+
+vc1, vc2 = st.columns([1, 2])
+with vc1:
+    toon_voorspelling = st.toggle("Voorspelling", value=False)
+with vc2:
+    horizon = st.slider("Weken vooruit", min_value=2, max_value=8, value=4, disabled=not toon_voorspelling)
+
+# Voorspelling op de volledige historie van de gekozen lijnen (niet alleen de periode);
+# per dataversie in de schijfcache, gewijzigde reeksen starten vanaf de vorige fit
+df_voorspelling = None
+if toon_voorspelling and geselecteerde_lijnen:
+    df_historie = dataset_view(gedeeld, lijnen=geselecteerde_lijnen)
+    voorspel_staat = dataset_staat.setdefault('voorspelling', {})
+    df_voorspelling = onthoud(lambda d, h: voorspel(d, horizon=h, staat=voorspel_staat), df_historie, horizon,
+                              cache_naam='dashboard:voorspelling')
 
 # ==========================================
 # PLOTTING LOGICA
@@ -175,152 +232,15 @@ if not df_filtered.empty:
     
     # --- SAMEN WEERGAVE ---
     if weergave == "Samen":
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        for i, lijn_naam in enumerate(geselecteerde_lijnen):
-            lijn_data = df_filtered[df_filtered['Lijn'] == lijn_naam]
-            if lijn_data.empty: continue
-
-            if modus == "Single":
-                c_oee, c_qty = '#1f77b4', 'orange'
-                c_trend_week = 'red' 
-                c_trend_linear = 'darkred'
-            else:
-                c = kleuren_palet[i % len(kleuren_palet)]
-                c_oee, c_qty = c, c
-                c_trend_week = c
-                c_trend_linear = c
-
-            custom_data_oee = lijn_data[hover_cols_basis + ['Hoeveelheid']]
-            
-            # 1. Ruwe Data OEE
-            fig.add_trace(go.Scatter(
-                x=lijn_data['DD-MM-YY'], y=lijn_data['OEE'], name=f"Lijn {lijn_naam} OEE",
-                mode='lines+markers', customdata=custom_data_oee,
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>OEE: %{{y:.2f}}%<br>Hoeveelheid: %{{customdata[3]}}<br>Lid: %{{customdata[0]}}<extra></extra>",
-                opacity=0.5 if (toon_linear or toon_week_gem) else 1,
-                line=dict(color=c_oee, width=3)
-            ), secondary_y=False)
-
-            # 2. Ruwe Data Hoeveelheid
-            fig.add_trace(go.Scatter(
-                x=lijn_data['DD-MM-YY'], y=lijn_data['Hoeveelheid'], name=f"Lijn {lijn_naam} H",
-                mode='lines',
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Hoeveelheid: %{{y}}<extra></extra>",
-                line=dict(color=c_qty, width=1.5, dash='dot')
-            ), secondary_y=True)
-
-            # 3. WEEKGEMIDDELDE (GroupBy Year+Week)
-            if toon_week_gem:
-                # We groeperen op Jaar en Weeknummer om weekgemiddeldes te berekenen
-                # 'transform' zorgt dat dit gemiddelde voor elke dag in die week wordt ingevuld
-                t_oee = lijn_data.groupby([lijn_data['DD-MM-YY'].dt.isocalendar().year, 
-                                           lijn_data['DD-MM-YY'].dt.isocalendar().week])['OEE'].transform('mean')
-                
-                fig.add_trace(go.Scatter(
-                    x=lijn_data['DD-MM-YY'], y=t_oee, name=f"Weekgem. {lijn_naam}",
-                    # shape='hv' kan ook voor trapjes, maar standaard lijn verbindt de weken mooier
-                    line=dict(color=c_trend_week, width=2, dash='solid'), 
-                    hoverinfo='skip'
-                ), secondary_y=False)
-
-            # 4. LINEAR REGRESSION
-            if toon_linear and len(lijn_data) > 1:
-                tx, ty = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'OEE')
-                if tx is not None:
-                    fig.add_trace(go.Scatter(
-                        x=tx, y=ty, name=f"Trend {lijn_naam}",
-                        line=dict(color=c_trend_linear, width=4, dash='longdash'), 
-                        opacity=0.9, hoverinfo='skip'
-                    ), secondary_y=False)
-
-        if toon_gemiddelde:
-            fig.add_hline(y=df_filtered['OEE'].mean(), line_color="black", annotation_text="Gem. OEE")
-
-        fig.update_layout(height=600, hovermode="x unified", legend=dict(orientation="h", y=1.02, x=1, xanchor="right"))
-        fig.update_yaxes(title_text="OEE (%)", secondary_y=False, range=[0, 105])
-        fig.update_yaxes(title_text="Hoeveelheid (G)", secondary_y=True)
+        # Figuren komen uit de gedeelde schijfcache (sleutel = selectie + instellingen)
+        fig = onthoud(maak_figuur_samen, df_filtered, geselecteerde_lijnen, modus, toon_week_gem, toon_linear, toon_gemiddelde,
+                      afwijkingen=markeer, voorspelling=df_voorspelling)
         st.plotly_chart(fig, use_container_width=True, config=plot_config)
 
     # --- APART WEERGAVE ---
     else:
-        fig_oee = go.Figure()
-        fig_qty = go.Figure()
-
-        for i, lijn_naam in enumerate(geselecteerde_lijnen):
-            lijn_data = df_filtered[df_filtered['Lijn'] == lijn_naam]
-            if lijn_data.empty: continue
-
-            if modus == "Single":
-                c_oee, c_qty = '#1f77b4', 'orange'
-                c_trend_linear_oee = 'red'
-                c_trend_linear_qty = 'darkorange'
-            else:
-                c = kleuren_palet[i % len(kleuren_palet)]
-                c_oee, c_qty = c, c
-                c_trend_linear_oee = c
-                c_trend_linear_qty = c
-
-            cd_oee = lijn_data[hover_cols_basis + ['Hoeveelheid']]
-            cd_qty = lijn_data[hover_cols_basis + ['OEE']]
-
-            # 1. Ruwe Plots
-            fig_oee.add_trace(go.Scatter(
-                x=lijn_data['DD-MM-YY'], y=lijn_data['OEE'], name=f"Lijn {lijn_naam}",
-                mode='lines+markers', customdata=cd_oee,
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>OEE: %{{y:.2f}}%<br><b>Hoeveelheid: %{{customdata[3]}}</b><br>Lid: %{{customdata[0]}}<extra></extra>",
-                opacity=0.4 if (toon_linear or toon_week_gem) else 1,
-                line=dict(color=c_oee, width=3)
-            ))
-
-            fig_qty.add_trace(go.Scatter(
-                x=lijn_data['DD-MM-YY'], y=lijn_data['Hoeveelheid'], name=f"Lijn {lijn_naam}",
-                mode='lines', customdata=cd_qty,
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>Hoeveelheid: %{{y}}<br><b>OEE: %{{customdata[3]:.2f}}%</b><br>Product: %{{customdata[1]}}<extra></extra>",
-                opacity=0.4 if (toon_linear or toon_week_gem) else 1,
-                line=dict(color=c_qty, width=2),
-            ))
-
-            # 2. WEEKGEMIDDELDE (GroupBy Year+Week)
-            if toon_week_gem:
-                # OEE
-                t_oee = lijn_data.groupby([lijn_data['DD-MM-YY'].dt.isocalendar().year, 
-                                           lijn_data['DD-MM-YY'].dt.isocalendar().week])['OEE'].transform('mean')
-                fig_oee.add_trace(go.Scatter(x=lijn_data['DD-MM-YY'], y=t_oee, name=f"Weekgem. {lijn_naam}",
-                                             line=dict(color=c_oee, width=2, dash='solid'), hoverinfo='skip'))
-                # Qty
-                t_qty = lijn_data.groupby([lijn_data['DD-MM-YY'].dt.isocalendar().year, 
-                                           lijn_data['DD-MM-YY'].dt.isocalendar().week])['Hoeveelheid'].transform('mean')
-                fig_qty.add_trace(go.Scatter(x=lijn_data['DD-MM-YY'], y=t_qty, name=f"Weekgem. {lijn_naam}",
-                                             line=dict(color=c_qty, width=2, dash='solid'), hoverinfo='skip'))
-
-            # 3. LINEAR REGRESSION
-            if toon_linear and len(lijn_data) > 1:
-                # OEE Trend
-                tx_oee, ty_oee = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'OEE')
-                if tx_oee is not None:
-                    fig_oee.add_trace(go.Scatter(
-                        x=tx_oee, y=ty_oee, name=f"Trend {lijn_naam}",
-                        line=dict(color=c_trend_linear_oee, width=4, dash='longdash'), 
-                        opacity=1, hoverinfo='skip'
-                    ))
-                
-                # Hoeveelheid Trend
-                tx_qty, ty_qty = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'Hoeveelheid')
-                if tx_qty is not None:
-                    fig_qty.add_trace(go.Scatter(
-                        x=tx_qty, y=ty_qty, name=f"Trend {lijn_naam}",
-                        line=dict(color=c_trend_linear_qty, width=4, dash='longdash'),
-                        opacity=1, hoverinfo='skip'
-                    ))
-
-        if toon_gemiddelde:
-            fig_oee.add_hline(y=df_filtered['OEE'].mean(), line_color="green", line_dash="dash", annotation_text="Gem. OEE")
-            fig_qty.add_hline(y=df_filtered['Hoeveelheid'].mean(), line_color="green", line_dash="dash", annotation_text="Gem. H")
-
-        fig_oee.update_layout(title="OEE Percentage (%)", height=400, hovermode="x unified", legend=dict(orientation="h", y=1.1, x=1, xanchor="right"), yaxis=dict(range=[0, 105]))
-        fig_qty.update_layout(title="Hoeveelheid (G)", height=400, hovermode="x unified", legend=dict(orientation="h", y=1.1, x=1, xanchor="right"))
-
+        fig_oee, fig_qty = onthoud(maak_figuren_apart, df_filtered, geselecteerde_lijnen, modus, toon_week_gem, toon_linear,
+                                   toon_gemiddelde, afwijkingen=markeer, voorspelling=df_voorspelling)
         st.plotly_chart(fig_oee, use_container_width=True, config=plot_config)
         st.plotly_chart(fig_qty, use_container_width=True, config=plot_config)
 
@@ -328,35 +248,32 @@ if not df_filtered.empty:
     # BOXPLOT ANALYSE (Onder de lijngrafieken)
     # ==========================================
     st.markdown("### Spreiding OEE")
+    st.plotly_chart(onthoud(maak_boxplot, df_filtered, geselecteerde_lijnen), use_container_width=True, config=plot_config)
 
-    fig_box = go.Figure()
-
-    for lijn_naam in geselecteerde_lijnen:
-        lijn_data_box = df_filtered[df_filtered['Lijn'] == lijn_naam]
-        
-        if not lijn_data_box.empty:
-            fig_box.add_trace(go.Box(
-                y=lijn_data_box['OEE'],
-                name=f"Lijn {lijn_naam}",
-                boxpoints='all',      # Toont alle individuele datapunten naast de box
-                jitter=0.3,           # Verspreidt de punten een beetje voor leesbaarheid
-                pointpos=-1.8,        # Positie van de punten t.o.v. de box
-                marker_color=kleuren_palet[geselecteerde_lijnen.index(lijn_naam) % len(kleuren_palet)],
-                boxmean='sd'          # Toont ook het gemiddelde en de standaarddeviatie (stippellijn)
-            ))
-
-    fig_box.update_layout(
-        height=500,
-        yaxis_title="OEE (%)",
-        showlegend=False,
-        # Pas hier ook de rasters toe voor consistentie
-        yaxis=dict(showgrid=True, gridwidth=1, gridcolor='LightGrey'),
-        xaxis=dict(showgrid=False)
-    )
+    if modus == "Multi" and len(geselecteerde_lijnen) > 1:
+        with st.expander("📊 Zijn de verschillen tussen de lijnen significant?"):
+            toon_vergelijking(onthoud(vergelijk, df_filtered, 'Lijn'), 'Lijn')
 
-    st.plotly_chart(fig_box, use_container_width=True, config=plot_config)
-
-    import plotly.express as px
+    # ==========================================
+    # VERLIESBOOM IN MINUTEN (verliezen.py)
+    # ==========================================
+    st.markdown("### Waar gaat de tijd heen?")
+    per = st.radio("Uitsplitsen per:", ["Selectie", "Lijn", "Maand", "Week"], horizontal=True, key="verlies_per")
+    verlies_tabel = onthoud(waterval, df_filtered, None if per == "Selectie" else per)
+    if verlies_tabel.empty:
+        st.caption("Geen diensten met tijden in deze selectie; alleen de dagelijkse invoer (OEE.py / rodepet.py) "
+                   "heeft diensttijd, stilstand en normsnelheid.")
+    else:
+        verlies_groepen = list(verlies_tabel.index)
+        if len(verlies_groepen) > MAX_WATERVALLEN:
+            verlies_groepen = st.multiselect("Toon:", verlies_groepen, default=verlies_groepen[-MAX_WATERVALLEN:],
+                                             format_func=lambda g: f"{g:%d-%m-%Y}" if hasattr(g, 'strftime') else str(g))
+        st.caption(f"{int(verlies_tabel['Diensten'].sum())} van {len(df_filtered)} diensten hebben tijden. "
+                   "OEE hier = effectieve tijd / geplande tijd over de opgetelde minuten.")
+        st.plotly_chart(maak_waterval(verlies_tabel, verlies_groepen), use_container_width=True, config=plot_config)
+        with st.expander("📋 Verliezen als % van de diensttijd"):
+            st.dataframe(percentages(verlies_tabel).assign(Diensten=verlies_tabel['Diensten'], OEE=verlies_tabel['OEE'])
+                         .style.format('{:.1f}', na_rep='-').format({'Diensten': '{:.0f}'}), use_container_width=True)
 
 # ==========================================
 # PLOTTING LOGICA
@@ -382,17 +299,18 @@ if not df_filtered.empty:
 
     # OPTIE 3: Alleen de verkennende analyses
     elif analyse_type == "Overig verkennende analyse":
+        # plotly.express (en via trendline="ols" ook statsmodels) alleen voor deze analyses
+        px = importeer('plotly.express')
         
         # --- 1. SCATTER PLOT ---
         st.markdown("---")
         st.subheader("Efficiency: Hoeveelheid vs. OEE")
         df_scatter = df_filtered.dropna(subset=['Aantal personen'])
-        df_scatter['size_display'] = df_scatter['Aantal personen'].apply(lambda x: max(x, 1))
 
         if not df_scatter.empty:
             fig_scatter = px.scatter(
                 df_scatter, x="Hoeveelheid", y="OEE", color="Bandleidster",
-                size="size_display", hover_data=["Product", "DD-MM-YY", "Aantal personen"],
+                size=afgeleid(gedeeld, 'Bezetting (min. 1)', df_scatter).rename("size_display"), hover_data=["Product", "DD-MM-YY", "Aantal personen"],
                 color_discrete_sequence=px.colors.qualitative.Safe,
                 labels={"Hoeveelheid": "Geproduceerde Hoeveelheid", "OEE": "OEE %", "size_display": "Bezetting"}
             )
@@ -400,7 +318,7 @@ if not df_filtered.empty:
 
         # --- 2. HEATMAP ---
             st.subheader("Heatmap: Optimale Bezetting per Lijn")
-            heatmap_data = df_filtered.groupby(['Lijn', 'Aantal personen'])['OEE'].mean().reset_index()
+            heatmap_data = heatmap_bezetting(df_filtered)
             
             fig_heat = px.density_heatmap(
                 heatmap_data, 
@@ -419,17 +337,16 @@ if not df_filtered.empty:
 
             st.plotly_chart(fig_heat, use_container_width=True)
 
+            with st.expander("📊 Bezetting per lijn: verschil met de meest gebruikte bezetting"):
+                toon_vergelijking(onthoud(vergelijk, df_filtered, 'Aantal personen', binnen='Lijn'), 'Aantal personen')
+            with st.expander("📊 Bandleiders per lijn: verschil met de vaakst ingeroosterde bandleider"):
+                toon_vergelijking(onthoud(vergelijk, df_filtered, 'Bandleidster', binnen='Lijn'), 'Bandleidster')
+
 # --- 3. BAR CHART ---
         st.subheader("Product Analyse: Gemiddelde OEE")
         
-        # We groeperen op Product en berekenen zowel het gemiddelde als de frequentie
-        product_stats = df_filtered.groupby('Product')['OEE'].agg(['mean', 'count']).reset_index()
-        
-        # We hernoemen de kolommen voor de duidelijkheid
-        product_stats.columns = ['Product', 'Gemiddelde_OEE', 'Frequentie']
-        
-        # Sorteren op OEE
-        product_stats = product_stats.sort_values(by='Gemiddelde_OEE', ascending=True)
+        # Gemiddelde OEE en frequentie per product, gesorteerd op OEE
+        product_stats = product_statistieken(df_filtered)
 
         fig_prod = px.bar(
             product_stats, 
@@ -451,16 +368,14 @@ if not df_filtered.empty:
 # --- 5. ANALYSE: Bezetting t.o.v. Gemiddelde vs. OEE ---
         st.subheader("Impact van de bezetting-afwijking op OEE")
 
-        # Stap 1: Bereken het gemiddelde aantal personen per lijn
-        df_mean_pers = df_filtered.groupby('Lijn')['Aantal personen'].transform('mean')
-        
-        # Stap 2: Bereken de afwijking (verschil)
-        df_filtered['Bezetting_Verschil'] = df_filtered['Aantal personen'] - df_mean_pers
+        # Stap 1 & 2: Afwijking t.o.v. het gemiddelde aantal personen per lijn
+        # als losse reeks naast de view, niet als kolom erin (de view blijft gedeeld)
+        bezetting_afwijking = bezetting_verschil(df_filtered).rename('Bezetting_Verschil')
 
         # Stap 3: Maak de plot
         fig_impact = px.scatter(
             df_filtered,
-            x='Bezetting_Verschil',
+            x=bezetting_afwijking,
             y='OEE',
             color='Lijn',
             trendline="ols", # Voegt een trendlijn toe om de correlatie te zien
@@ -488,7 +403,27 @@ if not df_filtered.empty:
 
 # ----- 4. PARETO TABEL ---
         st.subheader("Top 5 Laagste OEE")
-        worst_days = df_filtered.sort_values('OEE', ascending=True).head(5)
+        worst_days = slechtste_dagen(df_filtered, 5)
         st.table(worst_days[['DD-MM-YY', 'Lijn', 'OEE', 'Product', 'Bandleidster', 'Hoeveelheid']].style.format({
             'OEE': '{:.2f}%', 'Hoeveelheid': '{:.0f}'
-        }))
\ No newline at end of file
+        }))
+
+# --- OMSTELTIJDEN ---
+        # Van product -> naar product per machine, over de hele historie van de logboeken (omstellingen.py)
+        omstel_lijnen = [l for l in geselecteerde_lijnen if l in machines(omstel_staat)]
+        if omstel_lijnen:
+            st.subheader("Omsteltijden: van product naar product")
+            omstel_lijn = st.selectbox("Machine:", omstel_lijnen, format_func=lijn_label)
+            omstel_tabel = matrix(omstel_staat, omstel_lijn)
+            omstel_breed = matrix_breed(omstel_tabel)
+            if omstel_tabel['Gemeten'].any():
+                fig_omstel = px.imshow(omstel_breed, color_continuous_scale='RdYlGn_r', text_auto='.0f', aspect='auto',
+                                       labels={'x': 'Naar product', 'y': 'Van product', 'color': 'Mediaan (min)'})
+                st.plotly_chart(fig_omstel, use_container_width=True)
+            else:
+                st.caption("Voor deze machine zijn nog geen ombouw- en schoonmaaktijden vastgelegd; alleen het aantal wissels.")
+            st.dataframe(omstel_tabel.style.format(
+                {'Gemiddelde': '{:.0f}', 'P50': '{:.0f}', 'P90': '{:.0f}', 'Max': '{:.0f}', 'Totaal': '{:.0f}'}, na_rep='-'),
+                use_container_width=True, hide_index=True)
+
+toon_meting(meting)
@@ -1,7 +1,9 @@
 import streamlit as st
-import pandas as pd
 import os
 from datetime import datetime
+from profiel import importeer, start_meting, toon_meting
+
+meting = start_meting()
 
 # --- CONFIGURATIE ---
 DATA_FILE = 'hegron_oee_logboek_v6.csv'  
@@ -47,6 +49,25 @@ if pagina == "OEE data invoeren":
     with col4:
         aantal_mensen = st.number_input("Aantal Mensen", min_value=1, value=5, key=f"mensen_{rt}")
 
+    # Product uit de catalogus (catalogus.py): het getypte begin wordt genormaliseerd
+    # ('INP112' -> '112') en op de server in de prefix-boom opgezocht; een nieuw nummer mag
+    # ook. De catalogus (en pandas) pas laden als er iets getypt is. Buiten het formulier,
+    # zodat de normsnelheid direct voorgevuld wordt
+    prod_nummer, norm_voorstel = "", None
+    product_tekst = st.text_input("Product Nummer (Optioneel)", key=f"prodnr_{rt}",
+                                  placeholder="Typ het (begin van het) nummer, bijv. INP1120573")
+    if product_tekst.strip():
+        catalogus = importeer('catalogus')
+        cat = catalogus.laad_catalogus()
+        keuzes = catalogus.suggesties(cat, product_tekst, mach_nr)
+        if keuzes:
+            prod_nummer = st.selectbox("Product", keuzes, format_func=lambda p: catalogus.label(cat, p),
+                                       key=f"prodkeuze_{rt}_{product_tekst}")
+        norm_voorstel = catalogus.normsnelheid(cat, prod_nummer, mach_nr)
+        if prod_nummer and prod_nummer not in cat['diensten']:
+            bekend = catalogus.vergelijkbaar(cat, prod_nummer)
+            st.caption(f"Nieuw product. Bedoelt u: {', '.join(bekend)}?" if bekend else "Nieuw product.")
+
     st.divider()
 
     # --- HET VASTE FORMULIER ---
@@ -56,8 +77,13 @@ if pagina == "OEE data invoeren":
         st.subheader("2. Productie & Tijd")
         c1, c2, c3 = st.columns(3)
         with c1:
-            prod_nummer = st.text_input("Product Nummer (Optioneel)", value="", key=f"prodnr_{rt}")
-            norm_snelheid = st.number_input("Norm Snelheid (stuks/minuut) *", min_value=0.0, value=0.0, key=f"snelheid_{rt}")
+            # Het product in de key: bij een ander product wordt de geleerde norm opnieuw voorgevuld
+            norm_snelheid = st.number_input("Norm Snelheid (stuks/minuut) *", min_value=0.0,
+                                            value=float(norm_voorstel['snelheid']) if norm_voorstel else 0.0,
+                                            key=f"snelheid_{rt}_{prod_nummer}")
+            if norm_voorstel:
+                st.caption(f"Voorgevuld: {'gemeten' if norm_voorstel['bron'] == 'gemeten' else 'ingevoerde'} "
+                           f"snelheid uit {norm_voorstel['diensten']} diensten.")
         with c2:
             dienst_tijd = st.number_input("Totale Diensttijd (minuten) *", value=525, key=f"dienst_{rt}")
             pauze = st.number_input("Geplande Pauze (minuten) *", value=45, key=f"pauze_{rt}")
@@ -166,28 +192,55 @@ if pagina == "OEE data invoeren":
                 "Stilstand Divers": [stop_divers], "Opmerking": [opmerking_dag]
             }
             
+            pd = importeer('pandas')
             df_save = pd.DataFrame(nieuwe_regel)
-            if not os.path.isfile(DATA_FILE):
-                df_save.to_csv(DATA_FILE, index=False, sep=";")
+
+            # Dezelfde controles als het logboek-overzicht (negatieve minuten, stilstand
+            # groter dan geplande tijd, ...). Alleen fouten blokkeren het opslaan.
+            validatie = importeer('validatie')
+            data = importeer('data')
+            regel_fouten = validatie.valideer_logboek(data.pas_schema_toe(df_save.copy(), data.SCHEMA_LOGBOEK))
+            regel_fouten = regel_fouten[regel_fouten['ernst'] == validatie.FOUT]
+
+            if not regel_fouten.empty:
+                for regel, kolom, waarde in regel_fouten[['regel', 'kolom', 'waarde']].itertuples(index=False):
+                    st.error(f"⚠️ {validatie.MELDINGEN[regel]} ({kolom}: {waarde})")
+                st.warning("De gegevens zijn NIET opgeslagen. Corrigeer de fouten hierboven.")
             else:
-                df_save.to_csv(DATA_FILE, mode='a', header=False, index=False, sep=";")
+                if not os.path.isfile(DATA_FILE):
+                    df_save.to_csv(DATA_FILE, index=False, sep=";")
+                else:
+                    df_save.to_csv(DATA_FILE, mode='a', header=False, index=False, sep=";")
+
+                # Meldingsregels (regels.json) op de achtergrond langs de nieuwe regel (zie meldingen.py)
+                importeer('meldingen').controleer_op_achtergrond()
+                importeer('wijzigingslog').volg_invoer(DATA_FILE, naam_leider)
+                st.success(f"✅ Gegevens succesvol opgeslagen!")
                 
-            st.success(f"✅ Gegevens succesvol opgeslagen!")
-            
-            # --- DE HARDE RESET ---
-            # We verhogen de teller met 1. Bij de volgende herlaad-actie dwingen we 
-            # de computer hiermee om compleet nieuwe, blanco velden aan te maken.
-            st.session_state.reset_teller += 1
-            st.rerun()
+                # --- DE HARDE RESET ---
+                # We verhogen de teller met 1. Bij de volgende herlaad-actie dwingen we 
+                # de computer hiermee om compleet nieuwe, blanco velden aan te maken.
+                st.session_state.reset_teller += 1
+                st.rerun()
 
     # --- SCROLLBARE TABEL MET HISTORIE ---
     st.divider()
     st.subheader("Recente Invoer")
 
     if os.path.isfile(DATA_FILE):
-        df_view = pd.read_csv(DATA_FILE, sep=";")
-        df_view_sorted = df_view.iloc[::-1]
-        st.dataframe(df_view_sorted, use_container_width=True, height=300)
+        # pandas (via tabellen.py) alleen laden als er een logboek is om te tonen. Het logboek
+        # blijft in de sessie (alleen nieuwe regels worden gelezen), de browser krijgt één pagina
+        tabellen = importeer('tabellen')
+        df_view = tabellen.logboek(DATA_FILE, st.session_state.setdefault("recente_invoer", {}))
+        tabellen.toon_tabel(df_view, "recente_invoer", omgekeerd=True, use_container_width=True, height=300)
+
+        # Datakwaliteit: alleen regels die sinds de vorige rerun zijn toegevoegd worden gecontroleerd
+        if "validatie_staat" not in st.session_state:
+            st.session_state.validatie_staat = {}
+        problemen = importeer('validatie').valideer_logboek_incrementeel(DATA_FILE, st.session_state.validatie_staat)
+        if not problemen.empty:
+            with st.expander(f"⚠️ Datakwaliteit: {len(problemen)} meldingen"):
+                st.dataframe(problemen, use_container_width=True, hide_index=True)
     else:
         st.info("Nog geen data in het logboek.")
 
@@ -198,6 +251,7 @@ elif pagina == "Beheer":
     st.divider()
 
     if os.path.isfile(DATA_FILE):
+        pd = importeer('pandas')
         try:
             df_beheer = pd.read_csv(DATA_FILE, sep=";")
             col_sel_1, col_sel_2 = st.columns(2)
@@ -219,12 +273,14 @@ elif pagina == "Beheer":
 
                 if wachtwoord == "D0nderd@g18!":
                     st.success("Toegang verleend.")
+                    # Wijzigingen komen met naam en tijd in het wijzigingslog (zie wijzigingslog.py)
+                    auteur = st.text_input("Uw naam (voor het wijzigingslog):").strip()
                     st.write("### Bewerk de gegevens in de tabel:")
                     edited_df = st.data_editor(df_beheer.loc[[index_to_edit]], hide_index=True)
 
                     col_actie_1, col_actie_2 = st.columns(2)
                     with col_actie_1:
-                        if st.button("💾 Wijzigingen opslaan", use_container_width=True):
+                        if st.button("💾 Wijzigingen opslaan", use_container_width=True, disabled=not auteur):
                             r = edited_df.iloc[0]
                             gepl_stilstand = r['Stilstand Opstart'] + r['Stilstand Ombouw'] + r['Stilstand Schoonmaak']
                             gepl_tijd = r['Totaal Diensttijd'] - r['Pauze'] - gepl_stilstand
@@ -247,18 +303,22 @@ elif pagina == "Beheer":
                             df_beheer.at[index_to_edit, 'Prestatie %'] = round(pre_pct, 1)
                             df_beheer.at[index_to_edit, 'Kwaliteit %'] = round(kwa_pct, 1)
                             df_beheer.at[index_to_edit, 'OEE %'] = round(tot_oee, 1)
-                            
-                            df_beheer.to_csv(DATA_FILE, sep=";", index=False)
+
+                            # Alleen deze regel (en wat erna komt) wordt herschreven, niet het hele logboek
+                            importeer('wijzigingslog').wijzig(DATA_FILE, {index_to_edit: df_beheer.loc[index_to_edit].to_dict()},
+                                                              auteur=auteur)
                             st.success("Gegevens bijgewerkt en herberekend!")
                             st.rerun()
 
                     with col_actie_2:
-                        if st.button("🗑️ Regel definitief verwijderen", type="primary", use_container_width=True):
-                            df_beheer = df_beheer.drop(index_to_edit)
-                            df_beheer.to_csv(DATA_FILE, sep=";", index=False)
+                        if st.button("🗑️ Regel definitief verwijderen", type="primary", use_container_width=True,
+                                     disabled=not auteur):
+                            importeer('wijzigingslog').wijzig(DATA_FILE, verwijderd=[index_to_edit], auteur=auteur)
                             st.warning("Regel verwijderd.")
                             st.rerun()
-                
+
+                    importeer('tabellen').toon_historie(DATA_FILE, "beheer", auteur)
+
                 elif wachtwoord != "":
                     st.error("Onjuist wachtwoord.")
             else:
@@ -269,3 +329,5 @@ elif pagina == "Beheer":
             st.info("Tip: Verwijder het oude CSV-bestand en begin opnieuw met de nieuwe kolommen.")
     else:
         st.info("Nog geen data beschikbaar om te beheren.")
+
+toon_meting(meting)
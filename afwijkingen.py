@@ -0,0 +1,227 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Afwijkende diensten in één gevectoriseerde doorgang. Per kenmerk (OEE, Hoeveelheid,
+# elke stilstandcategorie) een robuuste z-score t.o.v. de vorige VENSTER diensten van
+# dezelfde lijn + product (mediaan en IQR, de dienst zelf telt niet mee). Te weinig
+# historie voor het product: dan de lijn als geheel. De totaalscore combineert alle
+# kenmerken (wortel van het gemiddelde kwadraat), zodat een dienst die op meerdere
+# punten tegelijk wat slechter is ook opvalt.
+#
+#   scores = scoor(df)                       # zelfde index als df
+#   scores = scoor_incrementeel(df, staat)   # alleen nieuwe rijen achteraan opnieuw
+#   python afwijkingen.py --controleer       # incrementeel == volledig op de dataset
+
+# --- CONFIGURATIE ---
+VENSTER = 20
+MIN_PERIODES = 5
+DREMPEL = 3.5          # |z| van één kenmerk
+DREMPEL_SCORE = 2.5    # gecombineerde score
+
+# Richting waarin een afwijking slecht is: lage OEE, veel stilstand
+KENMERKEN = {
+    'OEE': -1,
+    'Hoeveelheid': -1,
+    'Stilstand Opstart': 1,
+    'Stilstand Ombouw': 1,
+    'Stilstand Schoonmaak': 1,
+    'Stilstand Monteur': 1,
+    'Stilstand QC': 1,
+    'Stilstand Product': 1,
+    'Stilstand Divers': 1,
+}
+
+# Ondergrens voor de spreiding: bij een vlakke historie (bijv. altijd 0 min stilstand)
+# zou elke kleine afwijking anders oneindig ver weg liggen
+MIN_SCHAAL = {'OEE': 2.0, 'Hoeveelheid': 100.0}
+MIN_SCHAAL_STILSTAND = 10.0
+
+DATUM_KOLOM = 'DD-MM-YY'
+
+
+# ==========================================
+# ROBUUSTE ROLLENDE Z-SCORES
+# ==========================================
+def _kwantielen(gesorteerd, aantal, kwantielen):
+    # Lineair geïnterpoleerde kwantielen per rij over de eerste 'aantal' (geldige) waarden
+    rijen = np.arange(len(gesorteerd))
+    laatste = np.maximum(aantal - 1, 0)
+    uit = []
+    for q in kwantielen:
+        positie = q * laatste
+        laag = positie.astype(int)
+        hoog = np.minimum(laag + 1, laatste)
+        onder = gesorteerd[rijen, laag]
+        waarde = onder + (positie - laag) * (gesorteerd[rijen, hoog] - onder)
+        uit.append(np.where(aantal >= MIN_PERIODES, waarde, np.nan))
+    return uit
+
+
+def _rollend(waarden, groepen):
+    # Mediaan en IQR van de vorige VENSTER rijen van dezelfde groep (de dienst zelf
+    # telt niet mee). Rijen per groep aaneengesloten zetten (stabiel, dus op datum),
+    # dan per rij de VENSTER voorgaande posities als (n, VENSTER) matrix
+    codes = pd.MultiIndex.from_arrays(groepen).codes if len(groepen) > 1 else [pd.factorize(groepen[0])[0]]
+    volgorde = np.lexsort(codes[::-1])
+    gegroepeerd = np.stack(codes, axis=1)[volgorde]
+    n = len(volgorde)
+    nieuw = np.r_[True, (gegroepeerd[1:] != gegroepeerd[:-1]).any(axis=1)]
+    begin = np.maximum.accumulate(np.where(nieuw, np.arange(n), 0))
+    posities = np.arange(n)[:, None] - np.arange(VENSTER, 0, -1)[None, :]
+    buiten = posities < begin[:, None]
+    posities = np.clip(posities, 0, None)
+    # Eerste positie van het venster binnen de groep, voor het tellen van geldige waarden
+    van = np.maximum(np.arange(n) - VENSTER, begin)
+
+    # Ontbrekende waarden als +inf: die sorteren achteraan en tellen niet mee
+    x = waarden.to_numpy('float32')[volgorde]
+    x = np.where(np.isnan(x), np.inf, x)
+    mediaan, iqr = np.empty(x.shape), np.empty(x.shape)
+    for j in range(x.shape[1]):
+        geldig = np.r_[0, np.cumsum(np.isfinite(x[:, j]))]
+        aantal = geldig[np.arange(n)] - geldig[van]
+        vensters = x[posities, j]
+        vensters[buiten] = np.inf
+        vensters.sort(axis=1)
+        with np.errstate(invalid='ignore'):
+            m, q1, q3 = _kwantielen(vensters, aantal, [0.5, 0.25, 0.75])
+        mediaan[volgorde, j], iqr[volgorde, j] = m, q3 - q1
+    maak = lambda a: pd.DataFrame(a, index=waarden.index, columns=waarden.columns)
+    return maak(mediaan), maak(iqr)
+
+
+def _z_scores(df, kenmerken):
+    waarden = df[kenmerken].astype('float64')
+    lijn = df['Lijn'].astype(str)
+    mediaan_p, iqr_p = _rollend(waarden, [lijn, df['Product'].astype(str)])
+    mediaan_l, iqr_l = _rollend(waarden, [lijn])
+    # Productniveau waar genoeg historie is, anders lijnniveau
+    mediaan = mediaan_p.fillna(mediaan_l)
+    iqr = iqr_p.where(mediaan_p.notna(), iqr_l)
+    ondergrens = pd.Series({k: MIN_SCHAAL.get(k, MIN_SCHAAL_STILSTAND) for k in kenmerken})
+    schaal = (iqr / 1.349).clip(lower=ondergrens, axis=1)
+    return (waarden - mediaan) / schaal
+
+
+def _kenmerken(df):
+    return [k for k in KENMERKEN if k in df.columns and df[k].notna().any()]
+
+
+def scoor(df, kenmerken=None):
+    kenmerken = kenmerken or _kenmerken(df)
+    volgorde = df.sort_values(DATUM_KOLOM, kind='stable')
+    z = _z_scores(volgorde, kenmerken).reindex(df.index)
+
+    # Alleen de slechte kant telt mee (hoge OEE is geen probleem)
+    slecht = (z * pd.Series({k: KENMERKEN.get(k, 1) for k in kenmerken})).clip(lower=0).to_numpy()
+    aanwezig = ~np.isnan(slecht)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.sqrt(np.nansum(slecht ** 2, axis=1) / aanwezig.sum(axis=1))
+    hoogste = np.where(aanwezig, slecht, -np.inf)
+    reden = np.array(kenmerken, dtype=object)[hoogste.argmax(axis=1)] if kenmerken else np.full(len(df), None)
+    max_z = hoogste.max(axis=1) if kenmerken else np.zeros(len(df))
+
+    uit = z.add_prefix('z ')
+    uit['Score'] = score.astype('float32')
+    uit['Reden'] = pd.Categorical(np.where(aanwezig.any(axis=1), reden, None) if kenmerken else reden)
+    uit['Afwijking'] = (max_z >= DREMPEL) | (score >= DREMPEL_SCORE)
+    return uit
+
+
+# ==========================================
+# INCREMENTEEL
+# ==========================================
+def _vingerafdruk(df):
+    kolommen = [DATUM_KOLOM, 'Lijn', 'Product'] + [k for k in KENMERKEN if k in df.columns]
+    return pd.util.hash_pandas_object(df[kolommen], index=False).to_numpy()
+
+
+def scoor_incrementeel(df, staat):
+    # 'staat' is een dict per proces. Zijn de eerste n rijen ongewijzigd (de dataset is
+    # op datum gesorteerd en logboeken groeien achteraan), dan worden alleen de nieuwe
+    # rijen gescoord, met de laatste VENSTER diensten per groep als context
+    afdruk = _vingerafdruk(df)
+    kenmerken = _kenmerken(df)
+    n = staat.get('n', 0)
+    if not (0 < n <= len(df) and staat['kenmerken'] == kenmerken and np.array_equal(staat['afdruk'], afdruk[:n])):
+        scores = scoor(df, kenmerken)
+    elif n == len(df):
+        return staat['scores'].set_axis(df.index)
+    else:
+        # Zelfde groepen als _z_scores, ook diensten zonder product (een eigen groep)
+        oud = df.iloc[:n]
+        lijn = oud['Lijn'].astype(str)
+        context = set(oud.groupby([lijn, oud['Product'].astype(str)], dropna=False).tail(VENSTER).index)
+        context |= set(oud.groupby(lijn, dropna=False).tail(VENSTER).index)
+        posities = np.sort(np.concatenate([df.index.get_indexer(list(context)), np.arange(n, len(df))]))
+        deel = scoor(df.iloc[posities], kenmerken).iloc[-(len(df) - n):]
+        scores = pd.concat([staat['scores'], deel.astype({'Reden': object})])
+        scores['Reden'] = scores['Reden'].astype('category')
+        scores = scores.set_axis(df.index)
+    staat.update(n=len(df), afdruk=afdruk, kenmerken=kenmerken, scores=scores)
+    return scores
+
+
+# ==========================================
+# RANGLIJST
+# ==========================================
+def afwijkende_diensten(df, scores, n=None):
+    kolommen = [k for k in [DATUM_KOLOM, 'Lijn', 'Product', 'Bandleidster', 'Aantal personen', 'OEE', 'Hoeveelheid']
+                if k in df.columns]
+    lijst = df[kolommen].join(scores[['Score', 'Reden']])[scores['Afwijking']]
+    lijst = lijst.sort_values('Score', ascending=False)
+    return lijst if n is None else lijst.head(n)
+
+
+# ==========================================
+# CONTROLE
+# ==========================================
+def _voorbeeld(rijen=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        DATUM_KOLOM: pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 700, rijen)), 'D'),
+        'Lijn': pd.Categorical(rng.choice(['2', '11', '24'], rijen)),
+        'Product': rng.choice(np.array(['A', 'B', 'C', None], dtype=object), rijen, p=[.4, .3, .2, .1]),
+        'OEE': rng.normal(75, 8, rijen),
+        'Hoeveelheid': rng.normal(8000, 1500, rijen),
+    })
+
+
+def controleer(df, stappen=4):
+    # Grootste verschil in Score tussen scoor_incrementeel (de rijen in 'stappen' delen
+    # toegevoegd) en één volledige scoor(); ook verschillen in Afwijking tellen
+    df = df.sort_values(DATUM_KOLOM, kind='stable', ignore_index=True)
+    staat = {}
+    for eind in np.linspace(0, len(df), stappen + 1).astype(int)[1:]:
+        incrementeel = scoor_incrementeel(df.iloc[:eind], staat)
+    volledig = scoor(df)
+    verschil = (incrementeel['Score'] - volledig['Score']).abs().max()
+    return verschil, int((incrementeel['Afwijking'] != volledig['Afwijking']).sum())
+
+
+def main(argv=None):
+    from dataset import laad_dataset
+
+    parser = argparse.ArgumentParser(description="Afwijkende diensten in de dataset")
+    parser.add_argument('--controleer', action='store_true',
+                        help="Incrementele scores vergelijken met een volledige berekening")
+    parser.add_argument('--n', type=int, default=20, help="Aantal diensten in de ranglijst")
+    args = parser.parse_args(argv)
+
+    df = laad_dataset()
+    if not args.controleer:
+        print(afwijkende_diensten(df, scoor(df), args.n).to_string())
+        return
+    # Ook op een voorbeeld met diensten zonder product (een eigen groep in _z_scores)
+    fouten = 0
+    for naam, deel in [('dataset', df), ('voorbeeld met lege producten', _voorbeeld())]:
+        verschil, afwijkingen = controleer(deel)
+        fouten += bool(verschil > 0 or afwijkingen)
+        print(f"{naam}: grootste verschil in Score {verschil:.6f}, {afwijkingen} verschillen in Afwijking")
+    raise SystemExit(fouten)
+
+
+if __name__ == '__main__':
+    main()
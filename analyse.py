@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Gedeelde rekenlogica van Dashboard.py, v2.py, inzicht.py en de batch-rapporten.
+# Niets in dit bestand gebruikt Streamlit, zodat het ook vanuit cron draait.
+
+
+# ==========================================
+# FILTEREN
+# ==========================================
+def filter_data(df, lijnen=None, bandleidsters=None, bezetting=None, van=None, tot=None):
+    masker = pd.Series(True, index=df.index)
+    if lijnen:
+        masker &= df['Lijn'].isin(lijnen)
+    if bandleidsters:
+        masker &= df['Bandleidster'].isin(bandleidsters)
+    if bezetting:
+        masker &= df['Aantal personen'].isin(bezetting)
+    if van is not None:
+        masker &= df['DD-MM-YY'] >= pd.Timestamp(van)
+    if tot is not None:
+        masker &= df['DD-MM-YY'] <= pd.Timestamp(tot)
+    return df[masker]
+
+
+# ==========================================
+# KPI'S
+# ==========================================
+def bereken_kpis(df):
+    max_oee = df['OEE'].max()
+    if pd.notna(max_oee):
+        beste_dag = df.loc[df['OEE'].idxmax(), 'DD-MM-YY']
+    else:
+        beste_dag = None
+    return {
+        'gem_oee': df['OEE'].mean(),
+        'totale_productie': df['Hoeveelheid'].sum(),
+        'max_oee': max_oee,
+        'beste_dag': beste_dag,
+        'dagen': len(df),
+    }
+
+
+# ==========================================
+# TRENDS
+# ==========================================
+def bereken_lineaire_trend(df_in, x_col, y_col):
+    df_clean = df_in.dropna(subset=[x_col, y_col])
+    if len(df_clean) < 2:
+        return None, None
+    x_dates = df_clean[x_col]
+    x_num = (x_dates - x_dates.min()).dt.days
+    y = df_clean[y_col]
+    z = np.polyfit(x_num, y, 1)
+    p = np.poly1d(z)
+    return x_dates, p(x_num)
+
+
+def weekgemiddelde(lijn_data, y_col, x_col='DD-MM-YY'):
+    # We groeperen op Jaar en Weeknummer om weekgemiddeldes te berekenen
+    # 'transform' zorgt dat dit gemiddelde voor elke dag in die week wordt ingevuld
+    iso = lijn_data[x_col].dt.isocalendar()
+    return lijn_data.groupby([iso.year, iso.week])[y_col].transform('mean')
+
+
+def week_gemiddelden(df, kolommen, week_col='Week'):
+    return df.groupby(week_col)[kolommen].mean().reset_index()
+
+
+# ==========================================
+# SPREIDING EN VERKENNENDE ANALYSES
+# ==========================================
+def boxplot_statistieken(df, y_col='OEE', groep='Lijn'):
+    groepen = df.groupby(groep, observed=True)[y_col]
+    stats = groepen.describe()[['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']]
+    return stats.rename(columns={'count': 'n', 'mean': 'gemiddelde', 'std': 'sd',
+                                 '25%': 'q1', '50%': 'mediaan', '75%': 'q3'}).reset_index()
+
+
+def slechtste_dagen(df, n=5):
+    return df.sort_values('OEE', ascending=True).head(n)
+
+
+def product_statistieken(df):
+    # We groeperen op Product en berekenen zowel het gemiddelde als de frequentie
+    product_stats = df.groupby('Product', observed=True)['OEE'].agg(['mean', 'count']).reset_index()
+    product_stats.columns = ['Product', 'Gemiddelde_OEE', 'Frequentie']
+    return product_stats.sort_values(by='Gemiddelde_OEE', ascending=True)
+
+
+def heatmap_bezetting(df):
+    return df.groupby(['Lijn', 'Aantal personen'], observed=True)['OEE'].mean().reset_index()
+
+
+def bezetting_verschil(df):
+    # Afwijking van het aantal personen t.o.v. het gemiddelde van de eigen lijn
+    df_mean_pers = df.groupby('Lijn', observed=True)['Aantal personen'].transform('mean')
+    return df['Aantal personen'] - df_mean_pers
@@ -0,0 +1,302 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+from analyse import bereken_kpis, bereken_lineaire_trend, filter_data, weekgemiddelde
+from dataset import DATASET_VERSIE, bronbestanden, nieuwe_staat, synchroniseer
+from profiel import importeer
+from schijfcache import bestand_versie
+
+# Alleen-lezen HTTP service met de KPI's per lijn voor andere programma's (ERP
+# planning, tv-scherm op de vloer), zonder Streamlit. Rekent met dezelfde dataset
+# (dataset.py) en analyses (analyse.py) als de dashboards.
+#
+# Elk antwoord heeft een ETag uit de dataversie (grootte + mtime van de bronbestanden)
+# en de vraag. Een client die elke paar seconden pollt met If-None-Match krijgt
+# 304 zonder body; daarvoor is alleen de dataversie nodig, die hooguit één keer per
+# VERSIE_INTERVAL met stat() wordt bepaald. Pas bij een nieuwe dataversie wordt de
+# dataset bijgewerkt (alleen de nieuwe regels) en een antwoord opnieuw berekend; de
+# laatste antwoorden staan kant-en-klaar in het geheugen voor nieuwe clients.
+#
+#   python api.py --poort 8600
+#   curl http://127.0.0.1:8600/vandaag
+#   curl "http://127.0.0.1:8600/week?lijnen=24,25&van=2025-11-01"
+#   curl "http://127.0.0.1:8600/dagen?lijnen=24&formaat=arrow" -o lijn24.arrow
+#
+# Eindpunten (filters: lijnen=24,25 van=JJJJ-MM-DD tot=JJJJ-MM-DD, formaat=json|arrow):
+#   /vandaag   laatste dag per lijn (tot en met ?datum=, standaard vandaag)
+#   /kpi       gemiddelde OEE, productie, beste dag per lijn en totaal
+#   /week      weekgemiddelden per lijn
+#   /trend     dagwaarden, weekgemiddelde en lineaire trend per lijn (?kolom=OEE)
+#   /dagen     de dagregels zelf
+#   /versie    dataversie en ETag-basis (alleen json)
+
+# --- CONFIGURATIE ---
+HOST = '127.0.0.1'
+POORT = 8600
+VERSIE_INTERVAL = 1.0   # seconden; zo vaak hooguit stat() op de bronbestanden
+MAX_ANTWOORDEN = 256
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+TREND_KOLOMMEN = ['OEE', 'Hoeveelheid', 'Totaal Geproduceerd', 'Beschikbaarheid', 'Prestatie', 'Kwaliteit']
+VANDAAG_KOLOMMEN = ['Lijn', 'Locatie', 'DD-MM-YY', 'OEE', 'Beschikbaarheid', 'Prestatie', 'Kwaliteit',
+                    'Hoeveelheid', 'Totaal Geproduceerd', 'Bandleidster', 'Product', 'Aantal personen', 'Bron']
+
+
+class Fout(Exception):
+    # Ongeldige vraag -> 400 met de melding
+    pass
+
+
+# ==========================================
+# DATAVERSIE EN DATASET
+# ==========================================
+_STAAT = {'werkboek': None, 'map': '.', 'versie': None, 'gemeten': 0.0, 'dataset_versie': None,
+          'slot': threading.Lock(), 'rekenen': threading.Lock(), 'sync': nieuwe_staat(), 'antwoorden': OrderedDict()}
+
+
+def dataversie():
+    # Versie van alle bronnen; binnen VERSIE_INTERVAL de vorige meting
+    with _STAAT['slot']:
+        if _STAAT['versie'] is None or time.monotonic() - _STAAT['gemeten'] >= VERSIE_INTERVAL:
+            bestanden = bronbestanden(_STAAT['werkboek'], _STAAT['map'])
+            versie = repr([DATASET_VERSIE] + bestand_versie(bestanden))
+            _STAAT['versie'] = hashlib.sha256(versie.encode()).hexdigest()[:16]
+            _STAAT['gemeten'] = time.monotonic()
+        return _STAAT['versie']
+
+
+def _dataset(versie):
+    # Bijwerken (incrementeel, dataset.synchroniseer) alleen bij een nieuwe dataversie
+    if _STAAT['dataset_versie'] != versie:
+        synchroniseer(_STAAT['sync'], _STAAT['werkboek'], _STAAT['map'])
+        _STAAT['dataset_versie'] = versie
+    return _STAAT['sync']['dataset']
+
+
+# ==========================================
+# PARAMETERS
+# ==========================================
+def _datum(params, naam):
+    if naam not in params:
+        return None
+    try:
+        return pd.Timestamp(date.fromisoformat(params[naam]))
+    except ValueError:
+        raise Fout(f"{naam}: verwacht JJJJ-MM-DD, niet '{params[naam]}'")
+
+
+def _selectie(df, params):
+    lijnen = [l.strip() for l in params['lijnen'].split(',') if l.strip()] if params.get('lijnen') else None
+    return filter_data(df, lijnen=lijnen, van=_datum(params, 'van'), tot=_datum(params, 'tot'))
+
+
+# ==========================================
+# EINDPUNTEN
+# ==========================================
+def _vandaag(df, params):
+    datum = _datum(params, 'datum') or pd.Timestamp(date.today())
+    df = _selectie(df, params)
+    df = df[df['DD-MM-YY'] < datum + pd.Timedelta(days=1)]
+    laatste = df.groupby('Lijn', observed=True)['DD-MM-YY'].transform('max')
+    uit = df.loc[df['DD-MM-YY'] == laatste, VANDAAG_KOLOMMEN].sort_values('Lijn', kind='stable')
+    return uit.assign(Vandaag=uit['DD-MM-YY'].dt.normalize() == datum.normalize())
+
+
+def _kpi(df, params):
+    df = _selectie(df, params)
+    rijen = [{'Lijn': str(lijn), **bereken_kpis(deel)} for lijn, deel in df.groupby('Lijn', observed=True)]
+    rijen.append({'Lijn': 'Totaal', **bereken_kpis(df)})
+    return pd.DataFrame(rijen)
+
+
+def _week(df, params):
+    df = _selectie(df, params)
+    iso = df['DD-MM-YY'].dt.isocalendar()
+    groepen = df.groupby([df['Lijn'].astype(str), iso.year.rename('Jaar'), iso.week.rename('Week')])
+    uit = groepen.agg(Gemiddelde_OEE=('OEE', 'mean'), Totale_Hoeveelheid=('Hoeveelheid', 'sum'), Dagen=('OEE', 'size'))
+    return uit.reset_index()
+
+
+def _trend(df, params):
+    kolom = params.get('kolom', 'OEE')
+    if kolom not in TREND_KOLOMMEN:
+        raise Fout(f"kolom: kies uit {', '.join(TREND_KOLOMMEN)}")
+    delen = []
+    for lijn, deel in _selectie(df, params).groupby('Lijn', observed=True):
+        deel = deel[['DD-MM-YY', kolom]].dropna().sort_values('DD-MM-YY', kind='stable')
+        if deel.empty:
+            continue
+        _, trend = bereken_lineaire_trend(deel, 'DD-MM-YY', kolom)
+        delen.append(deel.assign(Lijn=str(lijn), Weekgemiddelde=weekgemiddelde(deel, kolom),
+                                 Trend=trend if trend is not None else float('nan')))
+    if not delen:
+        return pd.DataFrame(columns=['Lijn', 'DD-MM-YY', kolom, 'Weekgemiddelde', 'Trend'])
+    return pd.concat(delen, ignore_index=True)[['Lijn', 'DD-MM-YY', kolom, 'Weekgemiddelde', 'Trend']]
+
+
+def _dagen(df, params):
+    return _selectie(df, params)
+
+
+EINDPUNTEN = {'/vandaag': _vandaag, '/kpi': _kpi, '/week': _week, '/trend': _trend, '/dagen': _dagen}
+
+
+# ==========================================
+# ANTWOORDEN
+# ==========================================
+def _json(df):
+    # Datums in ISO formaat, NaN als null; 4 decimalen (float32 kolommen geven anders 53.0999984741)
+    return df.to_json(orient='records', date_format='iso', date_unit='s', double_precision=4,
+                      force_ascii=False).encode('utf-8')
+
+
+def _arrow(df):
+    pa = importeer('pyarrow')
+    tabel = pa.Table.from_pandas(df, preserve_index=False)
+    bron = pa.BufferOutputStream()
+    with pa.ipc.new_stream(bron, tabel.schema) as writer:
+        writer.write_table(tabel)
+    return bron.getvalue().to_pybytes()
+
+
+def _formaat(params, accept):
+    formaat = params.get('formaat') or ('arrow' if ARROW_TYPE in (accept or '') else 'json')
+    if formaat not in ('json', 'arrow'):
+        raise Fout("formaat: json of arrow")
+    return formaat
+
+
+def etag(versie, pad, params, formaat):
+    # De datum erbij: /vandaag verschuift om middernacht ook zonder nieuwe data
+    vraag = repr((pad, sorted(params.items()), formaat, date.today().isoformat()))
+    return '"' + hashlib.sha256(f"{versie}:{vraag}".encode()).hexdigest()[:24] + '"'
+
+
+def _bewaard(sleutel):
+    with _STAAT['slot']:
+        if sleutel in _STAAT['antwoorden']:
+            _STAAT['antwoorden'].move_to_end(sleutel)
+            return _STAAT['antwoorden'][sleutel]
+    return None
+
+
+def beantwoord(versie, sleutel, pad, params, formaat):
+    # (body, content-type) voor deze ETag. Eén thread tegelijk rekent; wie wacht op
+    # hetzelfde antwoord krijgt daarna het bewaarde resultaat
+    antwoord = _bewaard(sleutel)
+    if antwoord is not None:
+        return antwoord
+    with _STAAT['rekenen']:
+        antwoord = _bewaard(sleutel)
+        if antwoord is not None:
+            return antwoord
+        df = EINDPUNTEN[pad](_dataset(versie), params)
+        antwoord = (_arrow(df), ARROW_TYPE) if formaat == 'arrow' else (_json(df), 'application/json')
+    with _STAAT['slot']:
+        _STAAT['antwoorden'][sleutel] = antwoord
+        while len(_STAAT['antwoorden']) > MAX_ANTWOORDEN:
+            _STAAT['antwoorden'].popitem(last=False)
+    return antwoord
+
+
+def _komt_overeen(if_none_match, sleutel):
+    if not if_none_match:
+        return False
+    kandidaten = [t.strip() for t in if_none_match.split(',')]
+    return '*' in kandidaten or any(t.removeprefix('W/') == sleutel for t in kandidaten)
+
+
+# ==========================================
+# HTTP
+# ==========================================
+class Verzoek(BaseHTTPRequestHandler):
+    server_version = 'OEE-API/1'
+    protocol_version = 'HTTP/1.1'   # keep-alive: pollende clients hergebruiken de verbinding
+    disable_nagle_algorithm = True  # kop en body apart verstuurd: anders 40 ms vertraging per antwoord
+    loggen = False
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if url.path not in EINDPUNTEN and url.path != '/versie':
+                return self._stuur(404, json.dumps({'fout': f"onbekend: {url.path}",
+                                                    'eindpunten': sorted(EINDPUNTEN) + ['/versie']}).encode(),
+                                   'application/json')
+            formaat = _formaat(params, self.headers.get('Accept'))
+            versie = dataversie()
+            sleutel = etag(versie, url.path, params, formaat)
+            # Niets veranderd: 304 zonder de dataset of het antwoord aan te raken
+            if _komt_overeen(self.headers.get('If-None-Match'), sleutel):
+                return self._stuur(304, b'', None, sleutel)
+            if url.path == '/versie':
+                return self._stuur(200, json.dumps({'versie': versie}).encode(), 'application/json', sleutel)
+            body, soort = beantwoord(versie, sleutel, url.path, params, formaat)
+            return self._stuur(200, body, soort, sleutel)
+        except Fout as e:
+            return self._stuur(400, json.dumps({'fout': str(e)}).encode(), 'application/json')
+        except Exception as e:
+            self.log_error("%s: %r", url.path, e)
+            return self._stuur(500, json.dumps({'fout': f"{type(e).__name__}: {e}"}).encode(), 'application/json')
+
+    def _stuur(self, status, body, soort, sleutel=None):
+        self.send_response(status)
+        if sleutel:
+            self.send_header('ETag', sleutel)
+            # Elke keer hervalideren; met de ETag is dat een goedkope 304
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept')
+        if soort:
+            self.send_header('Content-Type', soort + ('; charset=utf-8' if soort == 'application/json' else ''))
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.loggen:
+            super().log_message(format, *args)
+
+
+def start(host=HOST, poort=POORT, werkboek=None, map_naam='.', loggen=False):
+    # Geeft de server terug (serve_forever in de aanroeper); de dataset wordt vooraf geladen
+    _STAAT.update(werkboek=werkboek, map=map_naam, versie=None, dataset_versie=None)
+    _dataset(dataversie())
+    Verzoek.loggen = loggen
+    server = ThreadingHTTPServer((host, poort), Verzoek)
+    server.daemon_threads = True
+    return server
+
+
+# ==========================================
+# COMMAND LINE
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Alleen-lezen KPI service (JSON/Arrow) met ETags")
+    parser.add_argument('--host', default=HOST, help="Standaard alleen lokaal; 0.0.0.0 voor het netwerk")
+    parser.add_argument('--poort', type=int, default=POORT)
+    parser.add_argument('--werkboek', help="Standaard: alle werkboeken uit het bronnenregister")
+    parser.add_argument('--map', default='.', help="Map met de logboeken")
+    parser.add_argument('--log', action='store_true', help="Elk verzoek loggen")
+    args = parser.parse_args(argv)
+
+    server = start(args.host, args.poort, args.werkboek, args.map, args.log)
+    print(f"KPI service op http://{args.host}:{args.poort} ({', '.join(sorted(EINDPUNTEN))}, /versie)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import glob
+import json
+import os
+
+import pandas as pd
+from data import STILSTAND_TABBLAD, WERKBOEK_BESTAND, laad_stilstand_tab, verwijder_lege_categorieen
+
+# Archief van afgesloten maanden als Parquet, gepartitioneerd per jaar/maand/lijn:
+#   archief/dataset/jaar=2025/maand=11/lijn=24/deel.parquet
+# De lopende maand(en) blijven de "hete staart" en komen uit de bronbestanden.
+# Lezers kiezen eerst de partities op mapnaam (periode + lijnen) en openen alleen
+# die bestanden; "lijn 24, vorige maand" leest zo één klein bestand.
+#
+# Gebruik (bijv. elke nacht):
+#   python archief.py                   # nieuw afgesloten maanden toevoegen
+#   python archief.py --volledig        # alles opnieuw opbouwen (na correcties in oude maanden)
+
+# --- CONFIGURATIE ---
+ARCHIEF_MAP = os.environ.get('OEE_ARCHIEF_MAP', 'archief')
+MANIFEST = '_manifest.json'
+OPEN_MAANDEN = 1
+
+
+# ==========================================
+# MANIFEST
+# ==========================================
+def lees_manifest(archief_map=ARCHIEF_MAP):
+    pad = os.path.join(archief_map, MANIFEST)
+    if not os.path.isfile(pad):
+        return {}
+    with open(pad, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _schrijf_manifest(manifest, archief_map):
+    pad = os.path.join(archief_map, MANIFEST)
+    with open(pad + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(pad + '.tmp', pad)
+
+
+def grens(naam, archief_map=ARCHIEF_MAP):
+    # Eerste dag die NIET in het archief zit (begin van de hete staart), of None
+    info = lees_manifest(archief_map).get(naam)
+    return pd.Timestamp(info['grens']) if info else None
+
+
+def archief_grens(vandaag=None, open_maanden=OPEN_MAANDEN):
+    maand = pd.Timestamp(vandaag if vandaag is not None else pd.Timestamp.today()).to_period('M')
+    return (maand - (open_maanden - 1)).to_timestamp()
+
+
+# ==========================================
+# SCHRIJVEN (COMPACTIE)
+# ==========================================
+def _partitie_map(archief_map, naam, jaar, maand, lijn):
+    return os.path.join(archief_map, naam, f"jaar={jaar}", f"maand={maand:02d}", f"lijn={lijn}")
+
+
+def archiveer(df, naam, tot, archief_map=ARCHIEF_MAP, datum_kolom='DD-MM-YY', lijn_kolom='Lijn',
+              kolommen=None, volledig=False):
+    # Schrijft de rijen vóór 'tot' weg. Zonder 'volledig' alleen de maanden die sinds
+    # de vorige compactie zijn afgesloten; een partitie wordt altijd in zijn geheel
+    # (atomisch) vervangen, dus opnieuw draaien is veilig.
+    tot = pd.Timestamp(tot)
+    vorige = None if volledig else grens(naam, archief_map)
+    masker = df[datum_kolom] < tot
+    if vorige is not None:
+        masker &= df[datum_kolom] >= vorige
+    oud = df.loc[masker, kolommen] if kolommen else df[masker]
+
+    partities = 0
+    if not oud.empty:
+        groepen = [oud[datum_kolom].dt.year.rename('jaar'), oud[datum_kolom].dt.month.rename('maand'),
+                   oud[lijn_kolom].astype(str).rename('lijn')]
+        for (jaar, maand, lijn), deel in oud.groupby(groepen, observed=True, sort=True):
+            map_naam = _partitie_map(archief_map, naam, jaar, maand, lijn)
+            os.makedirs(map_naam, exist_ok=True)
+            doel = os.path.join(map_naam, 'deel.parquet')
+            verwijder_lege_categorieen(deel.copy()).to_parquet(doel + '.tmp', index=False)
+            os.replace(doel + '.tmp', doel)
+            partities += 1
+
+    manifest = lees_manifest(archief_map)
+    eerder = manifest.get(naam, {}) if vorige is not None else {}
+    van = [pd.Timestamp(eerder['van'])] if eerder.get('van') else []
+    laatste = [pd.Timestamp(eerder['laatste'])] if eerder.get('laatste') else []
+    if not oud.empty:
+        van.append(oud[datum_kolom].min())
+        laatste.append(oud[datum_kolom].max())
+    manifest[naam] = {
+        'grens': f"{max(tot, vorige) if vorige is not None else tot:%Y-%m-%d}",
+        'van': f"{min(van):%Y-%m-%d}" if van else None,
+        'laatste': f"{max(laatste):%Y-%m-%d}" if laatste else None,
+        'datum_kolom': datum_kolom,
+        'lijn_kolom': lijn_kolom,
+        'rijen': eerder.get('rijen', 0) + len(oud),
+    }
+    os.makedirs(archief_map, exist_ok=True)
+    _schrijf_manifest(manifest, archief_map)
+    return partities
+
+
+# ==========================================
+# LEZEN MET PARTITIE-SNOEI
+# ==========================================
+def _uit_pad(pad):
+    delen = dict(d.split('=', 1) for d in pad.replace('\\', '/').split('/') if '=' in d)
+    return int(delen['jaar']), int(delen['maand']), delen['lijn']
+
+
+def partitie_bestanden(naam, van=None, tot=None, lijnen=None, archief_map=ARCHIEF_MAP):
+    # Alleen mapnamen vergelijken; bestanden buiten de periode of lijnen worden niet geopend
+    van = pd.Timestamp(van) if van is not None else None
+    tot = pd.Timestamp(tot) if tot is not None else None
+    lijnen = None if lijnen is None else {str(l) for l in lijnen}
+    bestanden = []
+    for pad in sorted(glob.glob(os.path.join(archief_map, naam, 'jaar=*', 'maand=*', 'lijn=*', '*.parquet'))):
+        jaar, maand, lijn = _uit_pad(pad)
+        begin = pd.Timestamp(year=jaar, month=maand, day=1)
+        einde = begin + pd.offsets.MonthEnd(0)
+        if (van is not None and einde < van.normalize()) or (tot is not None and begin > tot):
+            continue
+        if lijnen is not None and lijn not in lijnen:
+            continue
+        bestanden.append(pad)
+    return bestanden
+
+
+def archief_lijnen(naam, archief_map=ARCHIEF_MAP):
+    return sorted({_uit_pad(p)[2] for p in glob.glob(os.path.join(archief_map, naam, 'jaar=*', 'maand=*', 'lijn=*'))})
+
+
+def lees(naam, van=None, tot=None, lijnen=None, archief_map=ARCHIEF_MAP):
+    bestanden = partitie_bestanden(naam, van, tot, lijnen, archief_map)
+    if not bestanden:
+        return None
+    df = pd.concat([pd.read_parquet(b) for b in bestanden], ignore_index=True)
+    datum_kolom = lees_manifest(archief_map)[naam]['datum_kolom']
+    return _filter_periode(df, datum_kolom, van, tot)
+
+
+def _filter_periode(df, datum_kolom, van, tot):
+    if van is not None:
+        df = df[df[datum_kolom] >= pd.Timestamp(van)]
+    if tot is not None:
+        df = df[df[datum_kolom] <= pd.Timestamp(tot)]
+    return df
+
+
+def lees_met_staart(naam, df_heet, van=None, tot=None, lijnen=None, archief_map=ARCHIEF_MAP):
+    # Archief voor alles vóór de grens, de bron (hete staart) vanaf de grens
+    info = lees_manifest(archief_map).get(naam)
+    if not info:
+        return df_heet
+    g = pd.Timestamp(info['grens'])
+    staart = df_heet[df_heet[info['datum_kolom']] >= g]
+    if lijnen is not None:
+        staart = staart[staart[info['lijn_kolom']].astype(str).isin([str(l) for l in lijnen])]
+    staart = _filter_periode(staart, info['datum_kolom'], van, tot)
+    if van is not None and pd.Timestamp(van) >= g:
+        return staart
+    historie = lees(naam, van, g - pd.Timedelta(days=1) if tot is None else min(pd.Timestamp(tot), g - pd.Timedelta(days=1)),
+                    lijnen, archief_map)
+    if historie is None or historie.empty:
+        return staart
+    return pd.concat([historie, staart], ignore_index=True).sort_values(info['datum_kolom'], kind='stable', ignore_index=True)
+
+
+# ==========================================
+# COMMAND LINE (COMPACTIE JOB)
+# ==========================================
+def main(argv=None):
+    from dataset import laad_dataset
+
+    parser = argparse.ArgumentParser(description="Afgesloten maanden naar het Parquet archief verplaatsen")
+    parser.add_argument('--archief', default=ARCHIEF_MAP)
+    parser.add_argument('--werkboek', default=None, help="Standaard alle werkboeken uit het bronnenregister")
+    parser.add_argument('--open-maanden', type=int, default=OPEN_MAANDEN,
+                        help="Aantal lopende maanden dat in de bronbestanden blijft (standaard 1)")
+    parser.add_argument('--volledig', action='store_true', help="Alle afgesloten maanden opnieuw schrijven")
+    args = parser.parse_args(argv)
+
+    tot = archief_grens(open_maanden=args.open_maanden)
+    n = archiveer(laad_dataset(args.werkboek), 'dataset', tot, args.archief, volledig=args.volledig)
+    print(f"dataset: {n} partities geschreven (tot {tot:%Y-%m-%d})")
+
+    # Stilstand tabblad van inzicht.py (lijn uit de tabbladnaam, bijv. 'inzicht 24')
+    df_stil, wachtkolommen = laad_stilstand_tab(args.werkboek or WERKBOEK_BESTAND)
+    df_stil['Lijn'] = STILSTAND_TABBLAD.split()[-1]
+    n = archiveer(df_stil, 'stilstand', tot, args.archief, datum_kolom='Datum_Schoon',
+                  kolommen=['Datum_Schoon', 'Week', 'Lijn'] + wachtkolommen, volledig=args.volledig)
+    print(f"stilstand: {n} partities geschreven")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from data import SCHEMA_WERKBOEK, WERKBOEK_BESTAND, pas_schema_toe
+from pijplijn import STAPPEN, aanwezig_tot, werkboek
+
+# Register van werkboeken per locatie (boven, beneden/tubes, ...). Een bron is een
+# werkboek of een map met werkboeken; de lijn-tabbladen worden per bestand uit de
+# tabbladnamen afgeleid. Alle werkboeken samen vormen één tabel met een kolom
+# 'Locatie'. Alleen bestanden die niet in de schijfcache staan (pijplijn.py, op inhoud)
+# worden ingelezen, bij meer dan één tegelijk in aparte processen.
+#
+# Eigen register via OEE_BRONNEN=bronnen.json:
+#   [{"pad": "Data Lijnen boven OEE .xlsx", "locatie": "Boven"},
+#    {"pad": "werkboeken/tubes", "locatie": "Tubes", "tabbladen": ["13", "14", "15"]}]
+
+# --- CONFIGURATIE ---
+BRONNEN_BESTAND = os.environ.get('OEE_BRONNEN', 'bronnen.json')
+STANDAARD_BRONNEN = [{'pad': WERKBOEK_BESTAND, 'locatie': 'Boven'}]
+WERKBOEK_PATRONEN = ['*.xlsx', '*.xlsm']
+# Onder deze totale grootte zijn aparte processen starten duurder dan serieel lezen
+PARALLEL_VANAF_BYTES = 2 * 1024 * 1024
+
+SCHEMA_BRONNEN = {**SCHEMA_WERKBOEK, 'Locatie': 'category'}
+
+
+# ==========================================
+# REGISTER
+# ==========================================
+def lees_register(bestand=BRONNEN_BESTAND):
+    if not os.path.isfile(bestand):
+        return STANDAARD_BRONNEN
+    with open(bestand, encoding='utf-8') as f:
+        register = json.load(f)
+    # Relatieve paden zijn relatief aan het registerbestand
+    basis = os.path.dirname(bestand)
+    return [{**bron, 'pad': os.path.join(basis, bron['pad'])} for bron in register]
+
+
+def werkboeken(register=None):
+    # Lijst van (pad, locatie, tabbladen of None); mappen worden uitgevouwen.
+    # Tijdelijke Excel-bestanden (~$...) en dubbel opgegeven bestanden worden overgeslagen
+    gevonden, gezien = [], set()
+    for bron in lees_register() if register is None else register:
+        pad = bron['pad']
+        if os.path.isdir(pad):
+            paden = sorted(p for patroon in WERKBOEK_PATRONEN for p in glob.glob(os.path.join(pad, patroon)))
+        else:
+            paden = [pad] if os.path.isfile(pad) else []
+        for p in paden:
+            if os.path.basename(p).startswith('~$') or os.path.abspath(p) in gezien:
+                continue
+            gezien.add(os.path.abspath(p))
+            tabbladen = tuple(str(t) for t in bron['tabbladen']) if bron.get('tabbladen') else None
+            gevonden.append((p, bron.get('locatie', _stam(p)), tabbladen))
+    return gevonden
+
+
+def _stam(pad):
+    return os.path.splitext(os.path.basename(pad))[0].strip()
+
+
+def werkboeken_voor(werkboek=None):
+    # None: het hele register; een pad: alleen dat werkboek (locatie uit het register indien bekend)
+    if werkboek is None:
+        return werkboeken()
+    if not os.path.isfile(werkboek):
+        return []
+    for bron in werkboeken():
+        if os.path.abspath(bron[0]) == os.path.abspath(werkboek):
+            return [bron]
+    return [(werkboek, _stam(werkboek), None)]
+
+
+# ==========================================
+# PARALLEL LADEN
+# ==========================================
+def _laad_bron_taak(taak):
+    # Draait in een worker; de pijplijn schrijft elke stap ook in de gedeelde schijfcache
+    pad, tabbladen = taak
+    try:
+        return werkboek(pad, tabbladen)
+    except ValueError:
+        return None  # geen lijn-tabbladen in dit bestand
+
+
+def laad_per_bestand(bronnen, workers=None):
+    # Per bron het geladen frame met 'Locatie', of None (geen lijn-tabbladen)
+    taken = [(pad, tabbladen) for pad, _, tabbladen in bronnen]
+    missers = [t for t in taken if aanwezig_tot(*t) != STAPPEN[-1][0]]
+    geladen = {}
+    if len(missers) > 1 and sum(os.path.getsize(t[0]) for t in missers) >= PARALLEL_VANAF_BYTES:
+        with ProcessPoolExecutor(max_workers=min(len(missers), workers or os.cpu_count() or 1)) as pool:
+            geladen = dict(zip(missers, pool.map(_laad_bron_taak, missers)))
+    # De rest komt uit de schijfcache (of wordt hier gelezen als er maar één mist)
+    frames = [geladen[t] if t in geladen else _laad_bron_taak(t) for t in taken]
+    return [None if df is None or df.empty else df.assign(Locatie=locatie)
+            for (_, locatie, _), df in zip(bronnen, frames)]
+
+
+def laad_werkboeken(bronnen=None, workers=None):
+    # Eén frame (schema van laad_werkboek + 'Locatie') en de overgeslagen bestanden
+    bronnen = werkboeken() if bronnen is None else bronnen
+    frames = laad_per_bestand(bronnen, workers)
+    overgeslagen = [pad for (pad, _, _), df in zip(bronnen, frames) if df is None]
+    delen = [df for df in frames if df is not None]
+    if not delen:
+        return pas_schema_toe(pd.DataFrame(columns=list(SCHEMA_BRONNEN)), SCHEMA_BRONNEN), overgeslagen
+    # concat van categories met verschillende categorieën geeft object; pas_schema_toe typeert opnieuw
+    df = pd.concat(delen, ignore_index=True).sort_values('DD-MM-YY', kind='stable', ignore_index=True)
+    return pas_schema_toe(df, SCHEMA_BRONNEN), overgeslagen
@@ -0,0 +1,202 @@
+import argparse
+import glob
+import os
+
+import pandas as pd
+from data import laad_logboek, normaliseer_product, normaliseer_producten
+from dataset import LOGBOEK_PATRONEN
+from schijfcache import bestand_versie, onthoud
+
+# Productcatalogus uit de logboeken, voor de invoerschermen (OEE.py, rodepet.py).
+# Productnummers in één schrijfwijze (data.normaliseer_product), per product en
+# machine een geleerde normsnelheid, en een prefix-boom voor het opzoeken tijdens
+# het typen. Elke knoop van de boom bewaart de meest gedraaide producten die met dat
+# begin starten, dus een zoekopdracht is alleen een wandeling over de getypte tekens.
+#
+#   cat = laad_catalogus()
+#   zoek(cat, 'INP112')                  # ['1120573', '1121007', ...]
+#   suggesties(cat, 'INP112')            # ['1120573', '1121007', ..., '112']: onbekend begin achteraan
+#   normsnelheid(cat, '1120573', '24')   # {'snelheid': 31.5, 'bron': 'gemeten', 'diensten': 14}
+#   python catalogus.py --uit catalogus.csv
+
+# --- CONFIGURATIE ---
+NORM_KWANTIEL = 0.9     # de norm is wat de machine op een goede dienst haalt, niet het gemiddelde
+MIN_DIENSTEN = 3        # minder gemeten diensten: de mediaan van de ingevoerde normsnelheid
+MAX_SUGGESTIES = 10
+
+# Bronkolom -> catalogus; de oude dagtotalen gebruiken andere namen
+KOLOMMEN = {
+    'Machine Nummer': 'Lijn', 'Machine': 'Lijn',
+    'Product Nummer': 'Product', 'Artikel': 'Product',
+    'Norm Snelheid': 'Norm Snelheid',
+    'Werkelijke Draaitijd': 'Draaitijd', 'Werkelijke Draaitijd (min)': 'Draaitijd',
+    'Totaal Geproduceerd': 'Geproduceerd',
+}
+
+
+# ==========================================
+# OPBOUWEN UIT DE LOGBOEKEN
+# ==========================================
+def logboeken(map_naam='.'):
+    return [p for patroon in LOGBOEK_PATRONEN for p in sorted(glob.glob(os.path.join(map_naam, patroon)))]
+
+
+def _diensten(bestanden):
+    delen = []
+    for pad in bestanden:
+        df = laad_logboek(pad)
+        df = df[[c for c in KOLOMMEN if c in df.columns]].rename(columns=KOLOMMEN)
+        delen.append(df.reindex(columns=['Lijn', 'Product', 'Norm Snelheid', 'Draaitijd', 'Geproduceerd']))
+    if not delen:
+        return pd.DataFrame({'Lijn': pd.Series(dtype=object), 'Product': pd.Series(dtype=object),
+                             'Norm Snelheid': pd.Series(dtype='float64'), 'Snelheid': pd.Series(dtype='float64')})
+    df = pd.concat([d.astype({'Lijn': object, 'Product': object}) for d in delen], ignore_index=True)
+    df['Lijn'] = df['Lijn'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    df['Product'] = normaliseer_producten(df['Product']).astype(object)
+    df = df.dropna(subset=['Product'])
+    # Werkelijke snelheid (stuks per draaiminuut) van de dienst
+    draaitijd = pd.to_numeric(df['Draaitijd'], errors='coerce').astype('float64')
+    geproduceerd = pd.to_numeric(df['Geproduceerd'], errors='coerce').astype('float64')
+    df['Snelheid'] = (geproduceerd / draaitijd).where((draaitijd > 0) & (geproduceerd > 0))
+    df['Norm Snelheid'] = pd.to_numeric(df['Norm Snelheid'], errors='coerce').astype('float64')
+    df['Norm Snelheid'] = df['Norm Snelheid'].where(df['Norm Snelheid'] > 0)
+    return df[['Lijn', 'Product', 'Norm Snelheid', 'Snelheid']]
+
+
+def _normen(df, sleutels):
+    # Per groep: genoeg gemeten diensten -> het kwantiel van de werkelijke snelheid,
+    # anders de mediaan van wat er als normsnelheid is ingevoerd
+    groepen = df.groupby(sleutels)
+    tabel = pd.DataFrame({'gemeten': groepen['Snelheid'].count(), 'kwantiel': groepen['Snelheid'].quantile(NORM_KWANTIEL),
+                          'ingevoerd': groepen['Norm Snelheid'].count(), 'mediaan': groepen['Norm Snelheid'].median()})
+    normen = {}
+    for sleutel, gemeten, kwantiel, ingevoerd, mediaan in tabel.itertuples():
+        if gemeten >= MIN_DIENSTEN:
+            normen[sleutel] = {'snelheid': round(kwantiel, 1), 'bron': 'gemeten', 'diensten': int(gemeten)}
+        elif ingevoerd:
+            normen[sleutel] = {'snelheid': round(mediaan, 1), 'bron': 'ingevoerd', 'diensten': int(ingevoerd)}
+    return normen
+
+
+def _prefixboom(volgorde):
+    # 'volgorde': meest gedraaide producten eerst. Elke knoop is een dict per teken;
+    # onder '' staan de eerste MAX_SUGGESTIES producten met dit begin
+    wortel = {}
+    for product in volgorde:
+        knoop = wortel
+        for teken in product:
+            knoop = knoop.setdefault(teken, {})
+            top = knoop.setdefault('', [])
+            if len(top) < MAX_SUGGESTIES:
+                top.append(product)
+    return wortel
+
+
+def bouw_catalogus(bestanden):
+    df = _diensten(bestanden)
+    diensten = df.groupby('Product').size().sort_values(ascending=False, kind='stable')
+    per_machine = df.groupby(['Lijn', 'Product']).size().sort_values(ascending=False, kind='stable')
+    volgorde = list(diensten.index)
+    return {
+        'volgorde': volgorde,
+        'diensten': diensten.to_dict(),
+        'per_machine': {lijn: list(groep.index.get_level_values('Product'))
+                        for lijn, groep in per_machine.groupby(level='Lijn', sort=False)},
+        # (product, lijn) en (product, None) = over alle machines
+        'normen': {**_normen(df, ['Product', 'Lijn']), **{(p, None): n for p, n in _normen(df, 'Product').items()}},
+        'boom': _prefixboom(volgorde),
+    }
+
+
+# Per proces de laatst geladen catalogus, zodat een rerun van een invoerscherm niet elke keer van schijf leest
+_GELADEN = {}
+
+
+def laad_catalogus(map_naam='.'):
+    # Eén keer per versie van de logboeken opgebouwd, voor alle processen (schijfcache)
+    bestanden = logboeken(map_naam)
+    versie = repr(bestand_versie(bestanden))
+    if versie not in _GELADEN:
+        _GELADEN.clear()
+        _GELADEN[versie] = onthoud(bouw_catalogus, bestanden, bestanden=bestanden)
+    return _GELADEN[versie]
+
+
+# ==========================================
+# OPZOEKEN
+# ==========================================
+def zoek(cat, tekst, n=MAX_SUGGESTIES):
+    # Producten die beginnen met de (genormaliseerde) tekst, meest gedraaide eerst
+    begin = normaliseer_product(tekst) or ''
+    if not begin:
+        return cat['volgorde'][:n]
+    knoop = cat['boom']
+    for teken in begin:
+        knoop = knoop.get(teken)
+        if knoop is None:
+            return []
+    return knoop[''][:n]
+
+
+def vergelijkbaar(cat, tekst, n=5, min_tekens=3):
+    # Voor een onbekend nummer (tikfout, ander voorvoegsel): bekende producten met het
+    # langste gemeenschappelijke begin, als dat begin minstens 'min_tekens' lang is
+    begin = normaliseer_product(tekst) or ''
+    knoop, gevonden = cat['boom'], []
+    for diepte, teken in enumerate(begin, start=1):
+        knoop = knoop.get(teken)
+        if knoop is None:
+            break
+        if diepte >= min_tekens:
+            gevonden = knoop['']
+    return [p for p in gevonden if p != begin][:n]
+
+
+def suggesties(cat, tekst, lijn=None, n=MAX_SUGGESTIES):
+    # Keuzes bij getypte tekst (invoerschermen): de bekende producten met dat begin,
+    # wat op deze machine gedraaid wordt eerst. De eigen producten komen uit de lijst
+    # van de machine (niet uit de top van zoek, daar vallen ze buiten), daarna wordt
+    # aangevuld met zoek en pas dan afgekapt. Het getypte nummer zelf voorop als het
+    # bekend is en anders achteraan (nieuw product)
+    getypt = normaliseer_product(tekst)
+    if getypt is None:
+        return []
+    eigen = [p for p in cat['per_machine'].get(str(lijn), []) if p.startswith(getypt)][:n]
+    gevonden = [p for p in dict.fromkeys(eigen + zoek(cat, getypt, n)) if p != getypt][:n]
+    return [getypt] + gevonden if getypt in cat['diensten'] else gevonden + [getypt]
+
+
+def label(cat, product):
+    diensten = cat['diensten'].get(product)
+    if not diensten:
+        return f"{product} (nieuw)"
+    return f"{product} ({diensten} {'dienst' if diensten == 1 else 'diensten'})"
+
+
+def normsnelheid(cat, product, lijn=None):
+    # Geleerde norm voor dit product op deze machine, anders over alle machines (of None)
+    product = normaliseer_product(product)
+    if product is None:
+        return None
+    return cat['normen'].get((product, str(lijn))) or cat['normen'].get((product, None))
+
+
+# ==========================================
+# COMMAND LINE (OVERZICHT)
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Productcatalogus met geleerde normsnelheden uit de logboeken")
+    parser.add_argument('--map', default='.', help="Map met de logboeken")
+    parser.add_argument('--uit', default='catalogus.csv')
+    args = parser.parse_args(argv)
+
+    cat = laad_catalogus(args.map)
+    rijen = [{'Product': product, 'Lijn': lijn or 'alle', 'Diensten': cat['diensten'].get(product, 0),
+              'Norm Snelheid': norm['snelheid'], 'Bron': norm['bron'], 'Diensten norm': norm['diensten']}
+             for (product, lijn), norm in cat['normen'].items()]
+    pd.DataFrame(rijen).to_csv(args.uit, sep=';', index=False, decimal=',')
+    print(f"{len(cat['volgorde'])} producten, {len(rijen)} normen -> {os.path.abspath(args.uit)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+import argparse
+import io
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATIE ---
+WERKBOEK_BESTAND = 'Data Lijnen boven OEE .xlsx'
+# Tabbladen met alleen een lijnnummer als naam ('24', '13'); 'inzicht 24' e.d. niet
+LIJN_TABBLAD_PATROON = r'^\d+$'
+# Artikelcode-voorvoegsels vóór het productnummer: 'INP1120573' is product 1120573
+PRODUCT_VOORVOEGSELS = ['INP']
+
+# ==========================================
+# DTYPE SCHEMA
+# ==========================================
+# Vaste kolomtypes voor de gecombineerde werkboek-data en de logboeken.
+# Herhalende tekst wordt een category, minuten en bezetting smalle (nullable)
+# integers en percentages float32. Zo blijft het geheugen per Streamlit sessie
+# een fractie van de standaard object/float64 types.
+SCHEMA_WERKBOEK = {
+    'Week': 'UInt8',
+    'DD-MM-YY': 'datetime',
+    'Datum': 'category',
+    'OEE': 'float32',
+    'Gemiddelde': 'float32',
+    'Bandleidster': 'category',
+    'Hoeveelheid': 'float32',
+    'Product': 'category',
+    # Bezetting ontbreekt vaak in het werkboek; een nullable UInt8 met NA breekt de
+    # hover_data van plotly express, dus hier float32 (logboeken gebruiken wel UInt8)
+    'Aantal personen': 'float32',
+    'Lijn': 'category',
+}
+
+SCHEMA_LOGBOEK = {
+    'Datum': 'datetime',
+    'Machine Nummer': 'category',
+    'Machine Soort': 'category',
+    'Bandleider': 'category',
+    'Aantal Mensen': 'UInt8',
+    'Product Nummer': 'category',
+    'Norm Snelheid': 'float32',
+    'Totaal Diensttijd': 'Int16',
+    'Pauze': 'Int16',
+    'Beschikbaarheid %': 'float32',
+    'Prestatie %': 'float32',
+    'Kwaliteit %': 'float32',
+    'OEE %': 'float32',
+    'Geplande Tijd': 'Int16',
+    'Werkelijke Draaitijd': 'Int16',
+    'Theoretische Max Output': 'float32',
+    'Totaal Geproduceerd': 'Int32',
+    'Goede Producten': 'Int32',
+    'Foute Producten': 'Int32',
+    'Stilstand Opstart': 'Int16',
+    'Stilstand Ombouw': 'Int16',
+    'Stilstand Schoonmaak': 'Int16',
+    'Stilstand Monteur': 'Int16',
+    'Stilstand QC': 'Int16',
+    'Stilstand Product': 'Int16',
+    'Stilstand Divers': 'Int16',
+}
+
+# Kolommen die als tekst ingelezen moeten worden (anders maakt pandas er floats van)
+LOGBOEK_TEKST_KOLOMMEN = {'Machine Nummer': str, 'Product Nummer': str, 'Machine': str, 'Artikel': str}
+
+# Kolomvolgorde per logboekversie. v5 is ook het formaat van rodepet.py's
+# dagtotalen_definitief, v6 voegt de diensttijd en geplande stilstanden toe (OEE.py).
+# 'dagtotalen' is de oudere opmaak van hegron_oee_dagtotalen.csv.
+LOGBOEK_VERSIES = {
+    'v5': [
+        'Datum', 'Machine Nummer', 'Machine Soort', 'Bandleider', 'Aantal Mensen', 'Product Nummer',
+        'Norm Snelheid', 'Beschikbaarheid %', 'Prestatie %', 'Kwaliteit %', 'OEE %', 'Geplande Tijd',
+        'Werkelijke Draaitijd', 'Theoretische Max Output', 'Totaal Geproduceerd', 'Goede Producten',
+        'Foute Producten', 'Stilstand Monteur', 'Stilstand QC', 'Stilstand Product', 'Stilstand Divers',
+        'Opmerking',
+    ],
+    'v6': [
+        'Datum', 'Machine Nummer', 'Machine Soort', 'Bandleider', 'Aantal Mensen', 'Product Nummer',
+        'Norm Snelheid', 'Totaal Diensttijd', 'Pauze', 'Beschikbaarheid %', 'Prestatie %', 'Kwaliteit %',
+        'OEE %', 'Geplande Tijd', 'Werkelijke Draaitijd', 'Theoretische Max Output', 'Totaal Geproduceerd',
+        'Goede Producten', 'Foute Producten', 'Stilstand Opstart', 'Stilstand Ombouw',
+        'Stilstand Schoonmaak', 'Stilstand Monteur', 'Stilstand QC', 'Stilstand Product',
+        'Stilstand Divers', 'Opmerking',
+    ],
+    'dagtotalen': [
+        'Datum', 'Machine', 'Bandleider', 'Artikel', 'Totale Diensttijd (min)', 'Werkelijke Draaitijd (min)',
+        'Geplande Stilstand (min)', 'Ongeplande Stilstand (min)', 'Totaal Geproduceerd', 'Foute Producten',
+        'Goede Producten', 'Beschikbaarheid %', 'Prestatie %', 'Kwaliteit %', 'OEE %',
+    ],
+}
+
+
+def detecteer_versie(kolommen):
+    # Versie met de minste ontbrekende + extra kolommen (v6 bevat alle v5 kolommen,
+    # dus alleen overlap tellen zou altijd v6 geven); bij gelijkspel de nieuwste
+    kolommen = set(kolommen)
+    afstand = {versie: len(kolommen ^ set(cols)) for versie, cols in LOGBOEK_VERSIES.items()}
+    return min(sorted(afstand, reverse=True), key=afstand.get)
+
+
+def naar_numeriek(reeks):
+    # Komma-decimalen uit Excel/CSV ('72,5') omzetten naar punten
+    if reeks.dtype == 'object' or pd.api.types.is_string_dtype(reeks):
+        reeks = reeks.astype(str).str.replace(',', '.')
+    return pd.to_numeric(reeks, errors='coerce')
+
+
+def pas_schema_toe(df, schema):
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'datetime':
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        elif dtype == 'category':
+            df[col] = df[col].astype('category')
+        elif dtype.startswith(('Int', 'UInt')):
+            # Nullable integers accepteren geen fracties: eerst afronden
+            df[col] = naar_numeriek(df[col]).round().astype(dtype)
+        else:
+            df[col] = naar_numeriek(df[col]).astype(dtype)
+    return df
+
+
+# Eén schrijfwijze per product: 'Product: Hema dag creme' / 'HEMA DAG CREME',
+# '1120573.0' (als getal opgeslagen) / 'INP1120573' / '1120573'
+_PRODUCT_STAPPEN = [
+    (r'^PRODUCT\s*:\s*', ''),
+    (r'\s+', ' '),
+    (r'\.0+$', ''),
+    (rf"^(?:{'|'.join(PRODUCT_VOORVOEGSELS)})[\s-]*(\d+)$", r'\1'),
+]
+_PRODUCT_REGEX = [(re.compile(patroon), vervang) for patroon, vervang in _PRODUCT_STAPPEN]
+
+
+def normaliseer_product(waarde):
+    if waarde is None or pd.isna(waarde):
+        return None
+    tekst = str(waarde).strip().upper()
+    for patroon, vervang in _PRODUCT_REGEX:
+        tekst = patroon.sub(vervang, tekst)
+    return tekst or None
+
+
+def normaliseer_producten(reeks):
+    # Gevectoriseerde variant van normaliseer_product (zelfde stappen); lege tekst wordt NA
+    tekst = reeks.astype('string').str.strip().str.upper()
+    for patroon, vervang in _PRODUCT_STAPPEN:
+        tekst = tekst.str.replace(patroon, vervang, regex=True)
+    return tekst.where(tekst != '')
+
+
+def verwijder_lege_categorieen(df):
+    # Na het wegfilteren van rijen blijven ongebruikte categorieën anders bestaan
+    for col in df.select_dtypes('category').columns:
+        df[col] = df[col].cat.remove_unused_categories()
+    return df
+
+
+# ==========================================
+# LADEN
+# ==========================================
+def lijn_tabbladen(sheet_names, patroon=LIJN_TABBLAD_PATROON):
+    return [s for s in sheet_names if re.match(patroon, str(s).strip())]
+
+
+# Het laden van het werkboek in vier stappen; pijplijn.py bewaart de uitkomst van elke
+# stap apart in de schijfcache. Een aangepaste stap rekent alleen zichzelf en de
+# stappen erna opnieuw uit
+def lees_tabbladen(file_path=WERKBOEK_BESTAND, tabbladen=None):
+    # Zonder 'tabbladen' worden de lijn-tabbladen uit de tabbladnamen afgeleid
+    all_sheets = []
+    xls = pd.ExcelFile(file_path)
+    if tabbladen is None:
+        tabbladen = lijn_tabbladen(xls.sheet_names)
+    for sheet in tabbladen:
+        if sheet in xls.sheet_names:
+            df = pd.read_excel(xls, sheet_name=sheet)
+            df['Lijn'] = str(sheet).strip()
+            if 'Bandleidster' in df.columns:
+                df['Bandleidster'] = df['Bandleidster'].astype(str)
+            all_sheets.append(df)
+
+    if not all_sheets:
+        raise ValueError(f"Geen lijn-tabbladen gevonden in {file_path}")
+    return pd.concat(all_sheets, ignore_index=True)
+
+
+def typeer_werkboek(df):
+    # Als tekst ingevoerde datums zijn DD-MM-YY; een hoeveelheid als '12.500' heeft een
+    # punt als duizendtal-scheider (naar_numeriek zou er 12,5 van maken)
+    df = df.copy()
+    if 'DD-MM-YY' in df.columns and df['DD-MM-YY'].dtype == 'object':
+        df['DD-MM-YY'] = pd.to_datetime(df['DD-MM-YY'], errors='coerce', dayfirst=True, format='mixed')
+    if 'Hoeveelheid' in df.columns and df['Hoeveelheid'].dtype == 'object':
+        tekst = df['Hoeveelheid'].astype(str).str.strip()
+        duizendtallen = tekst.str.fullmatch(r'\d{1,3}(\.\d{3})+')
+        df['Hoeveelheid'] = df['Hoeveelheid'].where(~duizendtallen, tekst.str.replace('.', '', regex=False))
+    return pas_schema_toe(df, SCHEMA_WERKBOEK)
+
+
+def schoon_werkboek(df):
+    df = df.dropna(subset=['DD-MM-YY', 'OEE'])
+    # Eén keer sorteren bij het laden, dan zijn de filters per rerun alleen een masker
+    df = df.sort_values('DD-MM-YY', kind='stable', ignore_index=True)
+    return verwijder_lege_categorieen(df)
+
+
+def verrijk_werkboek(df):
+    # Regels zonder weeknummer in het werkboek krijgen de ISO week van hun datum
+    df = df.copy()
+    week = df['DD-MM-YY'].dt.isocalendar().week.astype('UInt8')
+    df['Week'] = df['Week'].fillna(week) if 'Week' in df.columns else week
+    return df
+
+
+def laad_werkboek(file_path=WERKBOEK_BESTAND, tabbladen=None):
+    # Zonder cache; pijplijn.werkboek geeft hetzelfde resultaat uit de schijfcache
+    return verrijk_werkboek(schoon_werkboek(typeer_werkboek(lees_tabbladen(file_path, tabbladen))))
+
+
+def laad_logboek(file_path):
+    df = pd.read_csv(file_path, sep=";", dtype=LOGBOEK_TEKST_KOLOMMEN)
+    return pas_schema_toe(df, SCHEMA_LOGBOEK)
+
+
+# ==========================================
+# INCREMENTEEL LEZEN (APPEND-ONLY CSV)
+# ==========================================
+# OEE.py en rodepet.py voegen regels alleen achteraan toe. Met de byte-positie van
+# de vorige keer lezen we alleen de nieuwe regels. Een staart-controle van de al
+# gelezen bytes vangt de Beheer-pagina's af die het bestand herschrijven. Een gerichte
+# wijziging midden in het bestand (wijzig_regels) kan de staart gelijk laten; die hoogt
+# daarom de generatie op (<logboek>.generatie) en een andere generatie is volledig herlezen.
+STAART_BYTES = 256
+
+
+def _staart(f, offset):
+    f.seek(max(0, offset - STAART_BYTES))
+    return f.read(min(offset, STAART_BYTES))
+
+
+def generatie(file_path):
+    # Aantal gerichte wijzigingen (wijzig_regels) van dit bestand; 0 als er nooit een was
+    try:
+        with open(file_path + '.generatie', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _verhoog_generatie(file_path):
+    nieuw = generatie(file_path) + 1
+    tmp = file_path + '.generatie.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(str(nieuw))
+    os.replace(tmp, file_path + '.generatie')
+    return nieuw
+
+
+def lees_nieuwe_regels(file_path, staat, tekst=False):
+    # staat: dict met 'offset', 'staart' en 'generatie' van de vorige aanroep (leeg = alles
+    # lezen). Geeft (nieuwe rijen, volledig_herlezen) terug en werkt de staat bij. Met
+    # 'tekst' de velden zoals ze in het bestand staan, zonder schema
+    # De generatie vóór het bestand: een wijziging daartussen wordt de volgende keer herlezen
+    huidige_generatie = generatie(file_path)
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        offset = staat.get('offset', 0)
+        grootte = os.fstat(f.fileno()).st_size
+        volledig = (offset < len(header) or offset > grootte or _staart(f, offset) != staat.get('staart')
+                    or staat.get('generatie', 0) != huidige_generatie)
+        if volledig:
+            offset = len(header)
+
+        f.seek(offset)
+        data = f.read()
+        # Een half geschreven laatste regel bewaren we voor de volgende keer
+        einde = data.rfind(b'\n') + 1
+        data = data[:einde]
+        nieuwe_offset = offset + einde
+        staat['offset'] = nieuwe_offset
+        staat['staart'] = _staart(f, nieuwe_offset)
+        staat['generatie'] = huidige_generatie
+
+    # Rijnummers gelijk aan de positie in het bestand (0 = eerste dataregel)
+    start = 0 if volledig else staat.get('rijen', 0)
+    if tekst:
+        df = pd.read_csv(io.BytesIO(header + data), sep=";", dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_csv(io.BytesIO(header + data), sep=";", dtype=LOGBOEK_TEKST_KOLOMMEN)
+    df.index = pd.RangeIndex(start, start + len(df))
+    staat['rijen'] = start + len(df)
+    return (df if tekst else pas_schema_toe(df, SCHEMA_LOGBOEK)), volledig
+
+
+def voeg_regels_toe(file_path, df):
+    # Achteraan toevoegen in de kolomvolgorde van de bestaande header. Heeft het
+    # bestand nog een oudere opmaak zonder (een deel van) de nieuwe kolommen, dan
+    # wordt het één keer herschreven met de extra kolommen (leeg voor oude regels)
+    if not os.path.isfile(file_path):
+        df.to_csv(file_path, index=False, sep=";")
+        return
+    with open(file_path, encoding='utf-8') as f:
+        header = f.readline().rstrip('\r\n').split(';')
+    if set(df.columns) <= set(header):
+        df.reindex(columns=header).to_csv(file_path, mode='a', header=False, index=False, sep=";")
+        return
+    oud = pd.read_csv(file_path, sep=";", dtype=str, keep_default_na=False)
+    kolommen = list(df.columns) + [k for k in header if k not in df.columns]
+    tmp = file_path + '.tmp'
+    pd.concat([oud, df.astype(str)], ignore_index=True).reindex(columns=kolommen).to_csv(tmp, index=False, sep=";")
+    os.replace(tmp, file_path)
+
+
+# ==========================================
+# GERICHT WIJZIGEN (BEHEER)
+# ==========================================
+# Een wijziging in de Beheer-pagina's raakt bijna altijd de laatste dagen. In plaats van
+# het hele logboek te herschrijven wordt alleen het stuk vanaf de eerste gewijzigde regel
+# opnieuw geschreven; de rest van het bestand blijft staan.
+STAART_BLOK = 1 << 16
+
+
+def _regelstarts(data):
+    # Byte-posities (in 'data') waar een regel begint: na een newline die niet binnen
+    # aanhalingstekens valt. 'data' eindigt op een regeleinde, dus van achteren geteld
+    # staat er na een echt regeleinde een even aantal aanhalingstekens
+    b = np.frombuffer(data, dtype=np.uint8)
+    na = np.cumsum((b == ord('"'))[::-1])[::-1]
+    starts = np.flatnonzero((b == ord('\n')) & (na % 2 == 0)) + 1
+    return starts[starts < len(b)]
+
+
+def _positie_van_regel(f, grootte, rij, totaal):
+    # Byte-positie van dataregel 'rij'. Met het totaal aantal regels wordt alleen de staart
+    # gelezen (blokken van achteren), anders het hele bestand
+    if totaal is not None and rij >= totaal:
+        return grootte
+    blok = STAART_BLOK if totaal is not None else grootte
+    while True:
+        begin = max(0, grootte - blok)
+        f.seek(begin)
+        starts = _regelstarts(f.read(grootte - begin))
+        if begin == 0:
+            # De eerste start is die na de header: dataregel 0
+            return int(starts[rij]) if rij < len(starts) else grootte
+        if len(starts) >= totaal - rij:
+            return begin + int(starts[len(starts) - (totaal - rij)])
+        blok *= 4
+
+
+def als_tekst(waarde):
+    # Waarde zoals pandas hem in het logboek zou schrijven
+    if waarde is None or waarde is pd.NA or (isinstance(waarde, float) and waarde != waarde):
+        return ''
+    if isinstance(waarde, pd.Timestamp):
+        return waarde.strftime('%Y-%m-%d')
+    if isinstance(waarde, float) and waarde.is_integer():
+        return str(int(waarde))
+    return str(waarde)
+
+
+def wijzig_regels(file_path, wijzigingen=None, verwijderd=(), leesstaat=None, ingevoegd=None):
+    # wijzigingen: {rijnummer: {kolom: waarde}}, verwijderd: rijnummers; rijnummers zoals in
+    # lees_nieuwe_regels (0 = eerste dataregel). ingevoegd: {rijnummer: {kolom: waarde}},
+    # rijnummers ná het verwijderen (bijv. een verwijderde regel terugzetten). Een 'leesstaat'
+    # die tot het einde gelezen had, wijst daarna naar de eerste gewijzigde regel: de volgende
+    # lees_nieuwe_regels levert dan alleen de herschreven staart (vanaf die rij) opnieuw.
+    # Geeft de staart vóór de wijziging als tekst (index = rijnummer), of None
+    wijzigingen, ingevoegd = wijzigingen or {}, ingevoegd or {}
+    rijen = set(wijzigingen) | set(verwijderd) | set(ingevoegd)
+    if not rijen:
+        return None
+    eerste = min(rijen)
+    with open(file_path, 'r+b') as f:
+        header = f.readline()
+        grootte = os.fstat(f.fileno()).st_size
+        bijgewerkt = leesstaat is not None and leesstaat.get('offset') == grootte and 'rijen' in leesstaat
+        positie = _positie_van_regel(f, grootte, eerste, leesstaat['rijen'] if bijgewerkt else None)
+
+        f.seek(positie)
+        df = pd.read_csv(io.BytesIO(header + f.read()), sep=";", dtype=str, keep_default_na=False)
+        df.index = pd.RangeIndex(eerste, eerste + len(df))
+        oud = df.copy()
+        for rij, velden in wijzigingen.items():
+            for kolom, waarde in velden.items():
+                if kolom in df.columns and rij in df.index:
+                    df.at[rij, kolom] = als_tekst(waarde)
+        df = df.drop(index=[r for r in verwijderd if r in df.index])
+        if ingevoegd:
+            delen = df.to_dict('records')
+            for rij in sorted(ingevoegd):
+                delen.insert(rij - eerste, {k: als_tekst(ingevoegd[rij].get(k)) for k in df.columns})
+            df = pd.DataFrame(delen, columns=df.columns)
+
+        f.seek(positie)
+        f.write(df.to_csv(index=False, header=False, sep=";").encode('utf-8'))
+        f.truncate()
+        # Andere lezers herlezen volledig; de eigen leesstaat alleen vanaf de gewijzigde regel
+        nieuwe_generatie = _verhoog_generatie(file_path)
+        if bijgewerkt:
+            leesstaat.update(offset=positie, staart=_staart(f, positie), rijen=eerste, generatie=nieuwe_generatie)
+        elif leesstaat is not None:
+            leesstaat.clear()
+    return oud
+
+
+def lees_opnieuw_vanaf(file_path, leesstaat, rij):
+    # Leesstand terug naar dataregel 'rij': de volgende lees_nieuwe_regels levert de regels
+    # vanaf daar opnieuw (bijv. na een wijziging door een ander dan de lezer zelf)
+    with open(file_path, 'rb') as f:
+        grootte = os.fstat(f.fileno()).st_size
+        totaal = leesstaat.get('rijen') if leesstaat.get('offset') == grootte else None
+        positie = _positie_van_regel(f, grootte, rij, totaal)
+        leesstaat.update(offset=positie, staart=_staart(f, positie), rijen=rij, generatie=generatie(file_path))
+
+
+# ==========================================
+# STILSTAND TABBLAD (inzicht)
+# ==========================================
+STILSTAND_TABBLAD = 'inzicht 24'
+STILSTAND_TREFWOORDEN = ['Pauze', 'Opstart', 'Monteur', 'QA', 'product', 'Ombouw', 'Schoonmake', 'Diversen']
+
+
+def laad_stilstand_tab(file_path=WERKBOEK_BESTAND, sheet=STILSTAND_TABBLAD, max_rijen=54):
+    df = pd.read_excel(file_path, sheet_name=sheet)
+
+    # --- DATA OPSCHONEN (REGEL 54) ---
+    df = df.iloc[:max_rijen]
+    df.columns = df.columns.astype(str).str.strip()
+
+    # --- DATUM FIX ---
+    if 'DD-MM-YY' not in df.columns:
+        raise KeyError("Kolom 'DD-MM-YY' niet gevonden.")
+    df['Datum_Schoon'] = pd.to_datetime(df['DD-MM-YY'], dayfirst=True, errors='coerce')
+    if df['Datum_Schoon'].isna().all():
+        df['Datum_Schoon'] = df['DD-MM-YY'].astype(str).apply(lambda x: x[2:] if len(str(x)) > 8 else x)
+        df['Datum_Schoon'] = pd.to_datetime(df['Datum_Schoon'], dayfirst=True, errors='coerce')
+
+    df = df.dropna(subset=['Datum_Schoon'])
+    df = df.sort_values('Datum_Schoon')
+    df['Week'] = df['Datum_Schoon'].dt.isocalendar().week
+
+    # --- FLEXIBELE KOLOM DETECTIE ---
+    bestaande_kolommen = []
+    for keyword in STILSTAND_TREFWOORDEN:
+        found_col = [c for c in df.columns if keyword.lower() in c.lower()]
+        if found_col:
+            real_col = found_col[0]
+            df[real_col] = pd.to_numeric(df[real_col], errors='coerce').fillna(0)
+            bestaande_kolommen.append(real_col)
+
+    return df, bestaande_kolommen
+
+
+# ==========================================
+# CONTROLE (INCREMENTEEL LEZEN)
+# ==========================================
+def controleer_incrementeel(voorbeeld='hegron_oee_logboek_v5.csv', rijen=30, rij=4):
+    # Een lezer die bij is, moet een gerichte wijziging midden in het logboek zien, ook
+    # als de regel even lang blijft en ver voor de staart ligt. Geeft een lijst fouten
+    fouten = []
+    with tempfile.TemporaryDirectory() as map_naam:
+        pad = os.path.join(map_naam, os.path.basename(voorbeeld))
+        bron = pd.read_csv(voorbeeld, sep=";", dtype=str, keep_default_na=False)
+        bron = bron.iloc[np.arange(rijen) % len(bron)].reset_index(drop=True)
+        bron['OEE %'] = '50.5'
+        bron.to_csv(pad, index=False, sep=";")
+        lezer, schrijver = {}, {}
+        lees_nieuwe_regels(pad, lezer)
+        lees_nieuwe_regels(pad, schrijver)
+        wijzig_regels(pad, {rij: {'OEE %': '60.5'}}, leesstaat=schrijver)
+
+        df, volledig = lees_nieuwe_regels(pad, lezer)
+        if not volledig or df.loc[rij, 'OEE %'] != 60.5:
+            fouten.append(f"lezer ziet de wijziging van rij {rij} niet (volledig={volledig})")
+        df, volledig = lees_nieuwe_regels(pad, schrijver)
+        if volledig or df.index[0] != rij or df.loc[rij, 'OEE %'] != 60.5:
+            fouten.append("de eigen leesstaat van de schrijver leest niet alleen de gewijzigde staart")
+        _, volledig = lees_nieuwe_regels(pad, lezer)
+        if volledig:
+            fouten.append("een bijgewerkte lezer leest opnieuw alles")
+    return fouten
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Controles van het lezen en gericht wijzigen van logboeken")
+    parser.add_argument('--controleer', action='store_true', help="Incrementeel lezen na een wijziging midden in het bestand")
+    args = parser.parse_args(argv)
+    if args.controleer:
+        fouten = controleer_incrementeel()
+        print("\n".join(fouten) or "Incrementeel lezen: in orde")
+        raise SystemExit(len(fouten))
+    parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+import glob
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from afwijkingen import afwijkende_diensten, scoor_incrementeel
+from archief import ARCHIEF_MAP, MANIFEST, archief_lijnen, grens, lees, lees_manifest
+
+from bronnen import SCHEMA_BRONNEN, laad_werkboeken, werkboeken_voor
+from data import detecteer_versie, pas_schema_toe
+from dataset import DATASET_VERSIE, SCHEMA_DATASET, bronbestanden, synchroniseer
+from profiel import importeer
+from schijfcache import bestand_versie, onthoud
+
+# Query laag op een embedded DuckDB database. De werkboeken, alle logboekversies en
+# de dagtotalen zijn SQL views; filters en aggregaties worden door DuckDB (met
+# meerdere threads) uitgevoerd en het resultaat komt terug als Arrow tabel.
+#
+#   con = verbind()
+#   tabel = werkboek_selectie(con, lijnen=['24', '25'], van='2025-11-01')
+#   df = tabel.to_pandas()
+
+# --- CONFIGURATIE ---
+LOGBOEK_PATROON = 'hegron_oee_logboek_v*.csv'
+MAX_SELECTIES = 16   # views per selectie die sessies delen (dataset_view)
+DAGTOTALEN_BESTAND = 'hegron_oee_dagtotalen_definitief.csv'
+
+# Tekstkolommen die DuckDB anders als getal zou herkennen
+LOGBOEK_TEKST_TYPES = {'Machine Nummer': 'VARCHAR', 'Product Nummer': 'VARCHAR', 'Bandleider': 'VARCHAR', 'Opmerking': 'VARCHAR'}
+
+
+def _q(naam):
+    # Kolom- en viewnamen met spaties of % quoten
+    return '"' + naam.replace('"', '""') + '"'
+
+
+def _lees_csv(pad):
+    types = ', '.join(f"{_q(k)}: '{v}'" for k, v in LOGBOEK_TEKST_TYPES.items())
+    pad_sql = pad.replace("'", "''")
+    return f"read_csv('{pad_sql}', delim=';', header=true, dateformat='%Y-%m-%d', types={{{types}}})"
+
+
+# ==========================================
+# VIEWS
+# ==========================================
+def _registreer_werkboek(con, bronnen):
+    pa = importeer('pyarrow')
+    # Alle werkboeken uit het register (kolom 'Locatie'). Het eerste serverproces leest
+    # een werkboek; de andere lezen het Arrow resultaat uit de gedeelde cache
+    df, _ = laad_werkboeken(bronnen)
+    # Als echte DuckDB tabel (kolomopslag, gecomprimeerd) zodat elke cursor hem ziet;
+    # het pandas frame is daarna niet meer nodig
+    con.register('werkboek_arrow', pa.Table.from_pandas(df, preserve_index=False))
+    con.execute("CREATE OR REPLACE TABLE werkboek AS SELECT * FROM werkboek_arrow")
+    con.unregister('werkboek_arrow')
+    # Elk tabblad is ook los op te vragen als view, bijv. "lijn_24"
+    for lijn in df['Lijn'].cat.categories:
+        con.execute(f"CREATE OR REPLACE VIEW {_q('lijn_' + str(lijn))} AS SELECT * FROM werkboek WHERE Lijn = '{lijn}'")
+
+
+def _registreer_logboeken(con, map_naam):
+    # Views lezen de CSV bij elke query opnieuw, dus nieuw toegevoegde regels zijn direct zichtbaar
+    delen = []
+    for pad in sorted(glob.glob(os.path.join(map_naam, LOGBOEK_PATROON))):
+        versie = os.path.splitext(os.path.basename(pad))[0].rsplit('_', 1)[-1]
+        con.execute(f"CREATE OR REPLACE VIEW {_q('logboek_' + versie)} AS SELECT * FROM {_lees_csv(pad)}")
+        delen.append((f"logboek_{versie}", versie))
+
+    dagtotalen = os.path.join(map_naam, DAGTOTALEN_BESTAND)
+    if os.path.isfile(dagtotalen):
+        con.execute(f"CREATE OR REPLACE VIEW dagtotalen AS SELECT * FROM {_lees_csv(dagtotalen)}")
+        delen.append(('dagtotalen', 'dagtotalen'))
+
+    # Alle logboeken samen; kolommen die in een oudere versie ontbreken worden NULL
+    if delen:
+        union = ' UNION ALL BY NAME '.join(f"SELECT *, '{bron}' AS bron FROM {_q(view)}" for view, bron in delen)
+        con.execute(f"CREATE OR REPLACE VIEW logboek AS {union}")
+
+
+def verbind(werkboek=None, map_naam='.', threads=None):
+    # werkboek None: alle werkboeken uit het bronnenregister (bronnen.py)
+    duckdb = importeer('duckdb')
+    con = duckdb.connect(':memory:')
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+    bronnen = werkboeken_voor(werkboek)
+    if bronnen:
+        _registreer_werkboek(con, bronnen)
+    _registreer_logboeken(con, map_naam)
+    return con
+
+
+def ververs_dataset(con, staat, werkboek=None, map_naam='.'):
+    # Samengevoegde dataset (werkboek + logboeken, zie dataset.py) als tabel 'dataset'.
+    # Alleen bij nieuwe of gewijzigde bronnen wordt de tabel vervangen. Het samenvoegen
+    # gebeurt per bronversie één keer voor alle serverprocessen (gedeelde schijfcache)
+    bestanden = bronbestanden(werkboek, map_naam)
+    versie = [DATASET_VERSIE] + bestand_versie(bestanden + [os.path.join(ARCHIEF_MAP, MANIFEST)])
+    gewijzigd = staat.get('versie') != versie
+    if gewijzigd or 'dataset' not in views(con):
+        df = onthoud(lambda: synchroniseer(staat, werkboek, map_naam)[0], bestanden=bestanden,
+                     cache_naam=f"dataset:{DATASET_VERSIE}:{os.path.abspath(werkboek) if werkboek else 'register'}:{os.path.abspath(map_naam)}")
+        staat['versie'] = versie
+        # Met een archief (archief.py) houdt DuckDB alleen de hete staart vast;
+        # afgesloten maanden worden per selectie uit de Parquet partities gelezen
+        archief_grens = grens('dataset')
+        if archief_grens is not None:
+            df = df[df['DD-MM-YY'] >= archief_grens]
+        pa = importeer('pyarrow')
+        cur = con.cursor()
+        cur.register('dataset_arrow', pa.Table.from_pandas(df, preserve_index=False))
+        cur.execute("CREATE OR REPLACE TABLE dataset AS SELECT * FROM dataset_arrow")
+        cur.unregister('dataset_arrow')
+    return gewijzigd
+
+
+def views(con):
+    return [r[0] for r in con.execute("SELECT table_name FROM information_schema.tables ORDER BY table_name").fetchall()]
+
+
+def logboek_versie(con, view):
+    kolommen = [r[0] for r in con.execute(f"DESCRIBE {_q(view)}").fetchall()]
+    return detecteer_versie(kolommen)
+
+
+# ==========================================
+# QUERIES
+# ==========================================
+def vraag(con, sql, parameters=None):
+    # Eigen cursor per aanroep: één gedeelde verbinding kan zo door meerdere
+    # Streamlit sessies (threads) tegelijk gebruikt worden
+    return con.cursor().execute(sql, parameters or []).fetch_arrow_table()
+
+
+def _waar(lijnen=None, van=None, tot=None, lijn_kolom='Lijn', datum_kolom='DD-MM-YY', extra=None):
+    voorwaarden, parameters = [], []
+    if lijnen is not None:
+        # Een lege lijst betekent hier "geen lijnen" (zoals isin([])), niet "alles"
+        voorwaarden.append(f"list_contains(?, CAST({_q(lijn_kolom)} AS VARCHAR))")
+        parameters.append([str(l) for l in lijnen])
+    if van is not None:
+        voorwaarden.append(f"{_q(datum_kolom)} >= CAST(? AS DATE)")
+        parameters.append(str(van)[:10])
+    if tot is not None:
+        voorwaarden.append(f"{_q(datum_kolom)} <= CAST(? AS DATE)")
+        parameters.append(str(tot)[:10])
+    for kolom, waarden in (extra or {}).items():
+        if waarden:
+            voorwaarden.append(f"list_contains(?, {_q(kolom)})")
+            parameters.append(list(waarden))
+    return (' WHERE ' + ' AND '.join(voorwaarden)) if voorwaarden else '', parameters
+
+
+def selectie(con, view, kolommen=None, lijnen=None, van=None, tot=None, lijn_kolom='Lijn', datum_kolom='DD-MM-YY', extra=None):
+    velden = ', '.join(_q(k) for k in kolommen) if kolommen else '*'
+    waar, parameters = _waar(lijnen, van, tot, lijn_kolom, datum_kolom, extra)
+    return vraag(con, f"SELECT {velden} FROM {_q(view)}{waar} ORDER BY {_q(datum_kolom)}", parameters)
+
+
+def werkboek_selectie(con, lijnen=None, van=None, tot=None, kolommen=None, bandleidsters=None, bezetting=None, view='werkboek'):
+    extra = {'Bandleidster': bandleidsters, 'Aantal personen': bezetting}
+    return selectie(con, view, kolommen, lijnen, van, tot, extra=extra)
+
+
+def werkboek_frame(con, **filters):
+    # Arrow -> pandas met hetzelfde schema als laad_werkboeken (category, float32, ...)
+    return pas_schema_toe(werkboek_selectie(con, **filters).to_pandas(), SCHEMA_BRONNEN)
+
+
+def dataset_frame(con, lijnen=None, van=None, tot=None):
+    heet = werkboek_selectie(con, lijnen, van, tot, view='dataset').to_pandas()
+    archief_grens = grens('dataset')
+    if archief_grens is None or (van is not None and pd.Timestamp(van) >= archief_grens):
+        return pas_schema_toe(heet, SCHEMA_DATASET)
+
+    # Alleen de partities (jaar/maand/lijn) binnen de selectie worden geopend
+    laatste = archief_grens - pd.Timedelta(days=1)
+    historie = lees('dataset', van, laatste if tot is None else min(pd.Timestamp(tot), laatste), lijnen)
+    if historie is None or historie.empty:
+        return pas_schema_toe(heet, SCHEMA_DATASET)
+    df = pd.concat([historie.astype({c: object for c in historie.select_dtypes('category')}), heet], ignore_index=True)
+    return pas_schema_toe(df.sort_values('DD-MM-YY', kind='stable', ignore_index=True), SCHEMA_DATASET)
+
+
+def dataset_afwijkingen(con, staat):
+    # Afwijkende diensten over de hele dataset (archief + hete staart), zodat de
+    # historie van een lijn niet van de gekozen periode afhangt. Eén keer per
+    # dataversie: eerst uit de gedeelde schijfcache, anders alleen de nieuwe rijen scoren
+    with staat['slot']:
+        if staat.get('afwijkingen_versie') != staat.get('versie') or 'afwijkingen' not in staat:
+            df = dataset_frame(con)
+            scoor_staat = staat.setdefault('scoor_staat', {})
+            staat['afwijkingen'] = onthoud(lambda: afwijkende_diensten(df, scoor_incrementeel(df, scoor_staat)),
+                                           cache_naam=f"afwijkingen:{staat.get('versie')}")
+            staat['afwijkingen_versie'] = staat.get('versie')
+        return staat['afwijkingen']
+
+
+def dataset_lijnen(con):
+    return sorted(set(lijnen(con, 'dataset')) | set(archief_lijnen('dataset')))
+
+
+def dataset_locaties(con):
+    # Lijn -> locatie (bronnenregister); leeg als er maar één locatie is
+    paren = con.cursor().execute(
+        'SELECT DISTINCT CAST(Lijn AS VARCHAR), CAST(Locatie AS VARCHAR) FROM dataset WHERE Locatie IS NOT NULL').fetchall()
+    return dict(paren) if len({locatie for _, locatie in paren}) > 1 else {}
+
+
+def dataset_periode(con):
+    # (eerste, laatste) datum over archief + hete staart
+    eerste, laatste = con.cursor().execute('SELECT min("DD-MM-YY"), max("DD-MM-YY") FROM dataset').fetchone()
+    info = lees_manifest().get('dataset')
+    if info and info.get('van'):
+        eerste = pd.Timestamp(info['van']) if eerste is None else min(pd.Timestamp(eerste), pd.Timestamp(info['van']))
+        if laatste is None:
+            laatste = pd.Timestamp(info['laatste'])
+    return pd.Timestamp(eerste).date(), pd.Timestamp(laatste).date()
+
+
+# ==========================================
+# GEDEELDE DATASET (ALLEEN LEZEN)
+# ==========================================
+# Eén dataset per proces in plaats van een nieuw DataFrame per sessie en rerun. De
+# sessies krijgen views: één lijn is een slice (geen kopie), meer lijnen één take in
+# datumvolgorde, gedeeld door alle sessies met dezelfde selectie. Pandas 3 werkt altijd
+# met copy-on-write: een schrijfactie kopieert alleen het eigen stuk, dus een sessie kan
+# de gedeelde data niet veranderen. Afgeleide kolommen staan als losse reeksen naast de
+# dataset (afgeleid), niet erin.
+
+# naam -> functie van de hele dataset; per dataversie één keer berekend
+AFGELEIDE_KOLOMMEN = {
+    'Bezetting (min. 1)': lambda df: df['Aantal personen'].clip(lower=1),
+}
+
+
+def gedeelde_dataset(con, staat):
+    # Per dataversie (ververs_dataset) één keer opgebouwd, gesorteerd op lijn en datum
+    with staat['slot']:
+        if staat.get('gedeeld_versie') != staat.get('versie') or 'gedeeld' not in staat:
+            df = dataset_frame(con)
+            df = df.sort_values(['Lijn', 'DD-MM-YY'], kind='stable', ignore_index=True)
+            codes = df['Lijn'].cat.codes.to_numpy()
+            grenzen = np.searchsorted(codes, np.arange(len(df['Lijn'].cat.categories) + 1))
+            staat['gedeeld'] = {
+                'df': df,
+                'datums': df['DD-MM-YY'].to_numpy(),
+                'lijnen': {str(l): (grenzen[i], grenzen[i + 1]) for i, l in enumerate(df['Lijn'].cat.categories)},
+                'afgeleid': {},
+                'selecties': OrderedDict(),
+                'slot': staat['slot'],
+            }
+            staat['gedeeld_versie'] = staat.get('versie')
+        return staat['gedeeld']
+
+
+def _posities(gedeeld, lijnen, van, tot):
+    # Rijposities van een selectie: per lijn een (start, stop) via binair zoeken op datum.
+    # Eén stuk blijft (start, stop) voor een slice; meer lijnen worden samengevoegd in datumvolgorde
+    datums = gedeeld['datums']
+    stukken = []
+    for lijn in (gedeeld['lijnen'] if lijnen is None else [str(l) for l in lijnen]):
+        if lijn not in gedeeld['lijnen']:
+            continue
+        begin, eind = gedeeld['lijnen'][lijn]
+        start = begin if van is None else begin + np.searchsorted(datums[begin:eind], np.datetime64(pd.Timestamp(van)), 'left')
+        stop = eind if tot is None else begin + np.searchsorted(datums[begin:eind], np.datetime64(pd.Timestamp(tot)), 'right')
+        if stop > start:
+            stukken.append((start, stop))
+    if len(stukken) <= 1:
+        return stukken[0] if stukken else (0, 0)
+    posities = np.concatenate([np.arange(a, b) for a, b in stukken])
+    return posities[np.argsort(datums[posities], kind='stable')]
+
+
+def dataset_view(gedeeld, lijnen=None, van=None, tot=None):
+    # Zelfde rijen als dataset_frame(con, lijnen, van, tot), op datum gesorteerd, als view
+    # op de gedeelde dataset: één lijn is een slice, meer lijnen één take. Sessies met
+    # dezelfde selectie krijgen hetzelfde (alleen-lezen) frame uit een LRU van MAX_SELECTIES
+    sleutel = (None if lijnen is None else tuple(str(l) for l in lijnen), str(van)[:10], str(tot)[:10])
+    with gedeeld['slot']:
+        if sleutel in gedeeld['selecties']:
+            gedeeld['selecties'].move_to_end(sleutel)
+            return gedeeld['selecties'][sleutel]
+
+    posities = _posities(gedeeld, lijnen, van, tot)
+    if isinstance(posities, tuple):
+        view = gedeeld['df'].iloc[posities[0]:posities[1]]
+    else:
+        view = gedeeld['df'].take(posities)
+    # Alleen de gebruikte categorieën, zoals bij dataset_frame (kopie van alleen de codes)
+    view = view.assign(**{c: view[c].cat.remove_unused_categories() for c in view.select_dtypes('category').columns})
+
+    with gedeeld['slot']:
+        gedeeld['selecties'][sleutel] = view
+        while len(gedeeld['selecties']) > MAX_SELECTIES:
+            gedeeld['selecties'].popitem(last=False)
+    return view
+
+
+def afgeleid(gedeeld, naam, view):
+    # Afgeleide kolom (AFGELEIDE_KOLOMMEN) voor de rijen van 'view'; de hele kolom wordt
+    # per dataversie één keer berekend en door alle sessies gedeeld
+    with gedeeld['slot']:
+        if naam not in gedeeld['afgeleid']:
+            gedeeld['afgeleid'][naam] = AFGELEIDE_KOLOMMEN[naam](gedeeld['df']).rename(naam)
+        reeks = gedeeld['afgeleid'][naam]
+    return reeks.take(view.index.to_numpy())
+
+
+def lijnen(con, view='werkboek'):
+    return [r[0] for r in con.cursor().execute(f"SELECT DISTINCT CAST(Lijn AS VARCHAR) FROM {_q(view)} ORDER BY 1").fetchall()]
+
+
+# --- AGGREGATIES (in DuckDB, niet in pandas) ---
+def week_per_lijn(con, lijnen=None, van=None, tot=None):
+    waar, parameters = _waar(lijnen, van, tot)
+    return vraag(con, f"""
+        SELECT Lijn, isoyear("DD-MM-YY") AS Jaar, week("DD-MM-YY") AS Week,
+               avg(OEE) AS Gemiddelde_OEE, sum(Hoeveelheid) AS Totale_Hoeveelheid, count(*) AS Dagen
+        FROM werkboek{waar}
+        GROUP BY ALL ORDER BY Lijn, Jaar, Week""", parameters)
+
+
+def logboek_per_machine(con, lijnen=None, van=None, tot=None, view='logboek'):
+    waar, parameters = _waar(lijnen, van, tot, lijn_kolom='Machine Nummer', datum_kolom='Datum')
+    return vraag(con, f"""
+        SELECT "Machine Nummer", Datum, count(*) AS Regels,
+               avg("OEE %") AS Gemiddelde_OEE,
+               sum("Totaal Geproduceerd") AS Totaal_Geproduceerd,
+               sum("Goede Producten") AS Goede_Producten,
+               sum(COALESCE("Stilstand Monteur", 0) + COALESCE("Stilstand QC", 0)
+                   + COALESCE("Stilstand Product", 0) + COALESCE("Stilstand Divers", 0)) AS Ongeplande_Stilstand
+        FROM {_q(view)}{waar}
+        GROUP BY ALL ORDER BY Datum, "Machine Nummer" """, parameters)
@@ -0,0 +1,228 @@
+import glob
+import os
+import threading
+
+import pandas as pd
+from bronnen import laad_per_bestand, werkboeken_voor
+from data import detecteer_versie, lees_nieuwe_regels, normaliseer_producten, pas_schema_toe
+
+# Eén getypeerde dataset uit drie bronnen: de werkboeken (zie bronnen.py), de logboeken
+# van OEE.py (hegron_oee_logboek_v*.csv) en de dagtotalen van rodepet.py. Elke bron wordt met
+# een kolomkaart naar de kolomnamen van het werkboek vertaald, zodat de dashboards,
+# grafieken en analyses ongewijzigd op de samengevoegde data werken.
+
+# --- CONFIGURATIE ---
+LOGBOEK_PATRONEN = ['hegron_oee_logboek_v*.csv', 'hegron_oee_dagtotalen*.csv']
+# Ophogen als het vertalen andere rijen oplevert: de gedeelde schijfcache en de
+# analyses daarop zijn per bestandsversie + deze versie
+DATASET_VERSIE = 4
+
+# ==========================================
+# KOLOMKAARTEN PER BRONVERSIE
+# ==========================================
+# bronkolom -> datasetkolom. In het werkboek is 'Hoeveelheid' het aantal goede
+# producten, dus in de logboeken 'Goede Producten' (niet 'Totaal Geproduceerd').
+_LOGBOEK_KAART = {
+    'Datum': 'DD-MM-YY',
+    'Machine Nummer': 'Lijn',
+    'Bandleider': 'Bandleidster',
+    'Product Nummer': 'Product',
+    'Aantal Mensen': 'Aantal personen',
+    'OEE %': 'OEE',
+    'Goede Producten': 'Hoeveelheid',
+    'Totaal Geproduceerd': 'Totaal Geproduceerd',
+    'Beschikbaarheid %': 'Beschikbaarheid',
+    'Prestatie %': 'Prestatie',
+    'Kwaliteit %': 'Kwaliteit',
+    # Tijden en snelheid van de dienst voor de verliesboom (verliezen.py); in het werkboek leeg
+    'Norm Snelheid': 'Norm Snelheid',
+    'Totaal Diensttijd': 'Totaal Diensttijd',
+    'Pauze': 'Pauze',
+    'Geplande Tijd': 'Geplande Tijd',
+    'Werkelijke Draaitijd': 'Werkelijke Draaitijd',
+    'Foute Producten': 'Foute Producten',
+    # Stilstand per categorie (minuten) alleen uit de logboeken; in het werkboek leeg
+    **{f"Stilstand {c}": f"Stilstand {c}" for c in ['Opstart', 'Ombouw', 'Schoonmaak', 'Monteur', 'QC', 'Product', 'Divers']},
+}
+
+KOLOM_KAARTEN = {
+    'werkboek': {c: c for c in ['DD-MM-YY', 'Week', 'Lijn', 'Locatie', 'OEE', 'Hoeveelheid', 'Bandleidster', 'Product',
+                                'Aantal personen']},
+    'v5': _LOGBOEK_KAART,
+    'v6': _LOGBOEK_KAART,
+    'dagtotalen': {**_LOGBOEK_KAART, 'Machine': 'Lijn', 'Artikel': 'Product', 'Totale Diensttijd (min)': 'Totaal Diensttijd',
+                   'Werkelijke Draaitijd (min)': 'Werkelijke Draaitijd', 'Geplande Stilstand (min)': 'Geplande Stilstand'},
+}
+
+SCHEMA_DATASET = {
+    'DD-MM-YY': 'datetime',
+    'Week': 'UInt8',
+    'Lijn': 'category',
+    'Bron': 'category',
+    'Locatie': 'category',
+    'Bandleidster': 'category',
+    'Product': 'category',
+    'Aantal personen': 'float32',
+    'OEE': 'float32',
+    'Hoeveelheid': 'float32',
+    'Totaal Geproduceerd': 'float32',
+    'Beschikbaarheid': 'float32',
+    'Prestatie': 'float32',
+    'Kwaliteit': 'float32',
+    'Norm Snelheid': 'float32',
+    'Totaal Diensttijd': 'float32',
+    'Pauze': 'float32',
+    'Geplande Tijd': 'float32',
+    'Geplande Stilstand': 'float32',
+    'Werkelijke Draaitijd': 'float32',
+    'Foute Producten': 'float32',
+    **{f"Stilstand {c}": 'float32' for c in ['Opstart', 'Ombouw', 'Schoonmaak', 'Monteur', 'QC', 'Product', 'Divers']},
+}
+
+# Bij dezelfde (datum, lijn) in meerdere bronnen wint de laagste waarde: de
+# dagelijkse invoer is het meest gedetailleerd, het werkboek is de terugval.
+# Binnen één bron wint de laatst toegevoegde regel (correcties komen achteraan).
+BRON_PRIORITEIT = {'v6': 0, 'v5': 1, 'dagtotalen': 2, 'werkboek': 3}
+
+
+# ==========================================
+# VERTALEN
+# ==========================================
+def _lijn_nummer(reeks):
+    # '24', ' 24', '24.0' -> '24'
+    return reeks.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+
+
+def vertaal(df, versie, bron):
+    kaart = KOLOM_KAARTEN[versie]
+    uit = df[[c for c in kaart if c in df.columns]].rename(columns=kaart)
+    uit = uit.assign(Lijn=_lijn_nummer(uit['Lijn']), Bron=bron, _prioriteit=BRON_PRIORITEIT[versie])
+    if 'Product' in uit.columns:
+        # Eén schrijfwijze per product over alle bronnen, anders splitst elke groupby op product
+        uit['Product'] = normaliseer_producten(uit['Product'])
+    uit = pas_schema_toe(uit, SCHEMA_DATASET)
+    if 'Week' not in uit.columns:
+        uit['Week'] = uit['DD-MM-YY'].dt.isocalendar().week.astype('UInt8')
+    return uit.dropna(subset=['DD-MM-YY', 'OEE'])
+
+
+# ==========================================
+# INCREMENTEEL SYNCHRONISEREN
+# ==========================================
+def nieuwe_staat():
+    # 'bronnen': leesstaat per bestand (offset/staart of mtime),
+    # 'delen': vertaalde rijen per bestand, 'dataset': het samengevoegde resultaat
+    return {'bronnen': {}, 'delen': {}, 'dataset': None, 'slot': threading.Lock()}
+
+
+def bronbestanden(werkboek=None, map_naam='.'):
+    # werkboek None: alle werkboeken uit het bronnenregister
+    bestanden = [pad for pad, _, _ in werkboeken_voor(werkboek)]
+    for patroon in LOGBOEK_PATRONEN:
+        bestanden += sorted(glob.glob(os.path.join(map_naam, patroon)))
+    return bestanden
+
+
+def _bron_naam(pad):
+    return os.path.splitext(os.path.basename(pad))[0].replace('hegron_oee_', '')
+
+
+def _sync_werkboeken(bronnen, staat):
+    # Een werkboek wordt als geheel vervangen, maar alleen als het bestand gewijzigd is.
+    # Gewijzigde werkboeken worden samen (parallel, zie bronnen.py) ingelezen
+    gewijzigd = []
+    for bron in bronnen:
+        leesstaat = staat['bronnen'].setdefault(bron[0], {})
+        mtime = os.path.getmtime(bron[0])
+        if leesstaat.get('mtime') != mtime:
+            gewijzigd.append(bron)
+            leesstaat['mtime'] = mtime
+    delen = {}
+    for (pad, _, _), df in zip(gewijzigd, laad_per_bestand(gewijzigd)):
+        delen[pad] = _leeg() if df is None else vertaal(df, 'werkboek', 'werkboek')
+    return delen
+
+
+def _sync_logboek(pad, leesstaat, bron):
+    # Alleen de regels sinds de vorige synchronisatie lezen; bij een herschreven
+    # bestand (Beheer pagina) komt alles opnieuw binnen en vervangt het de oude rijen.
+    # Onveranderde grootte en mtime: niets te lezen, zelfs de header niet
+    info = os.stat(pad)
+    if leesstaat.get('stat') == (info.st_size, info.st_mtime_ns):
+        return None, False
+    leesstaat['stat'] = (info.st_size, info.st_mtime_ns)
+    df_nieuw, volledig = lees_nieuwe_regels(pad, leesstaat)
+    if volledig:
+        leesstaat['versie'] = detecteer_versie(df_nieuw.columns)
+    if df_nieuw.empty and not volledig:
+        return None, False
+    return vertaal(df_nieuw, leesstaat['versie'], bron), volledig
+
+
+def _leeg():
+    return pas_schema_toe(pd.DataFrame(columns=list(SCHEMA_DATASET)), SCHEMA_DATASET)
+
+
+def _voeg_samen(delen):
+    delen = [d for d in delen if not d.empty]
+    if not delen:
+        return _leeg()
+    alles = pd.concat(delen, ignore_index=True)
+    if 'Locatie' not in alles.columns:
+        alles['Locatie'] = None  # alleen logboeken, geen werkboek geladen
+    # Logboekregels krijgen de locatie van hun lijn uit de werkboeken, als die lijn maar
+    # op één locatie voorkomt; vóór het ontdubbelen, zodat ze daarin meetellen
+    bekend = alles.dropna(subset=['Locatie'])
+    bekend = pd.DataFrame({'Lijn': bekend['Lijn'].astype(str), 'Locatie': bekend['Locatie'].astype(str)}).drop_duplicates()
+    bekend = bekend.drop_duplicates('Lijn', keep=False)
+    kaart = dict(zip(bekend['Lijn'], bekend['Locatie']))
+    alles['Locatie'] = alles['Locatie'].astype(object).fillna(alles['Lijn'].astype(str).map(kaart))
+    alles['_dag'] = alles['DD-MM-YY'].dt.normalize()
+    # Stabiel sorteren op prioriteit en daarna de eerste per (dag, lijn, locatie) houden;
+    # binnen een bron eerst de volgorde omdraaien zodat de laatste regel wint. Dezelfde
+    # lijn op twee locaties (bijv. tabblad '24' in twee werkboeken) blijft dus twee regels
+    alles = alles.iloc[::-1].sort_values('_prioriteit', kind='stable')
+    alles = alles.drop_duplicates(['_dag', 'Lijn', 'Locatie'], keep='first')
+    alles = alles.drop(columns=['_dag', '_prioriteit']).sort_values('DD-MM-YY', kind='stable', ignore_index=True)
+    # concat van categories met verschillende categorieën geeft object; opnieuw typeren
+    return pas_schema_toe(alles, SCHEMA_DATASET)
+
+
+def synchroniseer(staat, werkboek=None, map_naam='.'):
+    # Geeft (dataset, gewijzigd) terug. Ongewijzigde bronnen kosten alleen een stat()
+    with staat['slot']:
+        gewijzigd = False
+        bestanden = bronbestanden(werkboek, map_naam)
+        for pad in list(staat['delen']):
+            if pad not in bestanden:
+                del staat['delen'][pad]
+                staat['bronnen'].pop(pad, None)
+                gewijzigd = True
+
+        werkboek_bronnen = werkboeken_voor(werkboek)
+        for pad, deel in _sync_werkboeken(werkboek_bronnen, staat).items():
+            staat['delen'][pad] = deel
+            gewijzigd = True
+
+        werkboek_paden = {pad for pad, _, _ in werkboek_bronnen}
+        for pad in bestanden:
+            if pad in werkboek_paden:
+                continue
+            leesstaat = staat['bronnen'].setdefault(pad, {})
+            deel, vervang = _sync_logboek(pad, leesstaat, _bron_naam(pad))
+            if deel is None:
+                continue
+            if vervang or pad not in staat['delen']:
+                staat['delen'][pad] = deel
+            else:
+                staat['delen'][pad] = pd.concat([staat['delen'][pad], deel], ignore_index=True)
+            gewijzigd = True
+
+        if gewijzigd or staat['dataset'] is None:
+            staat['dataset'] = _voeg_samen(staat['delen'].values())
+        return staat['dataset'], gewijzigd
+
+
+def laad_dataset(werkboek=None, map_naam='.'):
+    return synchroniseer(nieuwe_staat(), werkboek, map_naam)[0]
+
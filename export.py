@@ -0,0 +1,225 @@
+import argparse
+import glob
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from profiel import importeer
+from verliezen import waterval
+
+# --- CONFIGURATIE ---
+CHUNK_RIJEN = 5000
+FORMATEN = {'xlsx': 'Excel', 'csv': 'CSV', 'parquet': 'Parquet'}
+MIME_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+# ==========================================
+# ROLLUPS
+# ==========================================
+def _week_index(df):
+    iso = df['DD-MM-YY'].dt.isocalendar()
+    return [iso.year.rename('Jaar'), iso.week.rename('Week')]
+
+
+def rollup_week_per_lijn(df):
+    return df.groupby(['Lijn'] + _week_index(df), observed=True).agg(
+        Gemiddelde_OEE=('OEE', 'mean'),
+        Totale_Hoeveelheid=('Hoeveelheid', 'sum'),
+        Dagen=('OEE', 'size'),
+    ).reset_index()
+
+
+def rollup_per_product(df):
+    return df.groupby(['Lijn', 'Product'], observed=True).agg(
+        Gemiddelde_OEE=('OEE', 'mean'),
+        Totale_Hoeveelheid=('Hoeveelheid', 'sum'),
+        Frequentie=('OEE', 'size'),
+    ).reset_index()
+
+
+def rollup_per_bandleidster(df):
+    return df.groupby(['Lijn', 'Bandleidster'], observed=True).agg(
+        Gemiddelde_OEE=('OEE', 'mean'),
+        Totale_Hoeveelheid=('Hoeveelheid', 'sum'),
+        Dagen=('OEE', 'size'),
+    ).reset_index()
+
+
+def rollup_per_bezetting(df):
+    return df.groupby(['Lijn', 'Aantal personen'], observed=True).agg(
+        Gemiddelde_OEE=('OEE', 'mean'),
+        Dagen=('OEE', 'size'),
+    ).reset_index()
+
+
+def rollup_verliezen_per_lijn(df):
+    # Verliesboom in minuten (verliezen.py); alleen diensten uit de logboeken hebben tijden
+    return waterval(df, 'Lijn').reset_index()
+
+
+def rollup_verliezen_per_maand(df):
+    return waterval(df, 'Maand').reset_index()
+
+
+ROLLUPS = {
+    'Week per lijn': rollup_week_per_lijn,
+    'Per product': rollup_per_product,
+    'Per bandleidster': rollup_per_bandleidster,
+    'Per bezetting': rollup_per_bezetting,
+    'Verliezen per lijn': rollup_verliezen_per_lijn,
+    'Verliezen per maand': rollup_verliezen_per_maand,
+}
+
+
+def maak_rollups(df, namen):
+    return {naam: ROLLUPS[naam](df) for naam in namen}
+
+
+# ==========================================
+# STREAMING SCHRIJVERS
+# ==========================================
+# Alle schrijvers lopen in blokken van CHUNK_RIJEN door het (gefilterde) frame.
+# iloc-slices zijn views, dus er wordt nooit een volledige kopie opgebouwd;
+# alleen het blok dat op dat moment geschreven wordt staat extra in het geheugen.
+def _blokken(df, chunk=CHUNK_RIJEN):
+    for start in range(0, len(df), chunk):
+        yield df.iloc[start:start + chunk]
+
+
+def schrijf_csv(df, pad, rollups=None, chunk=CHUNK_RIJEN):
+    # CSV heeft geen tabbladen: rollups komen in losse bestanden naast de export
+    with open(pad, 'w', newline='', encoding='utf-8') as f:
+        df.iloc[:0].to_csv(f, sep=';', index=False)
+        for blok in _blokken(df, chunk):
+            blok.to_csv(f, sep=';', index=False, header=False)
+    basis, _ = os.path.splitext(pad)
+    for naam, rollup in (rollups or {}).items():
+        rollup.to_csv(f"{basis}_{naam.replace(' ', '_').lower()}.csv", sep=';', index=False)
+
+
+def schrijf_parquet(df, pad, rollups=None, chunk=CHUNK_RIJEN):
+    pa = importeer('pyarrow')
+    pq = importeer('pyarrow.parquet')
+
+    schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+    with pq.ParquetWriter(pad, schema) as writer:
+        for blok in _blokken(df, chunk):
+            writer.write_table(pa.Table.from_pandas(blok, schema=schema, preserve_index=False))
+    basis, _ = os.path.splitext(pad)
+    for naam, rollup in (rollups or {}).items():
+        rollup.to_parquet(f"{basis}_{naam.replace(' ', '_').lower()}.parquet", index=False)
+
+
+def _schrijf_blad(workbook, naam, df, chunk=CHUNK_RIJEN):
+    ws = workbook.add_worksheet(naam[:31])
+    datum_fmt = workbook.add_format({'num_format': 'dd-mm-yyyy'})
+    for i, col in enumerate(df.columns):
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            ws.set_column(i, i, 12, datum_fmt)
+    ws.write_row(0, 0, [str(c) for c in df.columns])
+
+    rij = 1
+    for blok in _blokken(df, chunk):
+        # NaN/NA naar None: xlsxwriter schrijft dan een lege cel
+        waarden = blok.astype(object).where(blok.notna(), None)
+        for record in waarden.itertuples(index=False, name=None):
+            ws.write_row(rij, 0, record)
+            rij += 1
+
+
+def schrijf_excel(df, pad, rollups=None, chunk=CHUNK_RIJEN):
+    xlsxwriter = importeer('xlsxwriter')
+
+    # constant_memory: xlsxwriter spoelt elke rij direct naar schijf. Rijen moeten
+    # daarom strikt op volgorde geschreven worden, tabblad voor tabblad.
+    workbook = xlsxwriter.Workbook(pad, {'constant_memory': True})
+    try:
+        _schrijf_blad(workbook, 'Data', df, chunk)
+        for naam, rollup in (rollups or {}).items():
+            _schrijf_blad(workbook, naam, rollup, chunk)
+    finally:
+        workbook.close()
+
+
+SCHRIJVERS = {'xlsx': schrijf_excel, 'csv': schrijf_csv, 'parquet': schrijf_parquet}
+
+
+def exporteer(df, pad, formaat, rollup_namen=()):
+    from schijfcache import onthoud
+    SCHRIJVERS[formaat](df, pad, onthoud(maak_rollups, df, list(rollup_namen)))
+    return pad
+
+
+def maak_download(df, formaat, rollup_namen, uit_map, naam='oee_selectie'):
+    # Eén bestand voor de download knop; CSV/Parquet met rollups worden gezipt
+    pad = exporteer(df, os.path.join(uit_map, f"{naam}.{formaat}"), formaat, rollup_namen)
+    bestanden = sorted(glob.glob(os.path.join(uit_map, f"{naam}*")))
+    if len(bestanden) == 1:
+        return pad, MIME_TYPES[formaat]
+
+    zip_pad = os.path.join(uit_map, f"{naam}.zip")
+    with zipfile.ZipFile(zip_pad, 'w', zipfile.ZIP_DEFLATED) as z:
+        for bestand in bestanden:
+            z.write(bestand, os.path.basename(bestand))
+    return zip_pad, 'application/zip'
+
+
+# ==========================================
+# WEEKPAKKETTEN
+# ==========================================
+def weekpakket(df_lijn, lijn, jaar, week, uit_map, formaat='xlsx'):
+    iso = df_lijn['DD-MM-YY'].dt.isocalendar()
+    df_week = df_lijn[(iso.year == jaar) & (iso.week == week)]
+    if df_week.empty:
+        return None
+
+    basis = os.path.join(uit_map, f"lijn_{lijn}_{jaar}_W{week:02d}")
+    exporteer(df_week, f"{basis}.{formaat}", formaat, list(ROLLUPS))
+
+    # Grafiek als losse HTML (geen browser of kaleido nodig), zelfde figuur als het dashboard
+    from grafieken import maak_figuur_samen
+    fig = maak_figuur_samen(df_week, [lijn], "Single", False, True, True)
+    fig.update_layout(title=f"Lijn {lijn} - week {week} {jaar}")
+    fig.write_html(f"{basis}.html", include_plotlyjs='cdn')
+    return basis
+
+
+def _weekpakket_taak(taak):
+    return weekpakket(*taak)
+
+
+def exporteer_weekpakketten(df, jaar, week, uit_map, formaat='xlsx', workers=None):
+    # Elke lijn in een eigen proces; een worker krijgt alleen het deel van zijn lijn mee
+    os.makedirs(uit_map, exist_ok=True)
+    taken = [(df[df['Lijn'] == lijn], lijn, jaar, week, uit_map, formaat)
+             for lijn in df['Lijn'].unique()]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [p for p in pool.map(_weekpakket_taak, taken) if p]
+
+
+# ==========================================
+# COMMAND LINE (BATCH)
+# ==========================================
+# Gebruik: python export.py --week 2025-46 --uit exports [--formaat xlsx] [--workers 4]
+def main(argv=None):
+    from pijplijn import werkboek
+
+    parser = argparse.ArgumentParser(description="Weekpakketten per lijn exporteren")
+    parser.add_argument('--week', required=True, help="ISO week als JJJJ-WW, bijv. 2025-46")
+    parser.add_argument('--uit', default='exports')
+    parser.add_argument('--formaat', choices=list(FORMATEN), default='xlsx')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    jaar, week = (int(x) for x in args.week.split('-'))
+    for basis in exporteer_weekpakketten(werkboek(), jaar, week, args.uit, args.formaat, args.workers):
+        print(f"Geschreven: {basis}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+from analyse import bereken_lineaire_trend, weekgemiddelde
+from profiel import importeer
+from verliezen import STAPPEN
+
+# Grafieken van de dashboards als losse functies, zodat rapporten zonder
+# Streamlit precies dezelfde figuren kunnen maken.
+
+kleuren_palet = ['#1f77b4', '#9467bd', '#2ca02c', '#d62728', '#8c564b', '#e377c2']
+hover_cols_basis = ['Bandleidster', 'Product', 'Aantal personen']
+
+plot_config = {
+    'displayModeBar': True,
+    'displaylogo': False,
+    'toImageButtonOptions': {'format': 'png', 'filename': 'oee_export', 'height': 800, 'width': 1200, 'scale': 2}
+}
+
+
+def _raster(fig):
+    fig.update_xaxes(tickangle=-45)
+    fig.update_yaxes(showgrid=True, gridwidth=2, gridcolor='LightGrey', minor=dict(showgrid=True, gridwidth=1, gridcolor='WhiteSmoke'))
+    # Verticale lijnen (x-as): dikke hoofdlijnen en dunne tussenlijnen
+    fig.update_xaxes(
+        showgrid=True,
+        gridwidth=1,           # Dikte verticale hoofdlijnen
+        gridcolor='LightGrey',
+        minor=dict(
+            showgrid=True,
+            gridwidth=0.3,       # Dikte verticale tussenlijnen
+            gridcolor='WhiteSmoke'
+        )
+    )
+
+
+def _afwijking_trace(go, afwijkingen, lijn_naam, y_col):
+    # Afwijkende diensten (afwijkingen.py) als rode kruisjes op de lijn
+    if afwijkingen is None:
+        return None
+    punten = afwijkingen[afwijkingen['Lijn'] == lijn_naam]
+    if punten.empty:
+        return None
+    return go.Scatter(
+        x=punten['DD-MM-YY'], y=punten[y_col], name=f"Afwijking {lijn_naam}", mode='markers',
+        customdata=punten[['Reden', 'Score']],
+        hovertemplate=f"<b>Afwijking lijn {lijn_naam}</b><br>Reden: %{{customdata[0]}}<br>Score: %{{customdata[1]:.1f}}<extra></extra>",
+        marker=dict(symbol='x', size=11, color='red', line=dict(width=1, color='darkred'))
+    )
+
+
+def _voorspelling_traces(go, voorspelling, lijn_naam, kenmerk, kleur):
+    # Voorspelband (voorspelling.py): bovengrens, ondergrens gevuld tot de bovengrens, en de verwachting
+    if voorspelling is None:
+        return []
+    deel = voorspelling[(voorspelling['Lijn'] == lijn_naam) & (voorspelling['Kenmerk'] == kenmerk)]
+    if deel.empty:
+        return []
+    naam = f"Voorspelling {lijn_naam}" if kenmerk == 'OEE' else f"Voorspelling {lijn_naam} H"
+    return [
+        go.Scatter(x=deel['Week'], y=deel['Boven'], mode='lines', line=dict(width=0, color=kleur),
+                   showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=deel['Week'], y=deel['Onder'], mode='lines', line=dict(width=0, color=kleur), fill='tonexty',
+                   opacity=0.2, showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=deel['Week'], y=deel['Voorspelling'], name=naam, mode='lines+markers',
+                   customdata=deel[['Onder', 'Boven']],
+                   hovertemplate=f"<b>{naam}</b><br>Week van %{{x|%d-%m}}: %{{y:.1f}}<br>Interval: %{{customdata[0]:.1f}} - %{{customdata[1]:.1f}}<extra></extra>",
+                   line=dict(color=kleur, width=2, dash='dash')),
+    ]
+
+
+# ==========================================
+# SAMEN WEERGAVE
+# ==========================================
+def maak_figuur_samen(df_filtered, geselecteerde_lijnen, modus, toon_week_gem, toon_linear, toon_gemiddelde, afwijkingen=None,
+                      voorspelling=None):
+    go = importeer('plotly.graph_objects')
+    make_subplots = importeer('plotly.subplots').make_subplots
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+    for i, lijn_naam in enumerate(geselecteerde_lijnen):
+        lijn_data = df_filtered[df_filtered['Lijn'] == lijn_naam]
+        if lijn_data.empty: continue
+
+        if modus == "Single":
+            c_oee, c_qty = '#1f77b4', 'orange'
+            c_trend_week = 'red'
+            c_trend_linear = 'darkred'
+        else:
+            c = kleuren_palet[i % len(kleuren_palet)]
+            c_oee, c_qty = c, c
+            c_trend_week = c
+            c_trend_linear = c
+
+        custom_data_oee = lijn_data[hover_cols_basis + ['Hoeveelheid']]
+
+        # 1. Ruwe Data OEE
+        fig.add_trace(go.Scatter(
+            x=lijn_data['DD-MM-YY'], y=lijn_data['OEE'], name=f"Lijn {lijn_naam} OEE",
+            mode='lines+markers', customdata=custom_data_oee,
+            hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>OEE: %{{y:.2f}}%<br>Hoeveelheid: %{{customdata[3]}}<br>Lid: %{{customdata[0]}}<extra></extra>",
+            opacity=0.5 if (toon_linear or toon_week_gem) else 1,
+            line=dict(color=c_oee, width=3)
+        ), secondary_y=False)
+
+        # 2. Ruwe Data Hoeveelheid
+        fig.add_trace(go.Scatter(
+            x=lijn_data['DD-MM-YY'], y=lijn_data['Hoeveelheid'], name=f"Lijn {lijn_naam} H",
+            mode='lines',
+            hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Hoeveelheid: %{{y}}<extra></extra>",
+            line=dict(color=c_qty, width=1.5, dash='dot')
+        ), secondary_y=True)
+
+        # 3. WEEKGEMIDDELDE (GroupBy Year+Week)
+        if toon_week_gem:
+            t_oee = weekgemiddelde(lijn_data, 'OEE')
+            fig.add_trace(go.Scatter(
+                x=lijn_data['DD-MM-YY'], y=t_oee, name=f"Weekgem. {lijn_naam}",
+                # shape='hv' kan ook voor trapjes, maar standaard lijn verbindt de weken mooier
+                line=dict(color=c_trend_week, width=2, dash='solid'),
+                hoverinfo='skip'
+            ), secondary_y=False)
+
+        # 4. LINEAR REGRESSION
+        if toon_linear and len(lijn_data) > 1:
+            tx, ty = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'OEE')
+            if tx is not None:
+                fig.add_trace(go.Scatter(
+                    x=tx, y=ty, name=f"Trend {lijn_naam}",
+                    line=dict(color=c_trend_linear, width=4, dash='longdash'),
+                    opacity=0.9, hoverinfo='skip'
+                ), secondary_y=False)
+
+        # 5. AFWIJKENDE DIENSTEN
+        trace = _afwijking_trace(go, afwijkingen, lijn_naam, 'OEE')
+        if trace is not None:
+            fig.add_trace(trace, secondary_y=False)
+
+        # 6. VOORSPELLING (komende weken)
+        for trace in _voorspelling_traces(go, voorspelling, lijn_naam, 'OEE', c_oee):
+            fig.add_trace(trace, secondary_y=False)
+        for trace in _voorspelling_traces(go, voorspelling, lijn_naam, 'Hoeveelheid', c_qty):
+            fig.add_trace(trace, secondary_y=True)
+
+    if toon_gemiddelde:
+        fig.add_hline(y=df_filtered['OEE'].mean(), line_color="black", annotation_text="Gem. OEE")
+
+    fig.update_layout(height=600, hovermode="x unified", legend=dict(orientation="h", y=1.02, x=1, xanchor="right"))
+    fig.update_yaxes(title_text="OEE (%)", secondary_y=False, range=[0, 105])
+    fig.update_yaxes(title_text="Hoeveelheid (G)", secondary_y=True)
+    return fig
+
+
+# ==========================================
+# APART WEERGAVE
+# ==========================================
+def maak_figuren_apart(df_filtered, geselecteerde_lijnen, modus, toon_week_gem, toon_linear, toon_gemiddelde, raster=False,
+                       afwijkingen=None, voorspelling=None):
+    go = importeer('plotly.graph_objects')
+
+    fig_oee = go.Figure()
+    fig_qty = go.Figure()
+
+    for i, lijn_naam in enumerate(geselecteerde_lijnen):
+        lijn_data = df_filtered[df_filtered['Lijn'] == lijn_naam]
+        if lijn_data.empty: continue
+
+        if modus == "Single":
+            c_oee, c_qty = '#1f77b4', 'orange'
+            c_trend_linear_oee = 'red'
+            c_trend_linear_qty = 'darkorange'
+        else:
+            c = kleuren_palet[i % len(kleuren_palet)]
+            c_oee, c_qty = c, c
+            c_trend_linear_oee = c
+            c_trend_linear_qty = c
+
+        cd_oee = lijn_data[hover_cols_basis + ['Hoeveelheid']]
+        cd_qty = lijn_data[hover_cols_basis + ['OEE']]
+
+        # 1. Ruwe Plots
+        fig_oee.add_trace(go.Scatter(
+            x=lijn_data['DD-MM-YY'], y=lijn_data['OEE'], name=f"Lijn {lijn_naam}",
+            mode='lines+markers', customdata=cd_oee,
+            hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>OEE: %{{y:.2f}}%<br><b>Hoeveelheid: %{{customdata[3]}}</b><br>Lid: %{{customdata[0]}}<extra></extra>",
+            opacity=0.4 if (toon_linear or toon_week_gem) else 1,
+            line=dict(color=c_oee, width=3)
+        ))
+
+        fig_qty.add_trace(go.Scatter(
+            x=lijn_data['DD-MM-YY'], y=lijn_data['Hoeveelheid'], name=f"Lijn {lijn_naam}",
+            mode='lines', customdata=cd_qty,
+            hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>Hoeveelheid: %{{y}}<br><b>OEE: %{{customdata[3]:.2f}}%</b><br>Product: %{{customdata[1]}}<extra></extra>",
+            opacity=0.4 if (toon_linear or toon_week_gem) else 1,
+            line=dict(color=c_qty, width=2),
+        ))
+
+        # 2. WEEKGEMIDDELDE (GroupBy Year+Week)
+        if toon_week_gem:
+            fig_oee.add_trace(go.Scatter(x=lijn_data['DD-MM-YY'], y=weekgemiddelde(lijn_data, 'OEE'), name=f"Weekgem. {lijn_naam}",
+                                         line=dict(color=c_oee, width=2, dash='solid'), hoverinfo='skip'))
+            fig_qty.add_trace(go.Scatter(x=lijn_data['DD-MM-YY'], y=weekgemiddelde(lijn_data, 'Hoeveelheid'), name=f"Weekgem. {lijn_naam}",
+                                         line=dict(color=c_qty, width=2, dash='solid'), hoverinfo='skip'))
+
+        # 3. LINEAR REGRESSION
+        if toon_linear and len(lijn_data) > 1:
+            # OEE Trend
+            tx_oee, ty_oee = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'OEE')
+            if tx_oee is not None:
+                fig_oee.add_trace(go.Scatter(
+                    x=tx_oee, y=ty_oee, name=f"Trend {lijn_naam}",
+                    line=dict(color=c_trend_linear_oee, width=4, dash='longdash'),
+                    opacity=1, hoverinfo='skip'
+                ))
+
+            # Hoeveelheid Trend
+            tx_qty, ty_qty = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'Hoeveelheid')
+            if tx_qty is not None:
+                fig_qty.add_trace(go.Scatter(
+                    x=tx_qty, y=ty_qty, name=f"Trend {lijn_naam}",
+                    line=dict(color=c_trend_linear_qty, width=4, dash='longdash'),
+                    opacity=1, hoverinfo='skip'
+                ))
+
+        # 4. AFWIJKENDE DIENSTEN
+        for fig, y_col in [(fig_oee, 'OEE'), (fig_qty, 'Hoeveelheid')]:
+            trace = _afwijking_trace(go, afwijkingen, lijn_naam, y_col)
+            if trace is not None:
+                fig.add_trace(trace)
+
+        # 5. VOORSPELLING (komende weken)
+        for fig, y_col, kleur in [(fig_oee, 'OEE', c_oee), (fig_qty, 'Hoeveelheid', c_qty)]:
+            for trace in _voorspelling_traces(go, voorspelling, lijn_naam, y_col, kleur):
+                fig.add_trace(trace)
+
+    if raster:
+        _raster(fig_oee)
+        _raster(fig_qty)
+
+    if toon_gemiddelde:
+        fig_oee.add_hline(y=df_filtered['OEE'].mean(), line_color="green", line_dash="dash", annotation_text="Gem. OEE")
+        fig_qty.add_hline(y=df_filtered['Hoeveelheid'].mean(), line_color="green", line_dash="dash", annotation_text="Gem. H")
+
+    fig_oee.update_layout(title="OEE Percentage (%)", height=400, hovermode="x unified", legend=dict(orientation="h", y=1.1, x=1, xanchor="right"), yaxis=dict(range=[0, 105]))
+    fig_qty.update_layout(title="Hoeveelheid (G)", height=400, hovermode="x unified", legend=dict(orientation="h", y=1.1, x=1, xanchor="right"))
+    return fig_oee, fig_qty
+
+
+# ==========================================
+# BOXPLOT
+# ==========================================
+def maak_boxplot(df_filtered, geselecteerde_lijnen):
+    go = importeer('plotly.graph_objects')
+
+    fig_box = go.Figure()
+
+    for lijn_naam in geselecteerde_lijnen:
+        lijn_data_box = df_filtered[df_filtered['Lijn'] == lijn_naam]
+
+        if not lijn_data_box.empty:
+            fig_box.add_trace(go.Box(
+                y=lijn_data_box['OEE'],
+                name=f"Lijn {lijn_naam}",
+                boxpoints='all',      # Toont alle individuele datapunten naast de box
+                jitter=0.3,           # Verspreidt de punten een beetje voor leesbaarheid
+                pointpos=-1.8,        # Positie van de punten t.o.v. de box
+                marker_color=kleuren_palet[geselecteerde_lijnen.index(lijn_naam) % len(kleuren_palet)],
+                boxmean='sd'          # Toont ook het gemiddelde en de standaarddeviatie (stippellijn)
+            ))
+
+    fig_box.update_layout(
+        height=500,
+        yaxis_title="OEE (%)",
+        showlegend=False,
+        # Pas hier ook de rasters toe voor consistentie
+        yaxis=dict(showgrid=True, gridwidth=1, gridcolor='LightGrey'),
+        xaxis=dict(showgrid=False)
+    )
+    return fig_box
+
+
+# ==========================================
+# TIJDBLOKKEN (RODEPET)
+# ==========================================
+kleuren_type = {'Productie': '#2ca02c', 'Gepland': '#ff7f0e', 'Ongepland': '#d62728'}
+
+
+def maak_tijdlijn(balken, stap=None):
+    # Gantt per lijn uit tijdblokken.tijdlijn; één trace per soort
+    px = importeer('plotly.express')
+    volgorde = [f"Lijn {l}" for l in sorted(balken['Lijn'].astype(str).unique(), key=lambda l: (len(l), l))]
+    balken = balken.assign(Lijn="Lijn " + balken['Lijn'].astype(str))
+    fig = px.timeline(balken, x_start='Start', x_end='Eind', y='Lijn', color='Type',
+                      color_discrete_map=kleuren_type, hover_data=['Activiteit', 'Minuten'],
+                      category_orders={'Lijn': volgorde, 'Type': list(kleuren_type)})
+    fig.update_yaxes(autorange='reversed', title=None)
+    fig.update_layout(height=max(300, 40 * balken['Lijn'].nunique() + 120), bargap=0.2, legend_title=None,
+                      title=f"Per {stap} minuten samengevat" if stap else None)
+    return fig
+
+
+def maak_heatmap(tabel, titel):
+    # Weekdag x uur van de dag uit tijdblokken.heatmap
+    go = importeer('plotly.graph_objects')
+    fig = go.Figure(go.Heatmap(
+        z=tabel.to_numpy(), x=[f"{uur:02d}:00" for uur in tabel.columns], y=list(tabel.index),
+        colorscale='Reds', colorbar=dict(title="min"),
+        hovertemplate="%{y} %{x}: %{z:.1f} min<extra></extra>"
+    ))
+    fig.update_yaxes(autorange='reversed')
+    fig.update_layout(height=380, title=titel, xaxis_title="Uur van de dag")
+    return fig
+
+
+# ==========================================
+# VERLIESBOOM (WATERVAL)
+# ==========================================
+def maak_waterval(tabel, groepen=None):
+    # Waterval per groep uit verliezen.waterval (minuten); meerdere groepen naast elkaar
+    go = importeer('plotly.graph_objects')
+
+    fig = go.Figure()
+    groepen = list(tabel.index) if groepen is None else groepen
+    for i, groep in enumerate(groepen):
+        rij = tabel.loc[groep]
+        waarden, metingen = [], []
+        for stap, soort in STAPPEN:
+            if soort == 'totaal':
+                waarden.append(rij[stap])
+                metingen.append('absolute')
+            elif soort == 'subtotaal':
+                waarden.append(0)   # plotly rekent het subtotaal zelf uit de stappen ervoor
+                metingen.append('total')
+            else:
+                waarden.append(-rij[stap])
+                metingen.append('relative')
+        label = f"{groep:%d-%m-%Y}" if hasattr(groep, 'strftime') else str(groep)
+        fig.add_trace(go.Waterfall(
+            name=label, x=[stap for stap, _ in STAPPEN], y=waarden, measure=metingen,
+            text=[f"{abs(rij[stap]):,.0f}".replace(",", ".") for stap, _ in STAPPEN], textposition='outside',
+            decreasing=dict(marker=dict(color='#d62728')), increasing=dict(marker=dict(color='#2ca02c')),
+            totals=dict(marker=dict(color=kleuren_palet[i % len(kleuren_palet)])),
+            hovertemplate=f"{label}<br>%{{x}}: %{{text}} min<extra></extra>",
+        ))
+    fig.update_layout(waterfallmode='group', height=500, yaxis_title="Minuten", showlegend=len(groepen) > 1,
+                      legend_title=None)
+    return fig
@@ -1,7 +1,12 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import os
+from analyse import week_gemiddelden
+from archief import lees_met_staart
+from data import laad_stilstand_tab
+from schijfcache import onthoud
+from profiel import importeer, start_meting, toon_meting
+
+meting = start_meting()
 
 st.set_page_config(page_title="Lijn 24 - Analyse", layout="wide")
 
@@ -14,39 +19,10 @@ def load_data():
         return None, []
 
     try:
-        df = pd.read_excel(file_path, sheet_name="inzicht 24")
-        
-        # --- DATA OPSCHONEN (REGEL 54) ---
-        df = df.iloc[:54]
-        df.columns = df.columns.astype(str).str.strip()
-        
-        # --- DATUM FIX ---
-        if 'DD-MM-YY' in df.columns:
-            df['Datum_Schoon'] = pd.to_datetime(df['DD-MM-YY'], dayfirst=True, errors='coerce')
-            if df['Datum_Schoon'].isna().all():
-                df['Datum_Schoon'] = df['DD-MM-YY'].astype(str).apply(lambda x: x[2:] if len(str(x)) > 8 else x)
-                df['Datum_Schoon'] = pd.to_datetime(df['Datum_Schoon'], dayfirst=True, errors='coerce')
-            
-            df = df.dropna(subset=['Datum_Schoon'])
-            df = df.sort_values('Datum_Schoon')
-            df['Week'] = df['Datum_Schoon'].dt.isocalendar().week
-        else:
-            st.error("Kolom 'DD-MM-YY' niet gevonden.")
-            return None, []
-
-        # --- FLEXIBELE KOLOM DETECTIE ---
-        target_keywords = ['Pauze', 'Opstart', 'Monteur', 'QA', 'product', 'Ombouw', 'Schoonmake', 'Diversen']
-        
-        bestaande_kolommen = []
-        for keyword in target_keywords:
-            found_col = [c for c in df.columns if keyword.lower() in c.lower()]
-            if found_col:
-                real_col = found_col[0]
-                df[real_col] = pd.to_numeric(df[real_col], errors='coerce').fillna(0)
-                bestaande_kolommen.append(real_col)
-        
-        return df, bestaande_kolommen
-
+        return onthoud(laad_stilstand_tab, file_path, bestanden=[file_path])
+    except KeyError as e:
+        st.error(e.args[0])
+        return None, []
     except Exception as e:
         st.error(f"Fout bij inladen: {e}")
         return None, []
@@ -58,6 +34,12 @@ df, wait_cols = load_data()
 
 if df is not None and wait_cols:
     st.sidebar.header("Instellingen")
+
+    # Afgesloten maanden komen uit het archief (archief.py), alleen binnen de gekozen periode
+    periode = st.sidebar.date_input("Periode", value=(df['Datum_Schoon'].min().date(), df['Datum_Schoon'].max().date()),
+                                    format="DD-MM-YYYY")
+    van, tot = periode if len(periode) == 2 else (periode[0], None)
+    df = lees_met_staart('stilstand', df, van, tot)
     selected = st.sidebar.multiselect("Selecteer categorieën:", options=wait_cols, default=wait_cols)
     
     st.sidebar.divider()
@@ -65,6 +47,9 @@ if df is not None and wait_cols:
     show_weekly = st.sidebar.toggle("Toon Weekgemiddelde Grafiek", value=False)
 
     if selected:
+        # plotly.express pas laden als er een grafiek komt; statsmodels laadt
+        # plotly zelf pas bij trendline="ols"
+        px = importeer('plotly.express')
         if not show_weekly:
             # GEBRUIK SCATTER VOOR TRENDLINE ONDERSTEUNING
             # Door mode='lines+markers' ziet het eruit als een lijndiagram
@@ -83,7 +68,7 @@ if df is not None and wait_cols:
         else:
             # WEEKGEMIDDELDE
             st.subheader("Gemiddelde minuten per weeknummer")
-            df_weekly = df.groupby('Week')[selected].mean().reset_index()
+            df_weekly = week_gemiddelden(df, selected)
             fig_weekly = px.bar(
                 df_weekly, x='Week', y=selected,
                 title="Weekgemiddelde",
@@ -95,4 +80,6 @@ if df is not None and wait_cols:
         with st.expander("Tabel met data (max 54 rijen)"):
             st.dataframe(df[['Datum_Schoon', 'Week'] + selected])
     else:
-        st.info("Kies een categorie.")
\ No newline at end of file
+        st.info("Kies een categorie.")
+
+toon_meting(meting)
@@ -0,0 +1,273 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
+import smtplib
+import threading
+import time
+import urllib.request
+from collections import deque
+from datetime import datetime
+from email.message import EmailMessage
+
+from data import detecteer_versie, lees_nieuwe_regels
+from dataset import LOGBOEK_PATRONEN, vertaal
+from schijfcache import bestandsslot
+
+# Meldingen op nieuwe logboekregels: valt de OEE van lijn 25 weg, of loopt 'Wachten op
+# Monteur' dienst na dienst op, dan krijgt iemand bericht zonder dat het dashboard
+# open staat. Regels staan in regels.json (of OEE_REGELS); per regel en groep (lijn,
+# product) houdt de staat alleen een venster en een teller bij, dus een nieuwe regel
+# in het logboek kost per regel O(1), zonder de historie opnieuw te lezen.
+#
+# Na het opslaan in OEE.py / rodepet.py: controleer_op_achtergrond(). Voor regels die
+# buiten de apps om worden toegevoegd: python meldingen.py --volg
+#
+# regels.json:
+#   {"regels": [{"naam": "OEE laag", "kenmerk": "OEE", "soort": "drempel", "operator": "<", "waarde": 50},
+#               {"naam": "OEE daalt", "kenmerk": "OEE", "soort": "gemiddelde", "venster": 5, "operator": "<",
+#                "waarde": 55, "lijnen": ["25"]},
+#               {"naam": "Monteur", "kenmerk": "Stilstand Monteur", "soort": "reeks", "aantal": 3,
+#                "operator": ">", "waarde": 30, "per": ["Lijn", "Product"]}],
+#    "kanalen": [{"soort": "bestand", "pad": "meldingen.jsonl"},
+#                {"soort": "smtp", "host": "localhost", "poort": 25, "aan": ["ploegleider@hegron.nl"]},
+#                {"soort": "webhook", "url": "http://localhost:8080/oee"}]}
+
+# --- CONFIGURATIE ---
+REGELS_BESTAND = os.environ.get('OEE_REGELS', 'regels.json')
+STAAT_BESTAND = os.environ.get('OEE_MELDINGEN_STAAT', 'meldingen_staat.pkl')
+VOLG_INTERVAL = 30     # seconden tussen twee controles met --volg
+TIMEOUT = 5            # seconden voor SMTP en webhook
+
+STANDAARD_REGELS = [
+    {'naam': 'OEE laag', 'kenmerk': 'OEE', 'soort': 'drempel', 'operator': '<', 'waarde': 40},
+    {'naam': 'OEE daalt', 'kenmerk': 'OEE', 'soort': 'gemiddelde', 'venster': 5, 'operator': '<', 'waarde': 55},
+    {'naam': 'Wachten op monteur', 'kenmerk': 'Stilstand Monteur', 'soort': 'reeks', 'aantal': 3,
+     'operator': '>', 'waarde': 30},
+]
+STANDAARD_KANALEN = [{'soort': 'bestand', 'pad': 'meldingen.jsonl'}]
+
+OPERATOREN = {
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+# ==========================================
+# REGELS
+# ==========================================
+def lees_regels(bestand=REGELS_BESTAND):
+    if not os.path.isfile(bestand):
+        return {'regels': STANDAARD_REGELS, 'kanalen': STANDAARD_KANALEN}
+    with open(bestand, encoding='utf-8') as f:
+        inhoud = json.load(f)
+    return {'regels': inhoud.get('regels', STANDAARD_REGELS), 'kanalen': inhoud.get('kanalen', STANDAARD_KANALEN)}
+
+
+def _per(regel):
+    per = regel.get('per', 'Lijn')
+    return [per] if isinstance(per, str) else list(per)
+
+
+def _index(regels):
+    # kenmerk -> regels, zodat een rij alleen langs de regels voor zijn kolommen gaat
+    index = {}
+    for regel in regels:
+        index.setdefault(regel['kenmerk'], []).append({
+            **regel,
+            'per': _per(regel),
+            'lijnen': {str(l) for l in regel['lijnen']} if regel.get('lijnen') else None,
+            'producten': {str(p) for p in regel['producten']} if regel.get('producten') else None,
+        })
+    return index
+
+
+def _vingerafdruk(regels):
+    return hashlib.sha256(json.dumps(regels, sort_keys=True).encode()).hexdigest()
+
+
+# ==========================================
+# EVALUATIE PER RIJ (O(1) PER REGEL)
+# ==========================================
+def _tekst(regel, groep, waarde):
+    wat = {'drempel': '', 'gemiddelde': f"gemiddelde over {regel.get('venster')} diensten ",
+           'reeks': f"{regel.get('aantal')} diensten op rij "}[regel['soort']]
+    return f"{regel['naam']}: {', '.join(groep)} - {regel['kenmerk']} {wat}{waarde:.1f} ({regel['operator']} {regel['waarde']})"
+
+
+def evalueer(rij, index, tellers):
+    # rij: dict in datasetkolommen (Lijn, Product, OEE, Stilstand ...). 'tellers' per
+    # (regel, groep): venster + lopende som, aantal op rij en of de melding al actief is.
+    # Gemiddelde en reeks melden alleen bij het ingaan van de toestand, niet elke dienst opnieuw
+    meldingen = []
+    for kenmerk, regels in index.items():
+        waarde = rij.get(kenmerk)
+        if waarde is None or waarde != waarde:
+            continue
+        for regel in regels:
+            if regel['lijnen'] is not None and str(rij.get('Lijn')) not in regel['lijnen']:
+                continue
+            if regel['producten'] is not None and str(rij.get('Product')) not in regel['producten']:
+                continue
+            groep = tuple(str(rij.get(k)) for k in regel['per'])
+            voldoet = OPERATOREN[regel['operator']]
+            teller = tellers.setdefault((regel['naam'], groep), {'venster': deque(), 'som': 0.0, 'reeks': 0, 'actief': False})
+
+            if regel['soort'] == 'drempel':
+                gemeten, geraakt = waarde, voldoet(waarde, regel['waarde'])
+            elif regel['soort'] == 'gemiddelde':
+                venster = teller['venster']
+                venster.append(waarde)
+                teller['som'] += waarde
+                if len(venster) > regel['venster']:
+                    teller['som'] -= venster.popleft()
+                gemeten = teller['som'] / len(venster)
+                geraakt = len(venster) == regel['venster'] and voldoet(gemeten, regel['waarde'])
+            else:  # reeks
+                teller['reeks'] = teller['reeks'] + 1 if voldoet(waarde, regel['waarde']) else 0
+                gemeten, geraakt = waarde, teller['reeks'] >= regel['aantal']
+
+            nieuw = geraakt and (regel['soort'] == 'drempel' or not teller['actief'])
+            teller['actief'] = geraakt
+            if nieuw:
+                meldingen.append({'regel': regel['naam'], 'groep': dict(zip(regel['per'], groep)),
+                                  'datum': str(rij.get('DD-MM-YY'))[:10], 'kenmerk': kenmerk,
+                                  'waarde': round(float(gemeten), 2), 'tekst': _tekst(regel, groep, gemeten)})
+    return meldingen
+
+
+# ==========================================
+# KANALEN (UITBREIDBAAR)
+# ==========================================
+def _naar_bestand(meldingen, kanaal):
+    with open(kanaal.get('pad', 'meldingen.jsonl'), 'a', encoding='utf-8') as f:
+        for melding in meldingen:
+            f.write(json.dumps(melding, ensure_ascii=False) + '\n')
+
+
+def _naar_smtp(meldingen, kanaal):
+    bericht = EmailMessage()
+    bericht['Subject'] = f"OEE: {len(meldingen)} melding(en)" if len(meldingen) > 1 else f"OEE: {meldingen[0]['tekst']}"
+    bericht['From'] = kanaal.get('van', 'oee@localhost')
+    bericht['To'] = ', '.join(kanaal['aan'])
+    bericht.set_content('\n'.join(f"{m['datum']}  {m['tekst']}" for m in meldingen))
+    with smtplib.SMTP(kanaal.get('host', 'localhost'), kanaal.get('poort', 25), timeout=TIMEOUT) as smtp:
+        smtp.send_message(bericht)
+
+
+def _naar_webhook(meldingen, kanaal):
+    verzoek = urllib.request.Request(kanaal['url'], data=json.dumps({'meldingen': meldingen}).encode(),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(verzoek, timeout=TIMEOUT):
+        pass
+
+
+KANALEN = {'bestand': _naar_bestand, 'smtp': _naar_smtp, 'webhook': _naar_webhook}
+
+
+def registreer_kanaal(soort, functie):
+    # functie(meldingen, kanaal_config); daarna bruikbaar als {"soort": soort, ...} in regels.json
+    KANALEN[soort] = functie
+
+
+def verstuur(meldingen, kanalen):
+    # Een kanaal dat faalt (SMTP server weg) houdt de andere niet tegen
+    fouten = []
+    for kanaal in kanalen:
+        try:
+            KANALEN[kanaal['soort']](meldingen, kanaal)
+        except Exception as e:
+            fouten.append(f"{kanaal['soort']}: {e}")
+    return fouten
+
+
+# ==========================================
+# NIEUWE LOGBOEKREGELS VERWERKEN
+# ==========================================
+def _lees_staat(pad):
+    try:
+        with open(pad, 'rb') as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _schrijf_staat(pad, staat):
+    tmp = pad + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(staat, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, pad)
+
+
+def controleer(map_naam='.', regels_bestand=REGELS_BESTAND, staat_bestand=STAAT_BESTAND):
+    # Leest per logboek alleen de regels na de vorige controle (zie data.lees_nieuwe_regels)
+    # en evalueert die. De eerste keer (geen staat) wordt de historie alleen ingelezen om de
+    # vensters te vullen, zonder meldingen. Geeft (meldingen, fouten bij versturen) terug
+    config = lees_regels(regels_bestand)
+    index = _index(config['regels'])
+    with bestandsslot(staat_bestand + '.lock'):
+        staat = _lees_staat(staat_bestand)
+        stil = staat is None
+        staat = staat or {'bronnen': {}, 'tellers': {}, 'regels': None}
+        if staat['regels'] != _vingerafdruk(config['regels']):
+            # Andere regels: de tellers opnieuw opbouwen vanaf hier (de leesposities blijven)
+            staat.update(tellers={}, regels=_vingerafdruk(config['regels']))
+
+        meldingen = []
+        for pad in [p for patroon in LOGBOEK_PATRONEN for p in sorted(glob.glob(os.path.join(map_naam, patroon)))]:
+            leesstaat = staat['bronnen'].setdefault(os.path.abspath(pad), {})
+            info = os.stat(pad)
+            if leesstaat.get('stat') == (info.st_size, info.st_mtime_ns):
+                continue
+            leesstaat['stat'] = (info.st_size, info.st_mtime_ns)
+            df, volledig = lees_nieuwe_regels(pad, leesstaat)
+            if volledig:
+                leesstaat['versie'] = detecteer_versie(df.columns)
+                if leesstaat.get('gelezen'):
+                    continue  # herschreven via Beheer: alleen de leespositie bijwerken, niet alles opnieuw melden
+            leesstaat['gelezen'] = True
+            if df.empty:
+                continue
+            for rij in vertaal(df, leesstaat['versie'], pad).to_dict('records'):
+                meldingen += evalueer(rij, index, staat['tellers'])
+        _schrijf_staat(staat_bestand, staat)
+
+    if stil or not meldingen:
+        return [], []
+    tijd = datetime.now().isoformat(timespec='seconds')
+    meldingen = [{'tijd': tijd, **m} for m in meldingen]
+    return meldingen, verstuur(meldingen, config['kanalen'])
+
+
+def controleer_op_achtergrond(map_naam='.'):
+    # Vanuit de apps na het opslaan: SMTP/webhook mogen het opslaan niet ophouden
+    threading.Thread(target=controleer, args=(map_naam,), name='oee-meldingen', daemon=True).start()
+
+
+# ==========================================
+# COMMAND LINE (VOLGEN)
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Meldingen op nieuwe logboekregels")
+    parser.add_argument('--map', default='.', help="Map met de logboeken")
+    parser.add_argument('--regels', default=REGELS_BESTAND)
+    parser.add_argument('--volg', action='store_true', help=f"Blijven controleren (elke {VOLG_INTERVAL} s)")
+    args = parser.parse_args(argv)
+
+    while True:
+        meldingen, fouten = controleer(args.map, args.regels)
+        for melding in meldingen:
+            print(f"{melding['tijd']}  {melding['tekst']}")
+        for fout in fouten:
+            print(f"Versturen mislukt: {fout}")
+        if not args.volg:
+            break
+        time.sleep(VOLG_INTERVAL)
+
+
+if __name__ == '__main__':
+    main()
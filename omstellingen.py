@@ -0,0 +1,167 @@
+import glob
+import os
+import threading
+
+import pandas as pd
+from data import detecteer_versie, lees_nieuwe_regels
+from dataset import LOGBOEK_PATRONEN, vertaal
+
+# Omsteltijd van product naar product per machine, uit de logboeken van OEE.py en
+# rodepet.py (de tijdlijn: 'ombouw (omstellen)' en 'schoonmaken'). Per machine wordt
+# de productvolgorde gereconstrueerd (op datum, binnen een dag in invoervolgorde);
+# elke productwissel is één omstelling van -> naar, met de ombouw- en
+# schoonmaaktijd van de dienst waarin gewisseld werd. Alleen waargenomen paren
+# worden bewaard (een lange tabel, geen producten x producten matrix). Nieuwe
+# regels achteraan een logboek worden aan de volgorde van hun machine vastgeknoopt
+# zonder de rest opnieuw te lezen.
+#
+#   staat = nieuwe_staat(); werk_bij(staat)
+#   tabel = matrix(staat, '24')        # Van, Naar, Aantal, Gemiddelde, P50, P90, ...
+#   breed = matrix_breed(tabel)        # P50 als van x naar tabel (heatmap)
+
+# --- CONFIGURATIE ---
+KWANTIELEN = {'P50': 0.5, 'P90': 0.9}
+
+KOLOMMEN_REGEL = ['Lijn', 'Datum', 'Product', 'Ombouw', 'Schoonmaak', 'Norm Snelheid', 'Prestatie', 'Kwaliteit']
+KOLOMMEN_OVERGANG = ['Lijn', 'Datum', 'Van', 'Naar', 'Ombouw', 'Schoonmaak', 'Minuten']
+
+
+# ==========================================
+# PRODUCTVOLGORDE PER MACHINE
+# ==========================================
+def _regels(df, versie, bron):
+    # Logboekregels -> (Lijn, Datum, Product, Ombouw, Schoonmaak, ...); regels zonder product tellen niet mee.
+    # Normsnelheid, prestatie en kwaliteit gaan mee voor de planning (planning.py)
+    norm = df['Norm Snelheid'] if 'Norm Snelheid' in df.columns else None
+    df = vertaal(df, versie, bron)
+    leeg = pd.Series(float('nan'), index=df.index)
+    uit = pd.DataFrame({
+        'Lijn': df['Lijn'].astype(str),
+        'Datum': df['DD-MM-YY'],
+        'Product': df['Product'].astype(object).where(df['Product'].notna()),
+        # Oudere logboeken (v5, dagtotalen) hebben geen geplande stilstand: alleen het aantal wissels telt
+        'Ombouw': df.get('Stilstand Ombouw', leeg),
+        'Schoonmaak': df.get('Stilstand Schoonmaak', leeg),
+        'Norm Snelheid': leeg if norm is None else norm.reindex(df.index).astype('float32'),
+        'Prestatie': df.get('Prestatie', leeg),
+        'Kwaliteit': df.get('Kwaliteit', leeg),
+    })
+    return uit[uit['Product'].fillna('') != ''].reset_index(drop=True)
+
+
+def _overgangen(regels, laatste):
+    # 'laatste': {lijn: (datum, product)} van vóór deze regels, zodat een wissel
+    # tussen de vorige en de eerste nieuwe regel ook meetelt
+    regels = regels.sort_values(['Lijn', 'Datum'], kind='stable')
+    vorige = regels.groupby('Lijn', sort=False)['Product'].shift()
+    eerste = vorige.isna()
+    vorige[eerste] = regels.loc[eerste, 'Lijn'].map({l: p for l, (_, p) in laatste.items()})
+    wissel = vorige.notna() & (vorige != regels['Product'])
+    deel = regels[wissel]
+    minuten = deel[['Ombouw', 'Schoonmaak']].sum(axis=1, min_count=1)
+    return pd.DataFrame({'Lijn': deel['Lijn'], 'Datum': deel['Datum'], 'Van': vorige[wissel], 'Naar': deel['Product'],
+                         'Ombouw': deel['Ombouw'], 'Schoonmaak': deel['Schoonmaak'], 'Minuten': minuten},
+                        columns=KOLOMMEN_OVERGANG).reset_index(drop=True)
+
+
+def _laatste(regels):
+    einde = regels.sort_values(['Lijn', 'Datum'], kind='stable').groupby('Lijn', sort=False).tail(1)
+    return {l: (d, p) for l, d, p in zip(einde['Lijn'], einde['Datum'], einde['Product'])}
+
+
+# ==========================================
+# INCREMENTEEL BIJWERKEN
+# ==========================================
+def nieuwe_staat():
+    # 'bronnen': leesstaat per logboek, 'regels': productregels per logboek,
+    # 'laatste': laatste (datum, product) per machine, 'matrices': berekende tabellen per machine
+    return {'bronnen': {}, 'regels': {}, 'laatste': {}, 'overgangen': pd.DataFrame(columns=KOLOMMEN_OVERGANG),
+            'matrices': {}, 'slot': threading.Lock()}
+
+
+def werk_bij(staat, map_naam='.'):
+    # Geeft True als er nieuwe omstellingen kunnen zijn. Ongewijzigde logboeken kosten
+    # alleen een stat(); alleen bij een herschreven bestand, een verdwenen bestand of
+    # een regel met een oudere datum dan de laatste van zijn machine alles opnieuw
+    with staat['slot']:
+        bestanden = [p for patroon in LOGBOEK_PATRONEN for p in sorted(glob.glob(os.path.join(map_naam, patroon)))]
+        opnieuw = any(pad not in bestanden for pad in staat['regels'])
+        for pad in [p for p in staat['regels'] if p not in bestanden]:
+            del staat['regels'][pad]
+            staat['bronnen'].pop(pad, None)
+
+        nieuw = []
+        for pad in bestanden:
+            leesstaat = staat['bronnen'].setdefault(pad, {})
+            info = os.stat(pad)
+            if leesstaat.get('stat') == (info.st_size, info.st_mtime_ns):
+                continue
+            leesstaat['stat'] = (info.st_size, info.st_mtime_ns)
+            df_nieuw, volledig = lees_nieuwe_regels(pad, leesstaat)
+            if volledig:
+                leesstaat['versie'] = detecteer_versie(df_nieuw.columns)
+            deel = _regels(df_nieuw, leesstaat['versie'], pad)
+            if volledig or pad not in staat['regels']:
+                staat['regels'][pad] = deel
+                opnieuw = True
+            elif not deel.empty:
+                staat['regels'][pad] = pd.concat([staat['regels'][pad], deel], ignore_index=True)
+                nieuw.append(deel)
+
+        if not opnieuw and not nieuw:
+            return False
+        if not opnieuw:
+            nieuw = pd.concat(nieuw, ignore_index=True)
+            grens = nieuw['Lijn'].map({l: d for l, (d, _) in staat['laatste'].items()})
+            opnieuw = bool((nieuw['Datum'] < grens).any())
+        if opnieuw:
+            alle = [r for r in staat['regels'].values() if not r.empty]
+            regels = pd.concat(alle, ignore_index=True) if alle else pd.DataFrame(columns=KOLOMMEN_REGEL)
+            staat['overgangen'] = _overgangen(regels, {})
+            staat['laatste'] = _laatste(regels)
+        else:
+            extra = _overgangen(nieuw, staat['laatste'])
+            staat['overgangen'] = pd.concat([staat['overgangen'], extra], ignore_index=True) if not extra.empty \
+                else staat['overgangen']
+            staat['laatste'].update(_laatste(nieuw))
+        staat['matrices'] = {}
+        return True
+
+
+# ==========================================
+# MATRIX PER MACHINE
+# ==========================================
+def productregels(staat):
+    # Alle productregels uit de logboeken samen (Lijn, Datum, Product, Ombouw, ..., Kwaliteit)
+    with staat['slot']:
+        alle = [r for r in staat['regels'].values() if not r.empty]
+        return pd.concat(alle, ignore_index=True) if alle else pd.DataFrame(columns=KOLOMMEN_REGEL)
+
+
+def machines(staat):
+    return sorted(staat['overgangen']['Lijn'].unique())
+
+
+def _bereken_matrix(overgangen):
+    groepen = overgangen.groupby(['Van', 'Naar'], sort=False)['Minuten']
+    tabel = groepen.agg(Aantal='size', Gemeten='count', Gemiddelde='mean', Max='max', Totaal='sum')
+    for naam, q in KWANTIELEN.items():
+        tabel[naam] = groepen.quantile(q)
+    # De duurste wissels (vaak x lang) bovenaan
+    tabel = tabel.sort_values(['Totaal', 'Aantal'], ascending=False).reset_index()
+    return tabel[['Van', 'Naar', 'Aantal', 'Gemeten', 'Gemiddelde', *KWANTIELEN, 'Max', 'Totaal']]
+
+
+def matrix(staat, lijn):
+    # Per (van, naar): aantal wissels, aantal met een gemeten tijd, en minuten (ombouw + schoonmaak)
+    lijn = str(lijn)
+    with staat['slot']:
+        if lijn not in staat['matrices']:
+            overgangen = staat['overgangen']
+            staat['matrices'][lijn] = _bereken_matrix(overgangen[overgangen['Lijn'] == lijn])
+        return staat['matrices'][lijn]
+
+
+def matrix_breed(tabel, waarde='P50'):
+    # Van als rijen, naar als kolommen; paren zonder omstelling blijven leeg
+    return tabel.pivot(index='Van', columns='Naar', values=waarde)
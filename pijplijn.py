@@ -0,0 +1,139 @@
+import argparse
+import hashlib
+import inspect
+import os
+import time
+
+import pandas as pd
+from data import WERKBOEK_BESTAND, lees_tabbladen, lijn_tabbladen, schoon_werkboek, typeer_werkboek, verrijk_werkboek
+from schijfcache import aanwezig, onthoud
+
+# Het werkboek laden als pijplijn: lezen -> typeren -> schonen -> verrijken (de stappen
+# staan in data.py). De uitkomst van elke stap staat in de gedeelde schijfcache onder
+# een sleutel uit de inhoud van het werkboek en de code van die stap en alle stappen
+# ervoor. Een nieuw werkboek rekent alles opnieuw uit; een aangepaste stap alleen
+# zichzelf en wat erna komt. Dashboards (via bronnen.py), het notebook en de batch
+# scripts (rapport.py, export.py) delen zo dezelfde tussenresultaten.
+#
+#   df = werkboek()                              # eindresultaat
+#   df_ruw = werkboek(tot='lees')                # tussenresultaat van een stap
+#   python pijplijn.py "Data Lijnen boven OEE .xlsx"
+
+# --- CONFIGURATIE ---
+# (naam, functie, versie); de versie ophogen als een stap anders rekent door een
+# wijziging buiten de functie zelf (bijv. in data.SCHEMA_WERKBOEK of pas_schema_toe)
+STAPPEN = [
+    ('lees', lees_tabbladen, 1),
+    ('typeer', typeer_werkboek, 1),
+    ('schoon', schoon_werkboek, 1),
+    ('verrijk', verrijk_werkboek, 1),
+]
+BLOK = 1 << 20
+
+
+# ==========================================
+# SLEUTELS
+# ==========================================
+# Inhoud-hash per bestand, per proces onthouden zolang grootte en mtime gelijk blijven
+_HASHES = {}
+# Tabbladnamen per inhoud-hash, per proces
+_TABBLADEN = {}
+
+
+def inhoud_hash(pad):
+    info = os.stat(pad)
+    versie = (os.path.abspath(pad), info.st_size, info.st_mtime_ns)
+    if versie not in _HASHES:
+        h = hashlib.sha256()
+        with open(pad, 'rb') as f:
+            for blok in iter(lambda: f.read(BLOK), b''):
+                h.update(blok)
+        _HASHES[versie] = h.hexdigest()
+    return _HASHES[versie]
+
+
+def tabbladen_van(pad=WERKBOEK_BESTAND, tabbladen=None):
+    # De tabbladen die lees_tabbladen echt leest, in de volgorde van het werkboek. Zo
+    # geven None (alle lijn-tabbladen), een lijst of een tuple met dezelfde tabbladen
+    # dezelfde sleutels, en daarmee dezelfde tussenresultaten in de cache
+    h = inhoud_hash(pad)
+    if h not in _TABBLADEN:
+        _TABBLADEN[h] = pd.ExcelFile(pad).sheet_names
+    namen = _TABBLADEN[h]
+    if tabbladen is None:
+        return tuple(lijn_tabbladen(namen))
+    gevraagd = {str(t) for t in tabbladen}
+    return tuple(t for t in namen if t in gevraagd)
+
+
+def _code(functie, versie):
+    return hashlib.sha256(f"{versie}:{inspect.getsource(functie)}".encode()).hexdigest()
+
+
+def sleutels(pad=WERKBOEK_BESTAND, tabbladen=None):
+    # Per stap: hash van (invoer, code van de stap, sleutel van de vorige stap)
+    vorige = hashlib.sha256(repr((inhoud_hash(pad), tabbladen_van(pad, tabbladen))).encode()).hexdigest()
+    uit = []
+    for naam, functie, versie in STAPPEN:
+        vorige = hashlib.sha256(f"{naam}:{_code(functie, versie)}:{vorige}".encode()).hexdigest()
+        uit.append(f"pijplijn:{naam}:{vorige[:32]}")
+    return uit
+
+
+def _stap_index(tot):
+    namen = [naam for naam, _, _ in STAPPEN]
+    if tot not in namen:
+        raise ValueError(f"Onbekende stap '{tot}', kies uit {', '.join(namen)}")
+    return namen.index(tot)
+
+
+def _niets():
+    return None
+
+
+# ==========================================
+# UITVOEREN
+# ==========================================
+def _stap(i, pad, tabbladen, namen):
+    # Uit de cache, of berekend uit de vorige stap (die zelf weer uit de cache kan komen)
+    _, functie, _ = STAPPEN[i]
+    if i == 0:
+        return onthoud(lambda: functie(pad, tabbladen), cache_naam=namen[0])
+    return onthoud(lambda: functie(_stap(i - 1, pad, tabbladen, namen)), cache_naam=namen[i])
+
+
+def werkboek(pad=WERKBOEK_BESTAND, tabbladen=None, tot='verrijk'):
+    # Zelfde resultaat als data.laad_werkboek (bij tot='verrijk'), maar per stap onthouden
+    tabbladen = tabbladen_van(pad, tabbladen)
+    return _stap(_stap_index(tot), pad, tabbladen, sleutels(pad, tabbladen))
+
+
+def aanwezig_tot(pad=WERKBOEK_BESTAND, tabbladen=None):
+    # Naam van de laatste stap die al in de cache staat (of None)
+    tabbladen = tabbladen_van(pad, tabbladen)
+    gevonden = None
+    for (naam, _, _), cache_naam in zip(STAPPEN, sleutels(pad, tabbladen)):
+        if aanwezig(_niets, cache_naam=cache_naam):
+            gevonden = naam
+    return gevonden
+
+
+# ==========================================
+# COMMAND LINE (CACHE VULLEN)
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Werkboek door de pijplijn halen en de tussenresultaten bewaren")
+    parser.add_argument('bestand', nargs='?', default=WERKBOEK_BESTAND)
+    parser.add_argument('--tabbladen', nargs='*', help="Standaard: alle lijn-tabbladen")
+    parser.add_argument('--tot', default='verrijk', choices=[naam for naam, _, _ in STAPPEN])
+    args = parser.parse_args(argv)
+
+    al = aanwezig_tot(args.bestand, args.tabbladen)
+    start = time.perf_counter()
+    df = werkboek(args.bestand, args.tabbladen, args.tot)
+    print(f"{len(df)} regels na '{args.tot}' in {time.perf_counter() - start:.2f} s "
+          f"({'al in de cache tot ' + repr(al) if al else 'niets in de cache'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+from data import naar_numeriek, normaliseer_producten
+from omstellingen import matrix, nieuwe_staat, productregels, werk_bij
+
+# Volgordeplanning per machine: in welke volgorde draaien we de orders van de week
+# zodat er zo weinig mogelijk omgebouwd en schoongemaakt wordt? De omsteltijden komen
+# uit de omstelmatrix (omstellingen.py, mediaan per van -> naar), de draaitijd uit de
+# normsnelheid en de gemeten prestatie van de machine. Per machine: nearest neighbour
+# als start, daarna simulated annealing met 2-opt en verplaatsen als zetten, vanaf
+# meerdere startpunten in een procespool. Weken met weinig verschillende producten
+# worden exact doorgerekend.
+#
+#   plan, samenvatting = plan_week(orders, staat)
+#   python planning.py --orders orders_week12.csv --uit plan_week12.csv
+#
+# orders: één regel per order met 'Machine Nummer' (of 'Lijn'), 'Product Nummer'
+# (of 'Product'), 'Aantal' en optioneel 'Norm Snelheid' (stuks per minuut).
+# Zonder norm in de order: de historie van het product op die machine, dan van het
+# product op alle machines, dan de mediaan van de machine. 'Norm bron' in het plan
+# zegt welke; 'onbekend' heeft geen draaitijd en maakt de tijden erna ook onbekend.
+
+# --- CONFIGURATIE ---
+STANDAARD_OMSTELTIJD = 30   # minuten, voor een machine waar nog niets gemeten is
+EXACT_TOT = 8               # tot zoveel verschillende producten alle volgordes proberen
+HERSTARTS = 4               # per machine
+ITERATIES = 20_000          # annealing-stappen per herstart
+START_TEMPERATUUR = 0.2     # als fractie van de gemiddelde omsteltijd
+ZAAD = 20240601             # vaste seed: dezelfde orders geven hetzelfde plan
+PARALLEL_VANAF = 8          # taken (machine x herstart); minder is in dit proces sneller
+
+ORDER_KOLOMMEN = {'Machine Nummer': 'Lijn', 'Product Nummer': 'Product'}
+
+
+# ==========================================
+# HISTORIE: OMSTELTIJDEN EN SNELHEDEN
+# ==========================================
+def omsteltijden(tabel, producten, vorige=None):
+    # (n+1) x (n+1) matrix in minuten. Index 0 is het product dat nu op de machine
+    # staat (onbekend: de eerste order kost geen omstelling); terug naar 0 kost niets
+    gemeten = tabel[tabel['Gemeten'] > 0]
+    paar = dict(zip(zip(gemeten['Van'], gemeten['Naar']), gemeten['P50']))
+    # Niet eerder gezien paar: de gebruikelijke omsteltijd naar dat product, anders die van de machine
+    naar = gemeten.groupby('Naar')['P50'].median().to_dict()
+    machine = gemeten['P50'].median() if not gemeten.empty else STANDAARD_OMSTELTIJD
+    knopen = [vorige] + list(producten)
+    kosten = np.zeros((len(knopen), len(knopen)))
+    for i, van in enumerate(knopen):
+        for j, nr in enumerate(knopen[1:], start=1):
+            if van is not None and van != nr:
+                kosten[i, j] = paar.get((van, nr), naar.get(nr, machine))
+    return kosten
+
+
+def historie(regels):
+    # {(lijn, product): normsnelheid}, met (None, product) over alle machines, en per
+    # machine de mediane normsnelheid, prestatie en kwaliteit
+    regels = regels.assign(**{'Norm Snelheid': regels['Norm Snelheid'].where(regels['Norm Snelheid'] > 0)})
+    norm = regels.groupby(['Lijn', 'Product'])['Norm Snelheid'].median().dropna().to_dict()
+    norm.update({(None, p): v for p, v in regels.groupby('Product')['Norm Snelheid'].median().dropna().items()})
+    per_machine = regels.groupby('Lijn')[['Norm Snelheid', 'Prestatie', 'Kwaliteit']].median()
+    return norm, per_machine
+
+
+# ==========================================
+# ZOEKEN PER MACHINE
+# ==========================================
+def _kosten(kosten, volgorde):
+    # kosten als geneste lijst: per element indexeren is daar veel sneller dan in NumPy
+    vorige, totaal = 0, 0.0
+    for k in volgorde:
+        totaal += kosten[vorige][k]
+        vorige = k
+    return totaal
+
+
+def _exact(kosten):
+    k, volgorde = min((_kosten(kosten, p), p) for p in permutations(range(1, len(kosten))))
+    return list(volgorde), k
+
+
+def _dichtstbijzijnde(kosten, rng, eerste=None):
+    # Nearest neighbour vanaf het huidige product (of een opgegeven eerste order)
+    over = list(range(1, len(kosten)))
+    volgorde = []
+    if eerste is not None:
+        volgorde.append(over.pop(over.index(eerste)))
+    while over:
+        vorige = volgorde[-1] if volgorde else 0
+        beste = min(kosten[vorige][k] for k in over)
+        kandidaten = [k for k in over if kosten[vorige][k] == beste]
+        volgorde.append(over.pop(over.index(rng.choice(kandidaten))))
+    return volgorde
+
+
+def _anneal(kosten, volgorde, rng, iteraties, schaal):
+    n = len(volgorde)
+    huidig = beste = list(volgorde)
+    k_huidig = k_beste = _kosten(kosten, volgorde)
+    if n < 2 or schaal <= 0:
+        return beste, k_beste
+    for stap in range(iteraties):
+        temperatuur = schaal * (1 - stap / iteraties) + 1e-9
+        i, j = sorted(rng.sample(range(n), 2))
+        if rng.random() < 0.5:
+            # 2-opt: een stuk van de volgorde omdraaien
+            kandidaat = huidig[:i] + huidig[i:j + 1][::-1] + huidig[j + 1:]
+        else:
+            # Eén order naar een andere plek verplaatsen
+            kandidaat = huidig[:i] + huidig[i + 1:]
+            kandidaat.insert(j, huidig[i])
+        k = _kosten(kosten, kandidaat)
+        if k <= k_huidig or rng.random() < math.exp((k_huidig - k) / temperatuur):
+            huidig, k_huidig = kandidaat, k
+            if k < k_beste:
+                beste, k_beste = kandidaat, k
+    return beste, k_beste
+
+
+def _zoek_taak(taak):
+    # Eén herstart voor één machine; draait ook in een worker
+    omstel, herstart, iteraties, zaad = taak
+    kosten = omstel.tolist()
+    if len(kosten) - 1 <= EXACT_TOT:
+        return _exact(kosten)
+    rng = random.Random(zaad)
+    positief = omstel[omstel > 0]
+    schaal = START_TEMPERATUUR * positief.mean() if positief.size else 0.0
+    # De eerste herstart begint bij het goedkoopste vervolg, de rest bij een willekeurige order
+    eerste = None if herstart == 0 else rng.randrange(1, len(kosten))
+    return _anneal(kosten, _dichtstbijzijnde(kosten, rng, eerste), rng, iteraties, schaal)
+
+
+# ==========================================
+# WEEKPLAN
+# ==========================================
+def _orders(orders):
+    # Per machine en product één taak; de volgorde van eerste voorkomen is de huidige (handmatige) volgorde
+    orders = orders.rename(columns=ORDER_KOLOMMEN).copy()
+    orders['Lijn'] = orders['Lijn'].astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    orders['Product'] = normaliseer_producten(orders['Product']).astype(object)
+    if 'Norm Snelheid' not in orders.columns:
+        orders['Norm Snelheid'] = np.nan
+    orders['Aantal'] = naar_numeriek(orders['Aantal']).fillna(0)
+    orders['Norm Snelheid'] = naar_numeriek(orders['Norm Snelheid']).where(lambda x: x > 0)
+    return orders.groupby(['Lijn', 'Product'], sort=False).agg(
+        Aantal=('Aantal', 'sum'), **{'Norm Snelheid': ('Norm Snelheid', 'median')}).reset_index()
+
+
+def _fractie(per_machine, kolom, lijn):
+    # Gemeten percentage van de machine als fractie; zonder historie de norm (1)
+    waarde = per_machine[kolom].get(lijn, np.nan)
+    return 1.0 if pd.isna(waarde) else float(np.clip(waarde / 100, 0.01, 1))
+
+
+def _voorspelling(deel, volgorde, kosten, prestatie, kwaliteit):
+    # Draaitijd = aantal / (norm x gemeten prestatie). De omstellingen tellen hier als
+    # verloren tijd (anders dan in de dagstaat, waar geplande stilstand buiten de OEE
+    # valt), zodat een betere volgorde ook een hogere OEE geeft
+    omstel = [kosten[v, k] for v, k in zip([0] + volgorde[:-1], volgorde)]
+    ideaal = (deel['Aantal'] / deel['Norm Snelheid']).to_numpy()[[k - 1 for k in volgorde]]
+    draaitijd = ideaal / prestatie
+    totaal = draaitijd.sum() + sum(omstel)
+    oee = 100 * ideaal.sum() * kwaliteit / totaal if totaal > 0 else np.nan
+    return omstel, draaitijd, oee
+
+
+def plan_week(orders, staat, herstarts=HERSTARTS, iteraties=ITERATIES, workers=None):
+    # Geeft (plan per order in volgorde, samenvatting per machine) terug
+    orders = _orders(orders)
+    norm, per_machine = historie(productregels(staat))
+
+    machines, taken = {}, []
+    zaden = np.random.SeedSequence(ZAAD)
+    for lijn, deel in orders.groupby('Lijn', sort=False):
+        deel = deel.reset_index(drop=True)
+        # Normsnelheid uit de order, anders de historie (zie boven); de eerste die er is telt
+        bronnen = {'order': deel['Norm Snelheid'],
+                   'product op machine': deel['Product'].map(lambda p: norm.get((lijn, p))),
+                   'product alle machines': deel['Product'].map(lambda p: norm.get((None, p))),
+                   'machine': pd.Series(per_machine['Norm Snelheid'].get(lijn, np.nan), index=deel.index)}
+        snelheid, herkomst = pd.Series(np.nan, index=deel.index), pd.Series('onbekend', index=deel.index)
+        for bron, waarden in bronnen.items():
+            herkomst = herkomst.mask(snelheid.isna() & waarden.notna(), bron)
+            snelheid = snelheid.fillna(waarden.astype('float64'))
+        deel['Norm Snelheid'], deel['Norm bron'] = snelheid, herkomst
+        vorige = staat['laatste'].get(lijn, (None, None))[1]
+        kosten = omsteltijden(matrix(staat, lijn), deel['Product'], vorige)
+        machines[lijn] = (deel, kosten, vorige)
+        for herstart in range(1 if len(deel) <= EXACT_TOT else herstarts):
+            taken.append((lijn, (kosten, herstart, iteraties, int(zaden.spawn(1)[0].generate_state(1)[0]))))
+
+    if len(taken) >= PARALLEL_VANAF:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultaten = list(pool.map(_zoek_taak, [t for _, t in taken]))
+    else:
+        resultaten = [_zoek_taak(t) for _, t in taken]
+    beste = {}
+    for (lijn, _), (volgorde, k) in zip(taken, resultaten):
+        if lijn not in beste or k < beste[lijn][1]:
+            beste[lijn] = (volgorde, k)
+
+    plannen, samenvatting = [], []
+    for lijn, (deel, kosten, vorige) in machines.items():
+        volgorde = beste[lijn][0]
+        handmatig = list(range(1, len(deel) + 1))
+        prestatie, kwaliteit = _fractie(per_machine, 'Prestatie', lijn), _fractie(per_machine, 'Kwaliteit', lijn)
+        omstel, draaitijd, oee = _voorspelling(deel, volgorde, kosten, prestatie, kwaliteit)
+        omstel_hand, _, oee_hand = _voorspelling(deel, handmatig, kosten, prestatie, kwaliteit)
+
+        plan = deel.iloc[[k - 1 for k in volgorde]].reset_index(drop=True)
+        plan.insert(1, 'Volgorde', range(1, len(plan) + 1))
+        plan['Omsteltijd'] = omstel
+        plan['Draaitijd'] = draaitijd
+        # Zonder norm geen draaitijd: ook alles daarna is dan onbekend (niet overslaan)
+        plan['Einde'] = (plan['Omsteltijd'] + plan['Draaitijd']).cumsum(skipna=False)
+        plan['Start'] = plan['Einde'] - plan['Draaitijd']
+        plannen.append(plan)
+        samenvatting.append({'Lijn': lijn, 'Huidig product': vorige, 'Producten': len(deel),
+                             'Omsteltijd': sum(omstel), 'Omsteltijd handmatig': sum(omstel_hand),
+                             'Besparing': sum(omstel_hand) - sum(omstel), 'Draaitijd': draaitijd.sum(),
+                             'OEE': oee, 'OEE handmatig': oee_hand,
+                             'Zonder norm': int((deel['Norm bron'] == 'onbekend').sum())})
+
+    kolommen = ['Lijn', 'Volgorde', 'Product', 'Aantal', 'Norm Snelheid', 'Norm bron', 'Omsteltijd', 'Draaitijd',
+                'Start', 'Einde']
+    plan = pd.concat(plannen, ignore_index=True)[kolommen] if plannen else pd.DataFrame(columns=kolommen)
+    return plan, pd.DataFrame(samenvatting)
+
+
+# ==========================================
+# COMMAND LINE (PLANNING)
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Volgorde van de orders per machine met zo min mogelijk omsteltijd")
+    parser.add_argument('--orders', required=True, help="CSV (;) met Machine Nummer, Product Nummer en Aantal")
+    parser.add_argument('--uit', default='plan.csv')
+    parser.add_argument('--map', default='.', help="Map met de logboeken (historie van omsteltijden)")
+    parser.add_argument('--herstarts', type=int, default=HERSTARTS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    staat = nieuwe_staat()
+    werk_bij(staat, args.map)
+    orders = pd.read_csv(args.orders, sep=';', dtype={'Machine Nummer': str, 'Product Nummer': str, 'Lijn': str,
+                                                      'Product': str})
+    plan, samenvatting = plan_week(orders, staat, args.herstarts, workers=args.workers)
+    plan.to_csv(args.uit, sep=';', index=False, decimal=',')
+    print(samenvatting.round(1).to_string(index=False))
+    print(f"{len(plan)} orders gepland -> {os.path.abspath(args.uit)}")
+    onbekend = plan[plan['Norm bron'] == 'onbekend']
+    if not onbekend.empty:
+        per_lijn = onbekend.groupby('Lijn', sort=False).size()
+        print(f"Let op: {len(onbekend)} orders zonder normsnelheid, geef 'Norm Snelheid' op in de orders ("
+              + ", ".join(f"lijn {lijn}: {n}" for lijn, n in per_lijn.items()) + ")")
+
+
+if __name__ == '__main__':
+    main()
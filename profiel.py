@@ -0,0 +1,130 @@
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+# --- CONFIGURATIE ---
+# Zet OEE_PROFIEL=1 om de import- en rerun-tijden in de zijbalk van de apps te tonen
+PROFIEL_AAN = os.environ.get('OEE_PROFIEL') == '1'
+
+# Gemeten importtijd per module (seconden), alleen de eerste keer per proces
+IMPORT_TIJDEN = {}
+
+
+# ==========================================
+# LUI IMPORTEREN
+# ==========================================
+def importeer(naam):
+    # Zware modules (plotly, statsmodels) pas laden op de pagina die ze gebruikt.
+    # Streamlit voert het script bij elke interactie opnieuw uit; na de eerste
+    # keer komt de module direct uit sys.modules.
+    if naam in sys.modules:
+        return sys.modules[naam]
+    start = time.perf_counter()
+    module = importlib.import_module(naam)
+    IMPORT_TIJDEN[naam] = time.perf_counter() - start
+    return module
+
+
+# ==========================================
+# RERUN METING
+# ==========================================
+def start_meting():
+    return time.perf_counter()
+
+
+def toon_meting(start):
+    if not PROFIEL_AAN:
+        return
+    import streamlit as st
+
+    duur = time.perf_counter() - start
+    with st.sidebar.expander("⏱️ Profiel"):
+        st.write(f"Script rerun: {duur * 1000:.0f} ms")
+        for naam, sec in sorted(IMPORT_TIJDEN.items(), key=lambda x: -x[1]):
+            st.write(f"import {naam}: {sec * 1000:.0f} ms")
+
+
+# ==========================================
+# KOUDE START vs. RERUN (COMMAND LINE)
+# ==========================================
+# Gebruik: python profiel.py Dashboard.py OEE.py --reruns 5 --herhaal 3
+# "Koude start" is de wandkloktijd van een nieuw python-proces dat het script één
+# keer uitvoert (bare mode, zonder server of browser). "Rerun" is het gemiddelde
+# van herhaalde runs via streamlit's AppTest in één proces, zoals bij interactie.
+ZWARE_MODULES = ['pandas', 'plotly.subplots', 'plotly.express', 'statsmodels.api']
+
+
+def _koude_run(script):
+    import runpy
+    import warnings
+
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+    warnings.simplefilter('ignore')
+    runpy.run_path(os.path.abspath(script), run_name='__main__')
+    print(json.dumps([m for m in ZWARE_MODULES if m in sys.modules]))
+
+
+def _rerun_tijd(script, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(script), default_timeout=120)
+    at.run()
+    tijden = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        tijden.append(time.perf_counter() - start)
+    print(json.dumps(sum(tijden) / max(len(tijden), 1)))
+
+
+def _subproces(*args):
+    uitvoer = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *args],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(uitvoer.stdout.strip().splitlines()[-1])
+
+
+def meet_script(script, reruns=5, herhaal=3):
+    koude_starts = []
+    for _ in range(herhaal):
+        start = time.perf_counter()
+        modules = _subproces('--koud', script)
+        koude_starts.append(time.perf_counter() - start)
+    koude_starts.sort()
+    return {
+        'koude_start': koude_starts[len(koude_starts) // 2],
+        'rerun': _subproces('--rerun', script, '--reruns', str(reruns)),
+        'modules': modules,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Meet koude start en rerun-tijd van de Streamlit apps")
+    parser.add_argument('scripts', nargs='+')
+    parser.add_argument('--reruns', type=int, default=5)
+    parser.add_argument('--herhaal', type=int, default=3, help="Aantal koude starts (mediaan)")
+    parser.add_argument('--koud', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--rerun', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.koud:
+        _koude_run(args.scripts[0])
+        return
+    if args.rerun:
+        _rerun_tijd(args.scripts[0], args.reruns)
+        return
+
+    print(f"{'Script':<14}{'Koude start':>13}{'Rerun':>10}  Geladen modules")
+    for script in args.scripts:
+        r = meet_script(script, args.reruns, args.herhaal)
+        print(f"{script:<14}{r['koude_start']:>11.2f} s{r['rerun'] * 1000:>7.0f} ms  {', '.join(r['modules'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from analyse import bereken_kpis, boxplot_statistieken, filter_data, slechtste_dagen
+from grafieken import maak_boxplot, maak_figuur_samen
+from pijplijn import werkboek
+
+# Nachtelijke rapporten zonder browser of Streamlit runtime.
+# Gebruik:
+#   python rapport.py --lijnen 24 25 --periode 2025-11-01:2025-11-30 --uit rapporten
+#   python rapport.py --periode 2025-10-01:2025-12-31 --periode 2026-01-01:2026-03-31 --workers 4
+# Zonder --lijnen worden alle lijnen uit het werkboek meegenomen.
+
+
+def _periode(tekst):
+    van, tot = tekst.split(':')
+    return pd.Timestamp(van), pd.Timestamp(tot)
+
+
+def lijn_rapport(df_lijn, lijn, van, tot, uit_map):
+    df_sel = filter_data(df_lijn, van=van, tot=tot)
+    if df_sel.empty:
+        return None
+
+    map_naam = os.path.join(uit_map, f"lijn_{lijn}_{van:%Y%m%d}_{tot:%Y%m%d}")
+    os.makedirs(map_naam, exist_ok=True)
+
+    kpis = bereken_kpis(df_sel)
+    samenvatting = {
+        'lijn': lijn,
+        'van': f"{van:%Y-%m-%d}",
+        'tot': f"{tot:%Y-%m-%d}",
+        'gem_oee': round(float(kpis['gem_oee']), 2),
+        'totale_productie': float(kpis['totale_productie']),
+        'max_oee': round(float(kpis['max_oee']), 2),
+        'beste_dag': f"{kpis['beste_dag']:%Y-%m-%d}" if kpis['beste_dag'] is not None else None,
+        'dagen': kpis['dagen'],
+    }
+    with open(os.path.join(map_naam, 'kpis.json'), 'w', encoding='utf-8') as f:
+        json.dump(samenvatting, f, indent=2)
+
+    boxplot_statistieken(df_sel).to_csv(os.path.join(map_naam, 'spreiding.csv'), sep=';', index=False)
+    slechtste_dagen(df_sel, 5)[['DD-MM-YY', 'Lijn', 'OEE', 'Product', 'Bandleidster', 'Hoeveelheid']].to_csv(
+        os.path.join(map_naam, 'slechtste_dagen.csv'), sep=';', index=False)
+
+    # Dezelfde figuren als het dashboard (losse lijn, lineaire trend aan)
+    maak_figuur_samen(df_sel, [lijn], "Single", False, True, True).write_html(
+        os.path.join(map_naam, 'trend.html'), include_plotlyjs='cdn')
+    maak_boxplot(df_sel, [lijn]).write_html(os.path.join(map_naam, 'spreiding.html'), include_plotlyjs='cdn')
+    return samenvatting
+
+
+def _lijn_rapport_taak(taak):
+    return lijn_rapport(*taak)
+
+
+def maak_rapporten(df, lijnen, perioden, uit_map, workers=None):
+    # Per (lijn, periode) een taak; elke worker krijgt alleen de rijen van zijn lijn
+    os.makedirs(uit_map, exist_ok=True)
+    taken = [(df[df['Lijn'] == lijn], lijn, van, tot, uit_map)
+             for lijn in lijnen for van, tot in perioden]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        resultaten = [r for r in pool.map(_lijn_rapport_taak, taken) if r]
+
+    overzicht = pd.DataFrame(resultaten)
+    overzicht.to_csv(os.path.join(uit_map, 'samenvatting.csv'), sep=';', index=False)
+    return overzicht
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OEE rapporten per lijn en periode (headless)")
+    parser.add_argument('--lijnen', nargs='*', default=None)
+    parser.add_argument('--periode', action='append', type=_periode, default=None,
+                        help="JJJJ-MM-DD:JJJJ-MM-DD, mag vaker opgegeven worden")
+    parser.add_argument('--bestand', default=None, help="Werkboek (standaard het bovenlijnen-werkboek)")
+    parser.add_argument('--uit', default='rapporten')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    # Uit de gedeelde schijfcache als het dashboard dit werkboek al geladen heeft
+    df = werkboek(args.bestand) if args.bestand else werkboek()
+    lijnen = args.lijnen or sorted(df['Lijn'].unique())
+    perioden = args.periode or [(df['DD-MM-YY'].min(), df['DD-MM-YY'].max())]
+
+    overzicht = maak_rapporten(df, lijnen, perioden, args.uit, args.workers)
+    print(overzicht.to_string(index=False) if not overzicht.empty else "Geen data in de gekozen selectie.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
 import streamlit as st
-import pandas as pd
 import os
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from profiel import importeer, start_meting, toon_meting
+
+meting = start_meting()
 
 # --- CONFIGURATIE ---
 EIND_DATA_FILE = 'hegron_oee_dagtotalen_definitief.csv'
@@ -53,7 +55,7 @@ if 'huidig_logboek' not in st.session_state:
 # ZIJBALK NAVIGATIE
 # ==========================================
 st.sidebar.title("Navigatie")
-pagina = st.sidebar.radio("Ga naar:", ["Dagstaat Invoeren", "Data Beheren"])
+pagina = st.sidebar.radio("Ga naar:", ["Dagstaat Invoeren", "Data Beheren", "Tijdlijn & Stilstand"])
 
 # ==========================================
 # PAGINA 1: DAGSTAAT & OEE BEREKENEN
@@ -74,8 +76,26 @@ if pagina == "Dagstaat Invoeren":
             bandleider = st.selectbox("Bandleider", ["Marla", "Shirley", "Abdel", "Sasi", "Jennifer", "Anders"])
             aantal_mensen = st.number_input("Aantal mensen aan lijn", min_value=1, value=8)
         with c3:
-            artikel_nr = st.text_input("Product Nummer", placeholder="Bijv. INP1120573")
-            snelheid_per_min = st.number_input("Norm Snelheid (stuks/minuut) *", min_value=1, value=30)
+            # Product uit de catalogus (catalogus.py): het getypte begin wordt genormaliseerd en
+            # op de server opgezocht; een nieuw nummer mag ook. De catalogus (en pandas) pas laden
+            # als er iets getypt is. De geleerde normsnelheid wordt voorgevuld (het product in
+            # de key: bij een ander product opnieuw)
+            artikel_nr, norm_voorstel = "", None
+            product_tekst = st.text_input("Product Nummer", placeholder="Bijv. INP1120573")
+            if product_tekst.strip():
+                catalogus = importeer('catalogus')
+                cat = catalogus.laad_catalogus()
+                keuzes = catalogus.suggesties(cat, product_tekst, machine)
+                if keuzes:
+                    artikel_nr = st.selectbox("Product", keuzes, format_func=lambda p: catalogus.label(cat, p),
+                                              key=f"product_{product_tekst}")
+                norm_voorstel = catalogus.normsnelheid(cat, artikel_nr, machine)
+            snelheid_per_min = st.number_input("Norm Snelheid (stuks/minuut) *", min_value=1,
+                                               value=max(1, round(norm_voorstel['snelheid'])) if norm_voorstel else 30,
+                                               key=f"snelheid_{artikel_nr}")
+            if artikel_nr and artikel_nr not in cat['diensten']:
+                bekend = catalogus.vergelijkbaar(cat, artikel_nr)
+                st.caption(f"Nieuw product. Bedoel je: {', '.join(bekend)}?" if bekend else "Nieuw product.")
 
     st.divider()
 
@@ -128,9 +148,13 @@ if pagina == "Dagstaat Invoeren":
     st.divider()
     st.subheader("3. Jouw Tijdlijn van Vandaag")
 
-    df_vandaag = pd.DataFrame(st.session_state.huidig_logboek)
+    df_vandaag = None
+    if st.session_state.huidig_logboek:
+        # pandas pas laden zodra er tijdblokken zijn; het lege formulier heeft het niet nodig
+        pd = importeer('pandas')
+        df_vandaag = pd.DataFrame(st.session_state.huidig_logboek)
 
-    if not df_vandaag.empty:
+    if df_vandaag is not None:
         st.dataframe(df_vandaag, use_container_width=True)
         if st.button("🗑️ Wis laatste regel (Foutje herstellen)"):
             st.session_state.huidig_logboek.pop()
@@ -142,7 +166,7 @@ if pagina == "Dagstaat Invoeren":
     st.divider()
     st.subheader("4. Dag Afsluiten & OEE Berekenen")
 
-    if not df_vandaag.empty:
+    if df_vandaag is not None:
         # Totale uren berekenen
         min_productie = df_vandaag[df_vandaag['Type'] == 'Productie']['Minuten'].sum()
         min_gepland = df_vandaag[df_vandaag['Type'] == 'Gepland']['Minuten'].sum()
@@ -192,6 +216,10 @@ if pagina == "Dagstaat Invoeren":
             stilstand_product = haal_minuten_op("wachten op product")
             # Divers is alles wat ongepland is min deze drie hoofdcategorieën
             stilstand_divers = min_ongepland - (stilstand_monteur + stilstand_qc + stilstand_product)
+            # Geplande stilstand per soort, zoals in het v6 logboek van OEE.py (omstellingen.py gebruikt de ombouw)
+            stilstand_opstart = haal_minuten_op("start/einde productie")
+            stilstand_ombouw = haal_minuten_op("ombouw (omstellen)")
+            stilstand_schoonmaak = haal_minuten_op("schoonmaken")
 
             # --- PRECIES DE LIJST DIE JIJ VROEG ---
             dag_samenvatting = {
@@ -202,6 +230,8 @@ if pagina == "Dagstaat Invoeren":
                 "Aantal Mensen": [aantal_mensen],
                 "Product Nummer": [artikel_nr],
                 "Norm Snelheid": [snelheid_per_min],
+                "Totaal Diensttijd": [totale_dienst_tijd],
+                "Pauze": [haal_minuten_op("pauze")],
                 "Beschikbaarheid %": [round(beschikbaarheid_pct, 1)],
                 "Prestatie %": [round(prestatie_pct, 1)],
                 "Kwaliteit %": [round(kwaliteit_pct, 1)],
@@ -212,6 +242,9 @@ if pagina == "Dagstaat Invoeren":
                 "Totaal Geproduceerd": [totaal_gemaakt],
                 "Goede Producten": [goede_stuks],
                 "Foute Producten": [fout_gemaakt],
+                "Stilstand Opstart": [stilstand_opstart],
+                "Stilstand Ombouw": [stilstand_ombouw],
+                "Stilstand Schoonmaak": [stilstand_schoonmaak],
                 "Stilstand Monteur": [stilstand_monteur],
                 "Stilstand QC": [stilstand_qc],
                 "Stilstand Product": [stilstand_product],
@@ -220,12 +253,16 @@ if pagina == "Dagstaat Invoeren":
             }
             
             df_save = pd.DataFrame(dag_samenvatting)
-            if not os.path.isfile(EIND_DATA_FILE):
-                df_save.to_csv(EIND_DATA_FILE, index=False, sep=";")
-            else:
-                df_save.to_csv(EIND_DATA_FILE, mode='a', header=False, index=False, sep=";")
-            
-            st.success("✅ Opgeslagen in Excel!")
+            # Een bestaand bestand in de oude opmaak krijgt de nieuwe kolommen erbij
+            importeer('data').voeg_regels_toe(EIND_DATA_FILE, df_save)
+            # De tijdblokken zelf ook bewaren, voor de tijdlijn en heatmap (zie tijdblokken.py)
+            importeer('tijdblokken').bewaar(df_vandaag, datum, machine, bandleider, artikel_nr)
+
+            # Het lijn-tabblad in het werkboek wordt op de achtergrond bijgewerkt (zie terugschrijven.py)
+            importeer('terugschrijven').plan(df_save.iloc[0].to_dict())
+            importeer('meldingen').controleer_op_achtergrond()
+            importeer('wijzigingslog').volg_invoer(EIND_DATA_FILE, bandleider)
+            st.success("✅ Opgeslagen! Het werkboek wordt op de achtergrond bijgewerkt.")
             st.session_state.huidig_logboek = [] # Maakt kladblok leeg
             st.rerun()
     else:
@@ -238,11 +275,71 @@ elif pagina == "Data Beheren":
     st.title("Opgeslagen Data Beheren")
     
     if os.path.isfile(EIND_DATA_FILE):
-        df_beheer = pd.read_csv(EIND_DATA_FILE, sep=";")
-        aangepaste_df = st.data_editor(df_beheer, num_rows="dynamic", use_container_width=True, height=500)
-        
-        if st.button("💾 Wijzigingen opslaan", type="primary"):
-            aangepaste_df.to_csv(EIND_DATA_FILE, sep=";", index=False)
-            st.success("✅ Je aanpassingen zijn veilig opgeslagen!")
+        # Per pagina bewerken; opslaan schrijft alleen de gewijzigde regels terug (zie tabellen.py)
+        tabellen = importeer('tabellen')
+        beheer = st.session_state.setdefault("data_beheren", {})
+        df_beheer = tabellen.logboek(EIND_DATA_FILE, beheer)
+        bewerkingen = tabellen.toon_tabel(df_beheer, "data_beheren", omgekeerd=True, bewerkbaar=True,
+                                          num_rows="dynamic", use_container_width=True, height=500)
+
+        # Elke wijziging komt met naam en tijd in het wijzigingslog (zie wijzigingslog.py)
+        auteur = st.text_input("Je naam (voor het wijzigingslog)", key="data_beheren_auteur").strip()
+        if st.button("💾 Wijzigingen opslaan", type="primary", disabled=not auteur):
+            aantal = tabellen.sla_op(EIND_DATA_FILE, beheer, bewerkingen, sleutel="data_beheren", auteur=auteur)
+            st.success(f"✅ Je aanpassingen zijn veilig opgeslagen! ({aantal} regels)")
+        tabellen.toon_historie(EIND_DATA_FILE, "data_beheren", auteur, beheer)
     else:
-        st.warning("Er is nog geen data opgeslagen. Vul eerst een dagstaat in.")
\ No newline at end of file
+        st.warning("Er is nog geen data opgeslagen. Vul eerst een dagstaat in.")
+
+    terugschrijven = importeer('terugschrijven')
+    if terugschrijven.RESULTATEN or terugschrijven.wachtend():
+        with st.expander("📗 Werkboek bijwerken"):
+            st.caption(f"Nog in de wachtrij: {terugschrijven.wachtend()}")
+            for tijd, lijn, dag, status in reversed(terugschrijven.RESULTATEN):
+                st.write(f"{tijd:%H:%M:%S} · lijn {lijn} · {dag}: {status}")
+
+# ==========================================
+# PAGINA 3: TIJDLIJN & STILSTAND
+# ==========================================
+elif pagina == "Tijdlijn & Stilstand":
+    st.title("Tijdlijn & Stilstand per Uur")
+    # De opgeslagen tijdblokken; DuckDB rekent de balken en het raster uit (zie tijdblokken.py)
+    tijdblokken = importeer('tijdblokken')
+    bereik = tijdblokken.periode()
+
+    if bereik is None:
+        st.warning("Er zijn nog geen tijdblokken opgeslagen. Sluit eerst een dagstaat af.")
+    else:
+        grafieken = importeer('grafieken')
+        c1, c2, c3 = st.columns([2, 3, 2])
+        with c1:
+            keuze = st.date_input("Periode", value=(max(bereik[0], bereik[1] - timedelta(days=27)), bereik[1]),
+                                  min_value=bereik[0], max_value=bereik[1], format="DD-MM-YYYY")
+            van, tot = keuze if len(keuze) == 2 else (keuze[0], keuze[0])
+        with c2:
+            alle_lijnen = tijdblokken.lijnen()
+            gekozen_lijnen = st.multiselect("Machines", alle_lijnen, default=alle_lijnen)
+        with c3:
+            soort = st.selectbox("Stilstand in de heatmap", tijdblokken.SOORTEN[:3] + tijdblokken.activiteiten())
+
+        if gekozen_lijnen:
+            st.subheader("Tijdlijn per machine")
+            balken, stap = tijdblokken.tijdlijn(van, tot, gekozen_lijnen)
+            if balken.empty:
+                st.info("Geen tijdblokken in deze periode.")
+            else:
+                if stap:
+                    st.caption(f"Lange periode: per machine de meest voorkomende soort per {stap} minuten. "
+                               "Kies een kortere periode voor de losse activiteiten.")
+                st.plotly_chart(grafieken.maak_tijdlijn(balken, stap), use_container_width=True)
+
+            st.subheader("Wanneer staat de lijn stil?")
+            per_dag = st.toggle("Gemiddeld per ingevulde machine-dag", value=True)
+            tabel = tijdblokken.heatmap(van, tot, gekozen_lijnen, soort, per_dag=per_dag)
+            eenheid = "minuten per machine-dag" if per_dag else "minuten totaal"
+            st.plotly_chart(grafieken.maak_heatmap(tabel, f"{soort}: {eenheid} per weekdag en uur"),
+                            use_container_width=True)
+        else:
+            st.info("Kies minstens één machine.")
+
+toon_meting(meting)
@@ -0,0 +1,302 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+from profiel import importeer
+
+# Gedeelde resultaat-cache op schijf voor meerdere Streamlit processen achter één
+# proxy. Een resultaat wordt één keer berekend (door één proces) en daarna door
+# alle processen van schijf gelezen; DataFrames als Arrow bestand via een memory map.
+#
+#   df = onthoud(laad_werkboek, pad, bestanden=[pad])
+#   fig = onthoud(maak_figuur_samen, df_filtered, lijnen, modus, ...)
+#
+# De sleutel is (functie + hash van haar broncode, argumenten, dataversie), zodat een
+# aangepaste functie niet de resultaten van de oude versie terugkrijgt. DataFrame-
+# argumenten worden op inhoud gehasht; 'bestanden' voegt grootte + mtime van de
+# bronbestanden toe.
+# Pickles uit de cache worden gewoon geladen, dus de map moet van deze gebruiker zijn
+# en alleen door hem beschreven kunnen worden (_cache_map controleert dat).
+
+# --- CONFIGURATIE ---
+CACHE_AAN = os.environ.get('OEE_CACHE', '1') != '0'
+CACHE_MAP = os.environ.get('OEE_CACHE_MAP', os.path.join(os.path.expanduser('~'), '.cache', 'oee_cache'))
+MAX_BYTES = int(os.environ.get('OEE_CACHE_MB', '512')) * 1024 * 1024
+SLOT_TIMEOUT = 120   # seconden; een ouder slot is van een gecrasht proces
+SLOT_VERVERS = SLOT_TIMEOUT / 4   # zo vaak raakt de houder het slot aan zolang hij rekent
+WACHT_STAP = 0.05
+
+EXTENSIES = ('.arrow', '.json', '.pkl')
+
+
+# ==========================================
+# SLEUTELS
+# ==========================================
+def bestand_versie(bestanden):
+    versie = []
+    for pad in bestanden:
+        try:
+            info = os.stat(pad)
+            versie.append((os.path.abspath(pad), info.st_size, info.st_mtime_ns))
+        except FileNotFoundError:
+            versie.append((os.path.abspath(pad), None, None))
+    return versie
+
+
+def _hash_waarde(h, waarde):
+    pd = importeer('pandas')
+    if isinstance(waarde, pd.DataFrame):
+        h.update(repr((list(waarde.columns), [str(t) for t in waarde.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(waarde, index=True).to_numpy().tobytes())
+    elif isinstance(waarde, pd.Series):
+        h.update(repr((waarde.name, str(waarde.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(waarde, index=True).to_numpy().tobytes())
+    elif isinstance(waarde, (list, tuple)):
+        h.update(b'[')
+        for w in waarde:
+            _hash_waarde(h, w)
+        h.update(b']')
+    elif isinstance(waarde, dict):
+        for k in sorted(waarde, key=repr):
+            h.update(repr(k).encode())
+            _hash_waarde(h, waarde[k])
+    else:
+        h.update(pickle.dumps(waarde, protocol=4))
+
+
+# Per proces: broncode-hash per code object (een lambda wordt elke aanroep opnieuw
+# gemaakt maar deelt zijn code object)
+_CODES = {}
+
+
+def _code(functie):
+    # Zoals pijplijn._code: een hash van de broncode. Zonder bron (interactief
+    # gedefinieerd) de bytecode; zonder code object (ingebouwd) alleen de naam
+    code = getattr(functie, '__code__', None)
+    if code is None:
+        return ''
+    if code not in _CODES:
+        try:
+            bron = inspect.getsource(functie).encode()
+        except (OSError, TypeError):
+            bron = code.co_code + repr(code.co_consts).encode()
+        _CODES[code] = hashlib.sha256(bron).hexdigest()
+    return _CODES[code]
+
+
+def sleutel(functie, args, kwargs, bestanden=(), cache_naam=None):
+    naam = f"{getattr(functie, '__module__', None)}.{getattr(functie, '__qualname__', type(functie).__name__)}"
+    h = hashlib.sha256(f"{cache_naam}:{naam}:{_code(functie)}".encode())
+    _hash_waarde(h, list(args))
+    _hash_waarde(h, kwargs)
+    _hash_waarde(h, bestand_versie(bestanden))
+    return h.hexdigest()[:32]
+
+
+# ==========================================
+# OPSLAAN EN LEZEN
+# ==========================================
+def _is_figuur(waarde):
+    return type(waarde).__name__ == 'Figure' and hasattr(waarde, 'to_json')
+
+
+def _arrow_tabel(waarde):
+    if not isinstance(waarde, importeer('pandas').DataFrame):
+        return None
+    pa = importeer('pyarrow')
+    try:
+        tabel = pa.Table.from_pandas(waarde)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None  # ruwe Excel-kolommen met tekst en getallen door elkaar: als pickle
+    # Float kolommen met NaN als waarde i.p.v. null opslaan: dan kan _lees ze zonder
+    # kopie (direct uit de memory map) als numpy array teruggeven
+    for i, dtype in enumerate(waarde.dtypes):
+        if str(dtype) in ('float32', 'float64'):
+            tabel = tabel.set_column(i, tabel.schema.field(i), pa.array(waarde.iloc[:, i].to_numpy(), from_pandas=False))
+    return tabel
+
+
+def _schrijf(pad_basis, waarde):
+    tabel = _arrow_tabel(waarde)
+    if tabel is not None:
+        pa = importeer('pyarrow')
+        pad, tmp = pad_basis + '.arrow', pad_basis + '.arrow.tmp'
+        with pa.OSFile(tmp, 'wb') as f, pa.ipc.new_file(f, tabel.schema) as writer:
+            writer.write_table(tabel)
+    elif _is_figuur(waarde) or (isinstance(waarde, tuple) and waarde and all(_is_figuur(w) for w in waarde)):
+        figuren = [waarde.to_json()] if _is_figuur(waarde) else [w.to_json() for w in waarde]
+        pad, tmp = pad_basis + '.json', pad_basis + '.json.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'tuple': not _is_figuur(waarde), 'figuren': figuren}, f)
+    else:
+        pad, tmp = pad_basis + '.pkl', pad_basis + '.pkl.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(waarde, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # Atomisch vervangen: andere processen zien het bestand pas als het compleet is
+    os.replace(tmp, pad)
+    return pad
+
+
+def _lees(pad):
+    if pad.endswith('.arrow'):
+        pa = importeer('pyarrow')
+        # Memory map: de pagina's komen uit de page cache van het OS, die alle processen delen.
+        # split_blocks: numerieke kolommen zonder nulls en datums blijven naar die pagina's
+        # wijzen in plaats van in de heap van elk proces gekopieerd te worden. Die kolommen
+        # zijn alleen-lezen; een kolom vervangen (df[k] = ...) kan wel, .loc erin schrijven niet
+        with pa.memory_map(pad, 'r') as bron:
+            return pa.ipc.open_file(bron).read_all().to_pandas(split_blocks=True)
+    if pad.endswith('.json'):
+        pio = importeer('plotly.io')
+        with open(pad, encoding='utf-8') as f:
+            inhoud = json.load(f)
+        figuren = [pio.from_json(s) for s in inhoud['figuren']]
+        return tuple(figuren) if inhoud['tuple'] else figuren[0]
+    with open(pad, 'rb') as f:
+        return pickle.load(f)
+
+
+def _zoek(pad_basis):
+    for ext in EXTENSIES:
+        if os.path.exists(pad_basis + ext):
+            return pad_basis + ext
+    return None
+
+
+# Per proces: mappen die al gecontroleerd zijn
+_VEILIG = set()
+
+
+def _cache_map(cache_map=CACHE_MAP):
+    # Aanmaken met alleen rechten voor deze gebruiker. Een bestaande map van een ander of
+    # schrijfbaar voor anderen wordt geweigerd: daar kan iemand een pickle neerzetten
+    if cache_map not in _VEILIG:
+        os.makedirs(cache_map, mode=0o700, exist_ok=True)
+        info = os.stat(cache_map)
+        if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or info.st_mode & 0o022):
+            raise PermissionError(f"Cachemap {cache_map} is niet van deze gebruiker of is schrijfbaar voor anderen; "
+                                  f"kies een eigen map met OEE_CACHE_MAP")
+        _VEILIG.add(cache_map)
+    return cache_map
+
+
+# ==========================================
+# LRU OPRUIMEN
+# ==========================================
+def ruim_op(max_bytes=MAX_BYTES, cache_map=CACHE_MAP):
+    # mtime is het laatste gebruik (bij elke hit bijgewerkt); oudste eerst weg
+    items = [e for e in os.scandir(cache_map) if e.name.endswith(EXTENSIES)]
+    items = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in items))
+    totaal = sum(grootte for _, grootte, _ in items)
+    for _, grootte, pad in items:
+        if totaal <= max_bytes:
+            break
+        _verwijder(pad)
+        totaal -= grootte
+
+
+def _verwijder(pad):
+    try:
+        os.remove(pad)
+    except OSError:
+        pass  # (Windows) nog geopend door een ander proces
+
+
+def leeg(cache_map=CACHE_MAP):
+    ruim_op(0, cache_map)
+
+
+# ==========================================
+# ONTHOUD
+# ==========================================
+def _pak_slot(slot, timeout=SLOT_TIMEOUT):
+    # Stampede bescherming: alleen het proces dat het slot aanmaakt rekent
+    try:
+        os.close(os.open(slot, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(slot) > timeout:
+                _verwijder(slot)
+        except OSError:
+            pass
+        return False
+
+
+@contextmanager
+def _houd_vast(slot):
+    # Zolang de houder bezig is de mtime van het slot bijwerken, zodat een lange
+    # berekening (voorspelling, bootstrap) niet na SLOT_TIMEOUT als gecrasht geldt
+    klaar = threading.Event()
+
+    def ververs():
+        while not klaar.wait(SLOT_VERVERS):
+            try:
+                os.utime(slot)
+            except OSError:
+                pass
+
+    draad = threading.Thread(target=ververs, daemon=True)
+    draad.start()
+    try:
+        yield
+    finally:
+        klaar.set()
+        draad.join()
+        _verwijder(slot)
+
+
+@contextmanager
+def bestandsslot(slot, timeout=SLOT_TIMEOUT):
+    # Slot over processen heen (ook gebruikt door terugschrijven.py voor het werkboek)
+    while not _pak_slot(slot, timeout):
+        time.sleep(WACHT_STAP)
+    with _houd_vast(slot):
+        yield
+
+
+def aanwezig(functie, *args, bestanden=(), cache_naam=None, **kwargs):
+    # Staat het resultaat al op schijf? (bijv. om alleen de missers parallel te berekenen)
+    if not CACHE_AAN:
+        return False
+    return _zoek(os.path.join(CACHE_MAP, sleutel(functie, args, kwargs, bestanden, cache_naam))) is not None
+
+
+def onthoud(functie, *args, bestanden=(), cache_naam=None, **kwargs):
+    # cache_naam vervangt de functienaam in de sleutel, bijv. voor een lambda
+    if not CACHE_AAN:
+        return functie(*args, **kwargs)
+
+    pad_basis = os.path.join(_cache_map(), sleutel(functie, args, kwargs, bestanden, cache_naam))
+    slot = pad_basis + '.lock'
+
+    while True:
+        pad = _zoek(pad_basis)
+        if pad:
+            try:
+                os.utime(pad)
+                return _lees(pad)
+            except FileNotFoundError:
+                continue  # net opgeruimd door een ander proces: opnieuw proberen
+            except Exception:
+                # Beschadigd bestand: weggooien en opnieuw berekenen
+                _verwijder(pad)
+                continue
+        if _pak_slot(slot):
+            break
+        time.sleep(WACHT_STAP)
+
+    with _houd_vast(slot):
+        # Tussen zoeken en slot pakken kan een ander proces klaar zijn gekomen
+        pad = _zoek(pad_basis)
+        if pad:
+            return _lees(pad)
+        waarde = functie(*args, **kwargs)
+        _schrijf(pad_basis, waarde)
+        ruim_op()
+        return waarde
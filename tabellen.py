@@ -0,0 +1,168 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+import wijzigingslog
+from data import SCHEMA_LOGBOEK, lees_nieuwe_regels, pas_schema_toe
+
+# Tabellen per pagina in plaats van het hele DataFrame naar de browser. Zoeken en
+# sorteren gebeurt hier op de server; alleen de rijen van de gekozen pagina gaan mee
+# met de rerun. In de bewerkbare variant komen wijzigingen terug als verschillen
+# (rij, kolom, waarde) uit de data_editor en worden ze gericht in het logboek gezet
+# (data.wijzig_regels, via het wijzigingslog), in plaats van het hele bestand opnieuw te schrijven.
+#
+#   toon_tabel(df, 'data_tabel')                               # alleen lezen
+#   staat = st.session_state.setdefault('beheer', {})
+#   df = logboek(pad, staat)                                   # nieuwe regels sinds de vorige rerun
+#   bewerkingen = toon_tabel(df, 'beheer', bewerkbaar=True)
+#   if st.button("Opslaan"): sla_op(pad, staat, bewerkingen, auteur='Shirley')
+#   toon_historie(pad, 'beheer', auteur, staat)                # wijzigingslog, ongedaan maken, op datum
+
+# --- CONFIGURATIE ---
+PER_PAGINA = 50
+GEEN_SORTERING = "(volgorde)"
+
+
+# ==========================================
+# ZOEKEN, SORTEREN, PAGINA
+# ==========================================
+def zoek_rijen(df, tekst):
+    # Masker: 'tekst' komt (hoofdletterongevoelig) voor in een van de tekstkolommen.
+    # Categorieën worden op de categorie-waarden vergeleken, niet per rij
+    masker = np.zeros(len(df), dtype=bool)
+    for col in df.columns:
+        reeks = df[col]
+        if isinstance(reeks.dtype, pd.CategoricalDtype):
+            treffers = reeks.cat.categories.astype(str).str.contains(tekst, case=False, regex=False)
+            masker |= np.isin(reeks.cat.codes.to_numpy(), np.flatnonzero(treffers))
+        elif reeks.dtype == 'object' or pd.api.types.is_string_dtype(reeks):
+            masker |= reeks.astype(str).str.contains(tekst, case=False, regex=False).to_numpy()
+    return masker
+
+
+def pagina(df, sorteer=None, oplopend=True, zoek='', start=0, aantal=PER_PAGINA, omgekeerd=False):
+    # Geeft (rijen van deze pagina, aantal rijen na het zoeken). Zonder sortering de
+    # volgorde van df, met 'omgekeerd' van achteren (nieuwste regels eerst)
+    if zoek:
+        df = df[zoek_rijen(df, zoek)]
+    totaal = len(df)
+    if sorteer in df.columns:
+        volgorde = df[sorteer].reset_index(drop=True).sort_values(ascending=oplopend, kind='stable', na_position='last')
+        posities = volgorde.index[start:start + aantal]
+    elif omgekeerd:
+        posities = np.arange(totaal - 1 - start, max(totaal - 1 - start - aantal, -1), -1)
+    else:
+        posities = np.arange(start, min(start + aantal, totaal))
+    return df.iloc[posities], totaal
+
+
+# ==========================================
+# STREAMLIT
+# ==========================================
+def _bewerkbaar(deel):
+    # Categorieën beperken de data_editor tot bestaande waarden en datums komen als
+    # tekst terug; beide als gewone tekst tonen
+    deel = deel.copy()
+    for col in deel.columns:
+        if isinstance(deel[col].dtype, pd.CategoricalDtype):
+            deel[col] = deel[col].astype(object)
+        elif pd.api.types.is_datetime64_any_dtype(deel[col]):
+            deel[col] = deel[col].dt.strftime('%Y-%m-%d')
+    return deel
+
+
+def _bewerkingen(editor, index):
+    # data_editor-staat (posities op de pagina) -> rijnummers in het bestand
+    wijzigingen = {int(index[int(pos)]): velden for pos, velden in editor.get('edited_rows', {}).items()}
+    verwijderd = [int(index[int(pos)]) for pos in editor.get('deleted_rows', [])]
+    toegevoegd = [rij for rij in editor.get('added_rows', []) if rij]
+    return {'wijzigingen': wijzigingen, 'verwijderd': verwijderd, 'toegevoegd': toegevoegd}
+
+
+def toon_tabel(df, sleutel, per_pagina=PER_PAGINA, omgekeerd=False, bewerkbaar=False, **opties):
+    # Zoek-, sorteer- en paginakeuze boven de tabel; de keuzes staan in de session_state
+    # onder 'sleutel'. Bewerkbaar: geeft de bewerkingen van deze pagina terug (zie sla_op)
+    k_sorteer, k_richting, k_zoek, k_pagina = st.columns([3, 2, 3, 2])
+    sorteer = k_sorteer.selectbox("Sorteer op", [GEEN_SORTERING] + list(df.columns), key=f"{sleutel}_sorteer")
+    oplopend = k_richting.radio("Richting", ["Oplopend", "Aflopend"], horizontal=True,
+                                key=f"{sleutel}_richting") == "Oplopend"
+    zoek = k_zoek.text_input("Zoeken", key=f"{sleutel}_zoek", placeholder="Tekst in een kolom")
+
+    masker = zoek_rijen(df, zoek) if zoek else None
+    gevonden = df if masker is None else df[masker]
+    paginas = max(1, math.ceil(len(gevonden) / per_pagina))
+    # Een ander aantal pagina's (zoeken) begint weer op pagina 1
+    nummer = k_pagina.number_input(f"Pagina (van {paginas})", min_value=1, max_value=paginas, value=1,
+                                   key=f"{sleutel}_pagina_{paginas}")
+    deel, totaal = pagina(gevonden, sorteer, oplopend, start=(nummer - 1) * per_pagina, aantal=per_pagina,
+                          omgekeerd=omgekeerd)
+    st.caption(f"Rij {(nummer - 1) * per_pagina + min(1, len(deel))}–{(nummer - 1) * per_pagina + len(deel)} "
+               f"van {totaal}" + (f" (gezocht in {len(df)})" if masker is not None else ""))
+
+    if not bewerkbaar:
+        st.dataframe(deel, **opties)
+        return None
+    # Eén editor per pagina/sortering; na opslaan (sla_op) een nieuwe, lege editor
+    versie = st.session_state.get(f"{sleutel}_versie", 0)
+    editor = f"{sleutel}_editor_{versie}_{nummer}_{sorteer}_{oplopend}_{zoek}"
+    st.data_editor(_bewerkbaar(deel), key=editor, **opties)
+    return _bewerkingen(st.session_state.get(editor, {}), deel.index)
+
+
+# ==========================================
+# LOGBOEK IN DE SESSIE
+# ==========================================
+def logboek(pad, staat):
+    # Het logboek in de sessie: alleen regels die sinds de vorige rerun zijn toegevoegd
+    # (of herschreven door sla_op) worden gelezen. Index = rijnummer in het bestand
+    info = os.stat(pad)
+    if staat.get('stat') != (info.st_size, info.st_mtime_ns):
+        leesstaat = staat.setdefault('lees', {})
+        start = leesstaat.get('rijen', 0)
+        nieuw, volledig = lees_nieuwe_regels(pad, leesstaat)
+        if volledig or 'df' not in staat:
+            staat['df'] = nieuw
+        elif not nieuw.empty or start < len(staat['df']):
+            staat['df'] = pas_schema_toe(pd.concat([staat['df'].iloc[:start], nieuw]), SCHEMA_LOGBOEK)
+        staat['stat'] = (info.st_size, info.st_mtime_ns)
+    return staat['df']
+
+
+def sla_op(pad, staat, bewerkingen, sleutel=None, auteur=None):
+    # Bewerkingen uit toon_tabel: gewijzigde cellen en verwijderde regels gericht in het
+    # bestand, nieuwe regels achteraan, alles in het wijzigingslog op naam van 'auteur'.
+    # Geeft het aantal gewijzigde + verwijderde + nieuwe regels
+    wijzigingslog.wijzig(pad, bewerkingen['wijzigingen'], bewerkingen['verwijderd'], bewerkingen['toegevoegd'],
+                         auteur=auteur, leesstaat=staat.get('lees'))
+    if sleutel is not None:
+        st.session_state[f"{sleutel}_versie"] = st.session_state.get(f"{sleutel}_versie", 0) + 1
+    return len(bewerkingen['wijzigingen']) + len(bewerkingen['verwijderd']) + len(bewerkingen['toegevoegd'])
+
+
+def toon_historie(pad, sleutel, auteur=None, staat=None):
+    # Wijzigingslog van een logboek: alle wijzigingen per veld, de laatste ongedaan maken
+    # en het logboek zoals het op een eerdere datum was
+    with st.expander("🕓 Wijzigingslog"):
+        geschiedenis = wijzigingslog.geschiedenis(pad)
+        if geschiedenis.empty:
+            st.caption("Nog geen wijzigingen vastgelegd.")
+        else:
+            toon_tabel(geschiedenis, f"{sleutel}_log", omgekeerd=True, hide_index=True, use_container_width=True)
+
+        if st.button("↩️ Laatste wijziging ongedaan maken", key=f"{sleutel}_ongedaan", disabled=not auteur,
+                     help=None if auteur else "Vul eerst uw naam in"):
+            groep = wijzigingslog.maak_ongedaan(pad, auteur, leesstaat=(staat or {}).get('lees'))
+            if groep is None:
+                st.info("Er is geen wijziging om ongedaan te maken.")
+            else:
+                st.success(f"Wijziging {groep} is ongedaan gemaakt.")
+
+        datum = st.date_input("Logboek bekijken zoals het was op", value=None, key=f"{sleutel}_opdatum")
+        if datum is not None:
+            try:
+                toon_tabel(wijzigingslog.op_datum(pad, datum), f"{sleutel}_opdatum_tabel", omgekeerd=True,
+                           use_container_width=True)
+            except ValueError as e:
+                st.info(str(e))
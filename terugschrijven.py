@@ -0,0 +1,424 @@
+import argparse
+import csv
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from profiel import importeer
+from schijfcache import bestandsslot
+
+# Dag-totalen van rodepet.py terugschrijven naar het lijn-tabblad in het werkboek.
+# Een .xlsx is een zip met per tabblad een XML bestand. We passen alleen de XML van
+# de geraakte tabbladen aan (rij invullen of achteraan toevoegen); alle andere
+# onderdelen worden per stuk gestreamd overgenomen. Geen openpyxl load/save van het
+# hele werkboek, dus een opslag blijft snel, ook bij een werkboek van tientallen MB.
+#
+# Eén rij per lijn en dag in het tabblad. Meer orders op één dag worden samengeteld
+# (dagtotaal) en die som vervangt de rij van die dag. De wachtrij neemt daarom de
+# eerdere orders van dezelfde dag uit de dagtotalen CSV mee; zo telt een latere order
+# op bij de eerdere en geeft opnieuw inhalen vanaf de CSV hetzelfde resultaat.
+#
+# In de app: plan(regel) zet een dag-totaal op een wachtrij; een achtergrondthread
+# verzamelt de regels en schrijft ze per batch weg onder een bestandsslot.
+# Inhalen vanaf de CSV: python terugschrijven.py [--csv hegron_oee_dagtotalen_definitief.csv]
+# Controle: python terugschrijven.py --controleer
+
+# --- CONFIGURATIE ---
+WERKBOEK_BESTAND = 'Data Lijnen boven OEE .xlsx'
+DAGTOTALEN_BESTAND = 'hegron_oee_dagtotalen_definitief.csv'
+BATCH_WACHT = 0.5      # seconden wachten op meer regels voor één batch
+OPNIEUW_WACHT = 30     # seconden na een mislukte poging (bijv. werkboek open in Excel)
+MAX_POGINGEN = 5
+
+DAGEN = ['maandag', 'dinsdag', 'woensdag', 'donderdag', 'vrijdag', 'zaterdag', 'zondag']
+MAANDEN = ['januari', 'februari', 'maart', 'april', 'mei', 'juni', 'juli', 'augustus',
+           'september', 'oktober', 'november', 'december']
+
+EXCEL_NUL = date(1899, 12, 30)
+
+
+# ==========================================
+# DAG-TOTAAL -> WERKBOEK KOLOMMEN
+# ==========================================
+def _datum(regel):
+    waarde = regel['Datum']
+    return waarde if isinstance(waarde, date) else datetime.strptime(str(waarde)[:10], '%Y-%m-%d').date()
+
+
+def _getal(waarde):
+    try:
+        return float(str(waarde).replace(',', '.'))
+    except (TypeError, ValueError):
+        return None
+
+
+def werkboek_waarden(regel):
+    # Kolomnaam in het lijn-tabblad -> waarde. 'Gemiddelde' wordt van de vorige rij overgenomen
+    dag = _datum(regel)
+    return {
+        'Week': dag.isocalendar()[1],
+        'DD-MM-YY': (dag - EXCEL_NUL).days,
+        'Datum': f"{DAGEN[dag.weekday()]} {dag.day} {MAANDEN[dag.month - 1]} {dag.year}",
+        'OEE': _getal(regel.get('OEE %')),
+        'Bandleidster': regel.get('Bandleider'),
+        'Hoeveelheid': _getal(regel.get('Goede Producten')),
+        'Product': regel.get('Product Nummer'),
+        'Aantal personen': _getal(regel.get('Aantal Mensen')),
+    }
+
+
+def _lijn(regel):
+    return str(regel['Machine Nummer']).strip()
+
+
+def _uniek(regels, kolom, scheiding):
+    gezien = []
+    for regel in regels:
+        waarde = str(regel.get(kolom) or '').strip()
+        if waarde and waarde not in gezien:
+            gezien.append(waarde)
+    return scheiding.join(gezien) or None
+
+
+def dagtotaal(regels):
+    # Orders van één lijn op één dag -> één regel: goede producten opgeteld, OEE gewogen
+    # naar de geplande tijd (zonder geplande tijden: het gemiddelde), de grootste bezetting
+    if len(regels) == 1:
+        return dict(regels[0])
+    oee = [_getal(r.get('OEE %')) for r in regels]
+    tijd = [_getal(r.get('Geplande Tijd')) for r in regels]
+    goed = [g for g in (_getal(r.get('Goede Producten')) for r in regels) if g is not None]
+    mensen = [m for m in (_getal(r.get('Aantal Mensen')) for r in regels) if m is not None]
+    paren = [(o, t) for o, t in zip(oee, tijd) if o is not None]
+    if paren and all(t is not None and t > 0 for _, t in paren):
+        oee_dag = sum(o * t for o, t in paren) / sum(t for _, t in paren)
+    else:
+        oee_dag = sum(o for o, _ in paren) / len(paren) if paren else None
+    return {**regels[0],
+            'OEE %': None if oee_dag is None else round(oee_dag, 1),
+            'Goede Producten': sum(goed) if goed else None,
+            'Aantal Mensen': max(mensen) if mensen else None,
+            'Bandleider': _uniek(regels, 'Bandleider', ' / '),
+            'Product Nummer': _uniek(regels, 'Product Nummer', ', ')}
+
+
+def per_dag(regels):
+    # {(lijn, datum): dagtotaal}, in de volgorde waarin de dagen voor het eerst voorkomen
+    groepen = {}
+    for regel in regels:
+        groepen.setdefault((_lijn(regel), _datum(regel)), []).append(regel)
+    return {sleutel: dagtotaal(groep) for sleutel, groep in groepen.items()}
+
+
+def met_eerdere_orders(regels, csv_pad):
+    # De dagen van 'regels' aangevuld met alle orders van die dagen uit de dagtotalen CSV
+    # (daar staat de nieuwe order zelf ook al in). Zonder CSV: alleen 'regels'
+    dagen = {(_lijn(r), _datum(r)) for r in regels}
+    if not csv_pad or not os.path.isfile(csv_pad):
+        return regels
+    with open(csv_pad, newline='', encoding='utf-8') as f:
+        eerder = [r for r in csv.DictReader(f, delimiter=';')
+                  if r.get('Machine Nummer') and r.get('Datum') and (_lijn(r), _datum(r)) in dagen]
+    gevonden = {(_lijn(r), _datum(r)) for r in eerder}
+    return eerder + [r for r in regels if (_lijn(r), _datum(r)) not in gevonden]
+
+
+# ==========================================
+# XLSX ONDERDELEN
+# ==========================================
+def _blad_paden(zin):
+    # Tabbladnaam -> pad van de XML in de zip (via workbook.xml en de relaties)
+    werkboek = zin.read('xl/workbook.xml').decode('utf-8')
+    relaties = zin.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+    doelen = {}
+    for rel in re.findall(r'<Relationship [^>]*>', relaties):
+        rid = re.search(r'Id="([^"]+)"', rel).group(1)
+        doel = re.search(r'Target="([^"]+)"', rel).group(1)
+        doelen[rid] = doel.lstrip('/') if doel.startswith('/') else 'xl/' + doel
+    paden = {}
+    for blad in re.findall(r'<sheet [^>]*>', werkboek):
+        naam = re.search(r'name="([^"]+)"', blad).group(1)
+        rid = re.search(r'r:id="([^"]+)"', blad).group(1)
+        paden[naam] = doelen[rid]
+    return paden
+
+
+def _gedeelde_strings(zin, indexen):
+    # Alleen de gevraagde shared strings (de kopregel) opzoeken, niet de hele tabel bewaren
+    if 'xl/sharedStrings.xml' not in zin.namelist() or not indexen:
+        return {}
+    tekst = zin.read('xl/sharedStrings.xml').decode('utf-8')
+    gevonden = {}
+    for i, si in enumerate(re.finditer(r'<si>(.*?)</si>', tekst, re.S)):
+        if i in indexen:
+            gevonden[i] = ''.join(re.findall(r'<t[^>]*>([^<]*)</t>', si.group(1)))
+        if i >= max(indexen):
+            break
+    return gevonden
+
+
+def _kolom_nummer(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _kopregel(xml, zin):
+    rij = re.search(r'<row r="1"[^>]*>(.*?)</row>', xml, re.S).group(1)
+    cellen = re.findall(r'<c r="([A-Z]+)1"([^>]*?)(?:/>|>(.*?)</c>)', rij, re.S)
+    indexen = {int(re.search(r'<v>(\d+)</v>', inhoud).group(1)) for _, attr, inhoud in cellen
+               if 't="s"' in attr and inhoud}
+    strings = _gedeelde_strings(zin, indexen)
+    kop = {}
+    for kolom, attr, inhoud in cellen:
+        if 't="s"' in attr:
+            naam = strings.get(int(re.search(r'<v>(\d+)</v>', inhoud).group(1)), '')
+        else:
+            naam = ''.join(re.findall(r'<t[^>]*>([^<]*)</t>', inhoud or '')) or re.sub(r'<[^>]+>', '', inhoud or '')
+        kop[naam.strip()] = kolom
+    return kop
+
+
+def _cel(ref, waarde, stijl):
+    s = f' s="{stijl}"' if stijl else ''
+    if waarde is None or waarde == '':
+        return f'<c r="{ref}"{s}/>' if stijl else ''
+    if isinstance(waarde, (int, float)):
+        return f'<c r="{ref}"{s}><v>{waarde:g}</v></c>' if isinstance(waarde, float) else f'<c r="{ref}"{s}><v>{waarde}</v></c>'
+    return f'<c r="{ref}"{s} t="inlineStr"><is><t>{escape(str(waarde))}</t></is></c>'
+
+
+def pas_blad_aan(xml, regels, zin):
+    # Per dag (per_dag: orders van dezelfde dag samengeteld): de bestaande rij met die
+    # datum vervangen, anders achteraan toevoegen. Elk rijnummer komt één keer voor
+    kop = _kopregel(xml, zin)
+    datum_kolom = kop['DD-MM-YY']
+    rij_per_datum = {int(float(v)): int(r) for r, v in
+                     re.findall(rf'<c r="{datum_kolom}(\d+)"[^>]*><v>([\d.]+)</v>', xml)}
+    laatste_rij = max([int(r) for r in re.findall(r'<row r="(\d+)"', xml)] or [1])
+
+    # Opmaak (datum/getal formaat) en 'Gemiddelde' overnemen van de laatste ingevulde cel per kolom
+    stijlen = {kolom: (re.findall(rf'<c r="{kolom}\d+" s="(\d+)"', xml) or [None])[-1] for kolom in kop.values()}
+    gemiddelde = None
+    if 'Gemiddelde' in kop:
+        eerder = re.findall(rf'<c r="{kop["Gemiddelde"]}\d+"[^>]*><v>([^<]+)</v>', xml)
+        gemiddelde = _getal(eerder[-1]) if eerder else None
+
+    vervang, toevoegen = {}, {}
+    for regel in per_dag(regels).values():
+        waarden = werkboek_waarden(regel)
+        waarden['Gemiddelde'] = gemiddelde
+        rij = rij_per_datum.get(waarden['DD-MM-YY'])
+        if rij is None:
+            laatste_rij += 1
+            rij = rij_per_datum[waarden['DD-MM-YY']] = laatste_rij
+        kolommen = sorted(kop.items(), key=lambda kv: _kolom_nummer(kv[1]))
+        cellen = ''.join(_cel(f"{kolom}{rij}", waarden.get(naam), stijlen.get(kolom)) for naam, kolom in kolommen)
+        nieuw = f'<row r="{rij}">{cellen}</row>'
+        if f'<row r="{rij}"' in xml:
+            vervang[rij] = nieuw
+        else:
+            toevoegen[rij] = nieuw
+
+    if vervang:
+        xml = re.sub(r'<row r="(\d+)"[^>]*?(?:/>|>.*?</row>)',
+                     lambda m: vervang.get(int(m.group(1)), m.group(0)), xml, flags=re.S)
+    if toevoegen:
+        if '<sheetData/>' in xml:
+            xml = xml.replace('<sheetData/>', '<sheetData></sheetData>')
+        einde = xml.rfind('</sheetData>')
+        xml = xml[:einde] + ''.join(toevoegen[rij] for rij in sorted(toevoegen)) + xml[einde:]
+
+    laatste_kolom = max(kop.values(), key=_kolom_nummer)
+    return re.sub(r'<dimension ref="[^"]*"/>', f'<dimension ref="A1:{laatste_kolom}{laatste_rij}"/>', xml, count=1)
+
+
+def _kopieer(zin, info, zout):
+    # Ongewijzigd onderdeel overnemen met dezelfde naam, datum en compressie, in stukken
+    # gestreamd zodat een groot onderdeel niet in één keer in het geheugen staat
+    with zin.open(info) as bron, zout.open(info, 'w') as doel:
+        shutil.copyfileobj(bron, doel, 1 << 20)
+
+
+def schrijf_dagtotalen(regels, werkboek=WERKBOEK_BESTAND):
+    # Geeft {lijn: aantal dagen} terug; lijnen zonder eigen tabblad worden overgeslagen
+    per_lijn = {}
+    for (lijn, _), regel in per_dag(regels).items():
+        per_lijn.setdefault(lijn, []).append(regel)
+
+    with zipfile.ZipFile(werkboek) as zin:
+        paden = _blad_paden(zin)
+        nieuwe_xml = {}
+        for lijn, lijn_regels in per_lijn.items():
+            if lijn in paden:
+                xml = zin.read(paden[lijn]).decode('utf-8')
+                nieuwe_xml[paden[lijn]] = pas_blad_aan(xml, lijn_regels, zin).encode('utf-8')
+
+        if not nieuwe_xml:
+            return {}
+
+        tijdelijk = werkboek + '.tmp'
+        with zipfile.ZipFile(tijdelijk, 'w') as zout:
+            for info in zin.infolist():
+                if info.filename in nieuwe_xml:
+                    zout.writestr(info.filename, nieuwe_xml[info.filename], compress_type=zipfile.ZIP_DEFLATED)
+                else:
+                    _kopieer(zin, info, zout)
+    os.replace(tijdelijk, werkboek)
+    return {lijn: len(r) for lijn, r in per_lijn.items() if lijn in paden}
+
+
+# ==========================================
+# ACHTERGROND WACHTRIJ
+# ==========================================
+_WACHTRIJ = queue.Queue()
+_WERKER = None
+_WERKER_SLOT = threading.Lock()
+
+# Laatste resultaten voor de app: (tijd, lijn, datum, status)
+RESULTATEN = deque(maxlen=50)
+
+
+def _batch(eerste):
+    items = [eerste]
+    einde = time.monotonic() + BATCH_WACHT
+    while time.monotonic() < einde:
+        try:
+            items.append(_WACHTRIJ.get(timeout=max(0, einde - time.monotonic())))
+        except queue.Empty:
+            break
+    return items
+
+
+def _werk():
+    while True:
+        items = _batch(_WACHTRIJ.get())
+        per_werkboek = {}
+        for werkboek, csv_pad, regel, poging in items:
+            per_werkboek.setdefault((werkboek, csv_pad), []).append((regel, poging))
+
+        for (werkboek, csv_pad), lijst in per_werkboek.items():
+            regels = [regel for regel, _ in lijst]
+            try:
+                with bestandsslot(werkboek + '.lock'):
+                    geschreven = schrijf_dagtotalen(met_eerdere_orders(regels, csv_pad), werkboek)
+                for regel in regels:
+                    lijn = str(regel['Machine Nummer']).strip()
+                    status = 'opgeslagen' if lijn in geschreven else 'geen tabblad voor deze lijn'
+                    RESULTATEN.append((datetime.now(), lijn, str(regel['Datum']), status))
+            except Exception as e:
+                # Bijv. werkboek geopend in Excel (Windows): later opnieuw proberen
+                for regel, poging in lijst:
+                    RESULTATEN.append((datetime.now(), str(regel['Machine Nummer']), str(regel['Datum']), f"fout: {e}"))
+                    if poging + 1 < MAX_POGINGEN:
+                        threading.Timer(OPNIEUW_WACHT, _WACHTRIJ.put, [(werkboek, csv_pad, regel, poging + 1)]).start()
+
+
+def plan(regel, werkboek=WERKBOEK_BESTAND, csv_pad=DAGTOTALEN_BESTAND):
+    # Zet één order (dict in de kolommen van de dagtotalen CSV) op de wachtrij; de orders
+    # van dezelfde lijn en dag in 'csv_pad' tellen mee in het dagtotaal
+    global _WERKER
+    with _WERKER_SLOT:
+        if _WERKER is None or not _WERKER.is_alive():
+            _WERKER = threading.Thread(target=_werk, name='werkboek-terugschrijven', daemon=True)
+            _WERKER.start()
+    _WACHTRIJ.put((werkboek, csv_pad, dict(regel), 0))
+
+
+def wachtend():
+    return _WACHTRIJ.qsize()
+
+
+# ==========================================
+# CONTROLE
+# ==========================================
+def _dag_in_blad(werkboek, lijn, dag):
+    # (rijen volgens pandas, rijen volgens openpyxl, dubbele rijnummers in de XML)
+    pd, openpyxl = importeer('pandas'), importeer('openpyxl')
+    with zipfile.ZipFile(werkboek) as zin:
+        nummers = re.findall(r'<row r="(\d+)"', zin.read(_blad_paden(zin)[lijn]).decode('utf-8'))
+    df = pd.read_excel(werkboek, sheet_name=lijn)
+    volgens_pandas = df[pd.to_datetime(df['DD-MM-YY'], errors='coerce').dt.date == dag]['Hoeveelheid'].tolist()
+    blad = openpyxl.load_workbook(werkboek, read_only=True)[lijn]
+    rijen = blad.iter_rows(values_only=True)
+    kop = [str(k).strip() for k in next(rijen)]
+    volgens_openpyxl = [r[kop.index('Hoeveelheid')] for r in rijen
+                        if isinstance(r[kop.index('DD-MM-YY')], datetime) and r[kop.index('DD-MM-YY')].date() == dag]
+    return volgens_pandas, volgens_openpyxl, len(nummers) - len(set(nummers))
+
+
+def _tel_dagen(regels):
+    aantallen = {}
+    for regel in regels:
+        sleutel = (_lijn(regel), _datum(regel))
+        aantallen[sleutel] = aantallen.get(sleutel, 0) + 1
+    return aantallen
+
+
+def controleer(werkboek=WERKBOEK_BESTAND, voorbeeld='hegron_oee_logboek_v5.csv'):
+    # Twee orders van één lijn op één dag: in één batch, in twee batches (de tweede via de
+    # CSV aangevuld) en opnieuw inhalen moeten alle drie één rij met de som geven
+    with open(voorbeeld, newline='', encoding='utf-8') as f:
+        orders = list(csv.DictReader(f, delimiter=';'))
+    sleutel = next(k for k, n in _tel_dagen(orders).items() if n > 1)
+    dubbel = [r for r in orders if (_lijn(r), _datum(r)) == sleutel]
+    verwacht = sum(_getal(r['Goede Producten']) for r in dubbel)
+    fouten = []
+    with tempfile.TemporaryDirectory() as map_naam:
+        for naam in ['één batch', 'twee batches', 'opnieuw inhalen']:
+            kopie = os.path.join(map_naam, f"{naam}.xlsx")
+            shutil.copyfile(werkboek, kopie)
+            csv_pad = os.path.join(map_naam, f"{naam}.csv")
+            if naam == 'één batch':
+                schrijf_dagtotalen(dubbel, kopie)
+            else:
+                for i, order in enumerate(dubbel):
+                    # Zoals rodepet.py: eerst de order in de CSV, dan terugschrijven
+                    with open(csv_pad, 'w', newline='', encoding='utf-8') as f:
+                        schrijver = csv.DictWriter(f, fieldnames=list(order), delimiter=';')
+                        schrijver.writeheader()
+                        schrijver.writerows(dubbel[:i + 1])
+                    schrijf_dagtotalen(met_eerdere_orders([order], csv_pad), kopie)
+                if naam == 'opnieuw inhalen':
+                    schrijf_dagtotalen(dubbel, kopie)
+            volgens_pandas, volgens_openpyxl, dubbele_rijen = _dag_in_blad(kopie, *sleutel)
+            if volgens_pandas != [verwacht] or volgens_openpyxl != [verwacht] or dubbele_rijen:
+                fouten.append(f"{naam}: pandas {volgens_pandas}, openpyxl {volgens_openpyxl}, verwacht [{verwacht}], "
+                              f"{dubbele_rijen} dubbele rijnummers")
+    return fouten
+
+
+# ==========================================
+# COMMAND LINE (INHALEN VANAF DE CSV)
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dag-totalen uit de CSV in het werkboek zetten")
+    parser.add_argument('--csv', default=DAGTOTALEN_BESTAND)
+    parser.add_argument('--werkboek', default=WERKBOEK_BESTAND)
+    parser.add_argument('--controleer', action='store_true',
+                        help="Orders van dezelfde dag op een kopie van het werkboek controleren")
+    args = parser.parse_args(argv)
+
+    if args.controleer:
+        fouten = controleer(args.werkboek)
+        print("\n".join(fouten) or "Dagtotalen terugschrijven: in orde")
+        raise SystemExit(len(fouten))
+    with open(args.csv, newline='', encoding='utf-8') as f:
+        regels = list(csv.DictReader(f, delimiter=';'))
+    with bestandsslot(args.werkboek + '.lock'):
+        geschreven = schrijf_dagtotalen(regels, args.werkboek)
+    for lijn, aantal in sorted(geschreven.items()):
+        print(f"Lijn {lijn}: {aantal} dag-totalen")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import glob
+import os
+import uuid
+from datetime import datetime
+
+import pandas as pd
+from archief import archief_grens, archief_lijnen, partitie_bestanden
+from profiel import importeer
+
+# Tijdblokken van de dagstaat (rodepet.py) als Parquet, gepartitioneerd zoals het archief:
+#   tijdblokken/jaar=2025/maand=11/lijn=24/20251118_3f9c2a1b.parquet
+# Elke opgeslagen dagstaat is één klein bestand; --compacteer voegt de bestanden van
+# afgesloten maanden per partitie samen tot deel.parquet. Tijdlijn en heatmap worden in
+# DuckDB geaggregeerd, zodat alleen het resultaat (een paar duizend balken of een
+# 7 x 24 raster) naar pandas en de browser gaat, ook bij maanden aan blokken.
+#
+#   bewaar(df_vandaag, datum, '24', 'Shirley', 'INP1120573')   # vanuit rodepet.py
+#   df, stap = tijdlijn(van='2025-11-01', lijnen=['24', '25'])
+#   tabel = heatmap(van='2025-11-01', soort='Ongepland')
+#   python tijdblokken.py --compacteer
+
+# --- CONFIGURATIE ---
+BASIS_MAP = os.environ.get('OEE_TIJDBLOKKEN_MAP', '.')
+NAAM = 'tijdblokken'
+SOORTEN = ['Ongepland', 'Gepland', 'Stilstand', 'Productie']
+# Boven dit aantal balken wordt de tijdlijn per tijdvak samengevat (per lijn het
+# soort dat in dat vak de meeste minuten had); de vakken lopen op in deze stappen
+MAX_BALKEN = 3000
+STAPPEN_MINUTEN = [5, 15, 30, 60, 120, 240, 480, 1440]
+WEEKDAGEN = ['ma', 'di', 'wo', 'do', 'vr', 'za', 'zo']
+
+
+# ==========================================
+# SCHRIJVEN
+# ==========================================
+def bewaar(blokken, datum, lijn, bandleider=None, product=None, basis_map=BASIS_MAP):
+    # 'blokken' zoals in rodepet.py: Starttijd/Eindtijd als "HH:MM", Minuten,
+    # Activiteit, Type en Opmerking. Geeft het pad van het nieuwe bestand
+    datum = pd.Timestamp(datum).normalize()
+    df = pd.DataFrame({
+        'Datum': datum,
+        'Start': datum + pd.to_timedelta(blokken['Starttijd'].astype(str) + ':00'),
+        'Eind': datum + pd.to_timedelta(blokken['Eindtijd'].astype(str) + ':00'),
+        'Minuten': blokken['Minuten'].astype('int32'),
+        'Activiteit': blokken['Activiteit'].astype(str),
+        'Type': blokken['Type'].astype(str),
+        'Opmerking': blokken['Opmerking'].fillna('').astype(str),
+        'Bandleider': bandleider or '',
+        'Product Nummer': product or '',
+        'Opgeslagen': pd.Timestamp(datetime.now()),
+    })
+    map_naam = os.path.join(basis_map, NAAM, f"jaar={datum.year}", f"maand={datum.month:02d}", f"lijn={lijn}")
+    os.makedirs(map_naam, exist_ok=True)
+    doel = os.path.join(map_naam, f"{datum:%Y%m%d}_{uuid.uuid4().hex[:8]}.parquet")
+    df.to_parquet(doel + '.tmp', index=False)
+    os.replace(doel + '.tmp', doel)
+    return doel
+
+
+def compacteer(tot=None, basis_map=BASIS_MAP):
+    # Partities van maanden vóór 'tot' (standaard: de lopende maand) worden één bestand.
+    # Eerst het nieuwe bestand, dan de losse weg: een lezer ziet hooguit even beide
+    tot = pd.Timestamp(tot) if tot is not None else archief_grens()
+    partities = 0
+    for map_naam in sorted(glob.glob(os.path.join(basis_map, NAAM, 'jaar=*', 'maand=*', 'lijn=*'))):
+        bestanden = sorted(glob.glob(os.path.join(map_naam, '*.parquet')))
+        jaar, maand = (int(d.split('=', 1)[1]) for d in map_naam.replace('\\', '/').split('/')[-3:-1])
+        if len(bestanden) < 2 or pd.Timestamp(year=jaar, month=maand, day=1) >= tot:
+            continue
+        df = pd.concat([pd.read_parquet(b) for b in bestanden], ignore_index=True).sort_values('Start', kind='stable')
+        doel = os.path.join(map_naam, 'deel.parquet')
+        df.to_parquet(doel + '.tmp', index=False)
+        os.replace(doel + '.tmp', doel)
+        for pad in bestanden:
+            if pad != doel:
+                os.remove(pad)
+        partities += 1
+    return partities
+
+
+# ==========================================
+# LEZEN (DUCKDB)
+# ==========================================
+_VERBINDING = {}
+
+
+def _cursor():
+    # Eén verbinding per proces, een eigen cursor per query (zoals databank.vraag)
+    if 'con' not in _VERBINDING:
+        _VERBINDING['con'] = importeer('duckdb').connect(':memory:')
+    return _VERBINDING['con'].cursor()
+
+
+def lijnen(basis_map=BASIS_MAP):
+    return sorted(archief_lijnen(NAAM, basis_map), key=lambda l: (len(l), l))
+
+
+def _bron(van, tot, lijnen, basis_map):
+    # Partitie-snoei op mapnaam (archief.partitie_bestanden); None als er niets is
+    bestanden = partitie_bestanden(NAAM, van, tot, lijnen, basis_map)
+    if not bestanden:
+        return None
+    lijst = ', '.join("'" + b.replace("'", "''") + "'" for b in bestanden)
+    return (f"read_parquet([{lijst}], hive_partitioning=true, union_by_name=true, "
+            f"hive_types={{'jaar': INTEGER, 'maand': INTEGER, 'lijn': VARCHAR}})")
+
+
+def _soort(soort):
+    # Een Type, 'Stilstand' (alles behalve productie) of één activiteit
+    if soort is None:
+        return "TRUE", []
+    if soort == 'Stilstand':
+        return "Type <> 'Productie'", []
+    if soort in SOORTEN:
+        return "Type = ?", [soort]
+    return "Activiteit = ?", [soort]
+
+
+def _blokken(van, tot, lijnen, basis_map, soort=None):
+    # CTE 'blokken' met de gekozen periode, lijnen en soort
+    bron = _bron(van, tot, lijnen, basis_map)
+    if bron is None:
+        return None, []
+    voorwaarde, parameters = _soort(soort)
+    periode = []
+    if van is not None:
+        periode.append("Datum >= ?")
+        parameters.append(pd.Timestamp(van).date())
+    if tot is not None:
+        periode.append("Datum <= ?")
+        parameters.append(pd.Timestamp(tot).date())
+    waar = ' AND '.join([voorwaarde] + periode)
+    return (f"blokken AS (SELECT lijn AS Lijn, CAST(Datum AS DATE) AS Datum, Start, Eind, Minuten, Activiteit, Type "
+            f"FROM {bron} WHERE {waar})"), parameters
+
+
+def periode(basis_map=BASIS_MAP):
+    # (eerste, laatste) datum met tijdblokken, of None
+    blokken, parameters = _blokken(None, None, None, basis_map)
+    if blokken is None:
+        return None
+    van, tot = _cursor().execute(f"WITH {blokken} SELECT min(Datum), max(Datum) FROM blokken", parameters).fetchone()
+    return (van, tot) if van is not None else None
+
+
+def activiteiten(basis_map=BASIS_MAP):
+    blokken, parameters = _blokken(None, None, None, basis_map)
+    if blokken is None:
+        return []
+    sql = f"WITH {blokken} SELECT DISTINCT Activiteit FROM blokken WHERE Type <> 'Productie' ORDER BY 1"
+    return [r[0] for r in _cursor().execute(sql, parameters).fetchall()]
+
+
+def _stap(minuten):
+    # Kleinste vak waarmee de tijdlijn onder MAX_BALKEN blijft
+    for stap in STAPPEN_MINUTEN:
+        if minuten / stap <= MAX_BALKEN:
+            return stap
+    return STAPPEN_MINUTEN[-1]
+
+
+def tijdlijn(van=None, tot=None, lijnen=None, basis_map=BASIS_MAP):
+    # Balken voor een Gantt per lijn: (DataFrame Lijn/Start/Eind/Type/Activiteit/Minuten, stap).
+    # Aansluitende blokken met dezelfde activiteit worden één balk; bij te veel balken
+    # per 'stap' minuten het overheersende soort per vak, afgekapt op het eerste en
+    # laatste ingevulde blok; een gat zonder blokken (de nacht) onderbreekt de balk
+    # (stap None: exacte blokken)
+    blokken, parameters = _blokken(van, tot, lijnen, basis_map)
+    if blokken is None:
+        return pd.DataFrame(columns=['Lijn', 'Start', 'Eind', 'Type', 'Activiteit', 'Minuten']), None
+    aantal, minuten = _cursor().execute(f"WITH {blokken} SELECT count(*), COALESCE(sum(Minuten), 0) FROM blokken",
+                                        parameters).fetchone()
+    if aantal <= MAX_BALKEN:
+        df = _cursor().execute(f"""
+            WITH {blokken},
+            g AS (SELECT *, CASE WHEN lag(Eind) OVER w = Start AND lag(Activiteit) OVER w = Activiteit
+                                 THEN 0 ELSE 1 END AS nieuw
+                  FROM blokken WINDOW w AS (PARTITION BY Lijn ORDER BY Start)),
+            e AS (SELECT *, sum(nieuw) OVER (PARTITION BY Lijn ORDER BY Start ROWS UNBOUNDED PRECEDING) AS eiland FROM g)
+            SELECT Lijn, min(Start) AS Start, max(Eind) AS Eind, any_value(Type) AS Type,
+                   any_value(Activiteit) AS Activiteit, sum(Minuten) AS Minuten
+            FROM e GROUP BY Lijn, eiland ORDER BY Lijn, Start""", parameters).df()
+        return df, None
+
+    stap = _stap(minuten)
+    df = _cursor().execute(f"""
+        WITH {blokken},
+        v AS (SELECT Lijn, Type, Start, Eind,
+                     unnest(generate_series(time_bucket(INTERVAL '{stap} minutes', Start),
+                                            Eind - INTERVAL 1 MICROSECOND, INTERVAL '{stap} minutes')) AS vak
+              FROM blokken),
+        m AS (SELECT Lijn, vak, Type, min(greatest(Start, vak)) AS van, max(least(Eind, vak + INTERVAL '{stap} minutes')) AS tot,
+                     sum(epoch(least(Eind, vak + INTERVAL '{stap} minutes') - greatest(Start, vak))) / 60 AS Minuten
+              FROM v GROUP BY ALL),
+        d AS (SELECT Lijn, vak, arg_max(Type, Minuten) AS Type, min(van) AS van, max(tot) AS tot, sum(Minuten) AS Minuten
+              FROM m GROUP BY ALL),
+        g AS (SELECT *, CASE WHEN lag(Type) OVER w = Type AND lag(tot) OVER w >= van THEN 0 ELSE 1 END AS nieuw
+              FROM d WINDOW w AS (PARTITION BY Lijn ORDER BY vak)),
+        e AS (SELECT *, sum(nieuw) OVER (PARTITION BY Lijn ORDER BY vak ROWS UNBOUNDED PRECEDING) AS eiland FROM g)
+        SELECT Lijn, min(van) AS Start, max(tot) AS Eind, Type, Type AS Activiteit, round(sum(Minuten)) AS Minuten
+        FROM e GROUP BY Lijn, Type, eiland ORDER BY Lijn, Start""", parameters).df()
+    return df, stap
+
+
+def heatmap(van=None, tot=None, lijnen=None, soort='Ongepland', per_dag=True, basis_map=BASIS_MAP):
+    # Minuten 'soort' per weekdag x uur van de dag (7 x 24, rijen ma..zo). Een blok over
+    # meerdere uren telt per uur mee voor het deel in dat uur. 'per_dag': gedeeld door
+    # het aantal ingevulde lijn-dagen op die weekdag, zodat een periode met meer
+    # maandagen die niet zwaarder laat wegen
+    leeg = pd.DataFrame(0.0, index=WEEKDAGEN, columns=range(24))
+    blokken, parameters = _blokken(van, tot, lijnen, basis_map, soort)
+    if blokken is None:
+        return leeg
+    df = _cursor().execute(f"""
+        WITH {blokken},
+        u AS (SELECT Start, Eind, unnest(generate_series(date_trunc('hour', Start), Eind - INTERVAL 1 MICROSECOND,
+                                                         INTERVAL 1 HOUR)) AS uur
+              FROM blokken)
+        SELECT isodow(uur) AS Weekdag, hour(uur) AS Uur,
+               sum(epoch(least(Eind, uur + INTERVAL 1 HOUR) - greatest(Start, uur))) / 60 AS Minuten
+        FROM u GROUP BY ALL""", parameters).df()
+    if df.empty:
+        return leeg
+    tabel = df.pivot(index='Weekdag', columns='Uur', values='Minuten').reindex(index=range(1, 8), columns=range(24))
+    if per_dag:
+        alle, parameters = _blokken(van, tot, lijnen, basis_map)
+        dagen = _cursor().execute(f"WITH {alle} SELECT isodow(Datum), count(DISTINCT (Lijn, Datum)) FROM blokken GROUP BY 1",
+                                  parameters).fetchall()
+        tabel = tabel.div(pd.Series(dict(dagen)).reindex(range(1, 8)), axis=0)
+    tabel = tabel.fillna(0.0)
+    tabel.index = WEEKDAGEN
+    return tabel
+
+
+# ==========================================
+# COMMAND LINE (COMPACTIE JOB)
+# ==========================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tijdblokken van de dagstaat: overzicht en compactie")
+    parser.add_argument('--compacteer', action='store_true', help="Losse bestanden van afgesloten maanden samenvoegen")
+    parser.add_argument('--map', default=BASIS_MAP)
+    args = parser.parse_args(argv)
+
+    if args.compacteer:
+        print(f"{compacteer(basis_map=args.map)} partities samengevoegd")
+    bereik = periode(args.map)
+    bestanden = glob.glob(os.path.join(args.map, NAAM, 'jaar=*', 'maand=*', 'lijn=*', '*.parquet'))
+    if bereik is None:
+        print("Nog geen tijdblokken opgeslagen")
+    else:
+        print(f"{len(bestanden)} bestanden, lijnen {', '.join(lijnen(args.map))}, van {bereik[0]} tot {bereik[1]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,55 +1,37 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from databank import dataset_lijnen, dataset_locaties, dataset_periode, dataset_view, gedeelde_dataset, verbind, ververs_dataset
+from dataset import nieuwe_staat
+from profiel import start_meting, toon_meting
+from analyse import bereken_kpis, filter_data
+from grafieken import maak_figuren_apart, maak_figuur_samen, plot_config
+from schijfcache import onthoud
+
+meting = start_meting()
 
 # 1. Pagina instellingen
 st.set_page_config(page_title="OEE Dashboard", layout="wide")
 
-@st.cache_data
-def load_data():
-    file_path = 'Data Lijnen boven OEE .xlsx'
-    tabbladen = ['2', '11', '24', '25', '29', '31']
-    all_sheets = []
-    
-    try:
-        xls = pd.ExcelFile(file_path)
-        for sheet in tabbladen:
-            if sheet in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name=sheet)
-                df['Lijn'] = str(sheet)
-                df['DD-MM-YY'] = pd.to_datetime(df['DD-MM-YY'], errors='coerce')
-                for col in ['OEE', 'Hoeveelheid', 'Aantal personen']:
-                     if col in df.columns:
-                        if df[col].dtype == 'object':
-                            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
-                        else:
-                            df[col] = pd.to_numeric(df[col], errors='coerce')
-                
-                if 'Bandleidster' in df.columns:
-                    df['Bandleidster'] = df['Bandleidster'].astype(str)
-                    
-                all_sheets.append(df)
-        full_df = pd.concat(all_sheets, ignore_index=True)
-        return full_df.dropna(subset=['DD-MM-YY', 'OEE'])
-    except Exception as e:
-        st.error(f"Fout bij laden bestand: {e}")
-        return pd.DataFrame()
-
-df = load_data()
-
-# --- HELPER FUNCTIE VOOR LINEAIRE REGRESSIE ---
-def bereken_lineaire_trend(df_in, x_col, y_col):
-    df_clean = df_in.dropna(subset=[x_col, y_col])
-    if len(df_clean) < 2:
-        return None, None
-    x_dates = df_clean[x_col]
-    x_num = (x_dates - x_dates.min()).dt.days
-    y = df_clean[y_col]
-    z = np.polyfit(x_num, y, 1)
-    p = np.poly1d(z)
-    return x_dates, p(x_num)
+# Eén DuckDB database voor alle sessies; elke sessie haalt alleen de rijen op
+# van de lijnen die hij tekent in plaats van een eigen kopie van het werkboek.
+# De dataset combineert het werkboek met de logboeken en wordt per rerun
+# incrementeel bijgewerkt (ongewijzigde bestanden kosten alleen een stat)
+@st.cache_resource
+def verbinding():
+    return verbind(), nieuwe_staat()
+
+try:
+    con, dataset_staat = verbinding()
+    ververs_dataset(con, dataset_staat)
+    alle_lijnen = dataset_lijnen(con)
+    lijn_locatie = dataset_locaties(con)
+    periode_van, periode_tot = dataset_periode(con)
+except Exception as e:
+    st.error(f"Fout bij laden bestand: {e}")
+    st.stop()
+
+# Met meerdere locaties in het bronnenregister staat de locatie achter het lijnnummer
+def lijn_label(lijn):
+    return f"{lijn} ({lijn_locatie[lijn]})" if lijn in lijn_locatie else lijn
 
 # --- SIDEBAR NAVIGATIE ---
 st.sidebar.header("Analyse Selectie")
@@ -65,7 +47,8 @@ if analyse_type == "Losse productielijn analyseren":
     st.sidebar.subheader("Instellingen Individueel")
     geselecteerde_lijnen = [st.sidebar.selectbox(
         "Kies een machine lijn", 
-        options=sorted(df['Lijn'].unique())
+        options=alle_lijnen,
+        format_func=lijn_label
     )]
     weergave = st.sidebar.radio("Weergave methode:", ["Samen", "Apart"])
     modus = "Single"
@@ -75,28 +58,39 @@ else:
     st.sidebar.subheader("Instellingen Vergelijking")
     geselecteerde_lijnen = st.sidebar.multiselect(
         "Selecteer lijnen om te vergelijken", 
-        options=sorted(df['Lijn'].unique()),
-        default=[sorted(df['Lijn'].unique())[0], sorted(df['Lijn'].unique())[1]]
+        options=alle_lijnen,
+        default=alle_lijnen[:2],
+        format_func=lijn_label
     )
     weergave = st.sidebar.radio("Weergave methode:", ["Samen", "Apart"])
     modus = "Multi"
     st.title("Vergelijking Productielijnen")
 
+# --- PERIODE ---
+# Met een archief (archief.py) worden alleen de maanden binnen de periode gelezen
+periode = st.sidebar.date_input("Periode", value=(periode_van, periode_tot),
+                                min_value=periode_van, max_value=periode_tot, format="DD-MM-YYYY")
+van, tot = periode if len(periode) == 2 else (periode[0], periode_tot)
+
 # --- DATA BASIS FILTERING ---
-df_lijn_basis = df[df['Lijn'].isin(geselecteerde_lijnen)].sort_values('DD-MM-YY')
+# Eén gedeelde dataset per proces (databank.gedeelde_dataset); deze sessie krijgt een
+# view met de gekozen lijnen en periode, op datum gesorteerd, zonder eigen kopie
+gedeeld = gedeelde_dataset(con, dataset_staat)
+df_lijn_basis = dataset_view(gedeeld, lijnen=geselecteerde_lijnen, van=van, tot=tot)
 
 # ==========================================
 # FILTERS
 # ==========================================
 toon_filters = st.toggle("Filters op Bezetting of Leiding")
 
-df_filtered = df_lijn_basis.copy()
+df_filtered = df_lijn_basis
 
 if toon_filters:
     st.markdown("##### Selecteer specifieke medewerkers of leidinggevenden")
     f_col1, f_col2 = st.columns(2)
 
     lead_counts = df_lijn_basis['Bandleidster'].value_counts()
+    lead_counts = lead_counts[lead_counts > 0]  # categorieën van andere lijnen overslaan
     lead_options = [f"{naam} ({count}x)" for naam, count in lead_counts.items()]
     lead_map = {f"{naam} ({count}x)": naam for naam, count in lead_counts.items()}
 
@@ -110,13 +104,9 @@ if toon_filters:
     with f_col2:
         gekozen_pers = st.multiselect("Selecteer Bezetting:", options=pers_options, placeholder="Kies bezetting (leeg = alles)")
 
-    if gekozen_leads:
-        echte_namen = [lead_map[x] for x in gekozen_leads]
-        df_filtered = df_filtered[df_filtered['Bandleidster'].isin(echte_namen)]
-    
-    if gekozen_pers:
-        echte_aantallen = [pers_map[x] for x in gekozen_pers]
-        df_filtered = df_filtered[df_filtered['Aantal personen'].isin(echte_aantallen)]
+    echte_namen = [lead_map[x] for x in gekozen_leads]
+    echte_aantallen = [pers_map[x] for x in gekozen_pers]
+    df_filtered = filter_data(df_lijn_basis, bandleidsters=echte_namen, bezetting=echte_aantallen)
 
 # ==========================================
 # KPI DASHBOARD
@@ -126,20 +116,13 @@ if not df_filtered.empty:
     st.markdown("### Key Performance Indicators")
     kpi1, kpi2, kpi3, kpi4 = st.columns(4)
     
-    avg_oee = df_filtered['OEE'].mean()
-    total_prod = df_filtered['Hoeveelheid'].sum()
-    max_oee = df_filtered['OEE'].max()
-    
-    if pd.notna(max_oee):
-        best_day_row = df_filtered.loc[df_filtered['OEE'].idxmax()]
-        best_day_str = best_day_row['DD-MM-YY'].strftime('%d-%m')
-    else:
-        best_day_str = "-"
+    kpis = bereken_kpis(df_filtered)
+    best_day_str = kpis['beste_dag'].strftime('%d-%m') if kpis['beste_dag'] is not None else "-"
     
-    kpi1.metric("Gemiddelde OEE", f"{avg_oee:.1f}%", delta_color="normal")
-    kpi2.metric("Totale Productie", f"{total_prod:,.0f}".replace(",", "."), "Stuks")
-    kpi3.metric("Hoogste Piek", f"{max_oee:.1f}%", f"op {best_day_str}")
-    kpi4.metric("Dagen in Selectie", len(df_filtered), "Records")
+    kpi1.metric("Gemiddelde OEE", f"{kpis['gem_oee']:.1f}%", delta_color="normal")
+    kpi2.metric("Totale Productie", f"{kpis['totale_productie']:,.0f}".replace(",", "."), "Stuks")
+    kpi3.metric("Hoogste Piek", f"{kpis['max_oee']:.1f}%", f"op {best_day_str}")
+    kpi4.metric("Dagen in Selectie", kpis['dagen'], "Records")
 else:
     st.warning("Geen data gevonden met deze combinatie van filters.")
 
@@ -160,15 +143,6 @@ with c2:
 with c3:
     toon_gemiddelde = st.toggle("Totaal Gemiddelde")
 
-kleuren_palet = ['#1f77b4', '#9467bd', '#2ca02c', '#d62728', '#8c564b', '#e377c2']
-hover_cols_basis = ['Bandleidster', 'Product', 'Aantal personen']
-
-plot_config = {
-    'displayModeBar': True,
-    'displaylogo': False,
-    'toImageButtonOptions': {'format': 'png', 'filename': 'oee_export', 'height': 800, 'width': 1200, 'scale': 2}
-}
-
 # ==========================================
 # PLOTTING LOGICA
 # ==========================================
@@ -176,178 +150,14 @@ if not df_filtered.empty:
     
     # --- SAMEN WEERGAVE ---
     if weergave == "Samen":
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        
-        for i, lijn_naam in enumerate(geselecteerde_lijnen):
-            lijn_data = df_filtered[df_filtered['Lijn'] == lijn_naam]
-            if lijn_data.empty: continue
-
-            if modus == "Single":
-                c_oee, c_qty = '#1f77b4', 'orange'
-                c_trend_week = 'red' 
-                c_trend_linear = 'darkred'
-            else:
-                c = kleuren_palet[i % len(kleuren_palet)]
-                c_oee, c_qty = c, c
-                c_trend_week = c
-                c_trend_linear = c
-
-            custom_data_oee = lijn_data[hover_cols_basis + ['Hoeveelheid']]
-            
-            # 1. Ruwe Data OEE
-            fig.add_trace(go.Scatter(
-                x=lijn_data['DD-MM-YY'], y=lijn_data['OEE'], name=f"Lijn {lijn_naam} OEE",
-                mode='lines+markers', customdata=custom_data_oee,
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>OEE: %{{y:.2f}}%<br>Hoeveelheid: %{{customdata[3]}}<br>Lid: %{{customdata[0]}}<extra></extra>",
-                opacity=0.5 if (toon_linear or toon_week_gem) else 1,
-                line=dict(color=c_oee, width=3)
-            ), secondary_y=False)
-
-            # 2. Ruwe Data Hoeveelheid
-            fig.add_trace(go.Scatter(
-                x=lijn_data['DD-MM-YY'], y=lijn_data['Hoeveelheid'], name=f"Lijn {lijn_naam} H",
-                mode='lines',
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Hoeveelheid: %{{y}}<extra></extra>",
-                line=dict(color=c_qty, width=1.5, dash='dot')
-            ), secondary_y=True)
-
-            # 3. WEEKGEMIDDELDE (GroupBy Year+Week)
-            if toon_week_gem:
-                # We groeperen op Jaar en Weeknummer om weekgemiddeldes te berekenen
-                # 'transform' zorgt dat dit gemiddelde voor elke dag in die week wordt ingevuld
-                t_oee = lijn_data.groupby([lijn_data['DD-MM-YY'].dt.isocalendar().year, 
-                                           lijn_data['DD-MM-YY'].dt.isocalendar().week])['OEE'].transform('mean')
-                
-                fig.add_trace(go.Scatter(
-                    x=lijn_data['DD-MM-YY'], y=t_oee, name=f"Weekgem. {lijn_naam}",
-                    # shape='hv' kan ook voor trapjes, maar standaard lijn verbindt de weken mooier
-                    line=dict(color=c_trend_week, width=2, dash='solid'), 
-                    hoverinfo='skip'
-                ), secondary_y=False)
-
-            # 4. LINEAR REGRESSION
-            if toon_linear and len(lijn_data) > 1:
-                tx, ty = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'OEE')
-                if tx is not None:
-                    fig.add_trace(go.Scatter(
-                        x=tx, y=ty, name=f"Trend {lijn_naam}",
-                        line=dict(color=c_trend_linear, width=4, dash='longdash'), 
-                        opacity=0.9, hoverinfo='skip'
-                    ), secondary_y=False)
-
-        if toon_gemiddelde:
-            fig.add_hline(y=df_filtered['OEE'].mean(), line_color="black", annotation_text="Gem. OEE")
-
-        fig.update_layout(height=600, hovermode="x unified", legend=dict(orientation="h", y=1.02, x=1, xanchor="right"))
-        fig.update_yaxes(title_text="OEE (%)", secondary_y=False, range=[0, 105])
-        fig.update_yaxes(title_text="Hoeveelheid (G)", secondary_y=True)
+        # Figuren komen uit de gedeelde schijfcache (sleutel = selectie + instellingen)
+        fig = onthoud(maak_figuur_samen, df_filtered, geselecteerde_lijnen, modus, toon_week_gem, toon_linear, toon_gemiddelde)
         st.plotly_chart(fig, use_container_width=True, config=plot_config)
 
     # --- APART WEERGAVE ---
     else:
-        fig_oee = go.Figure()
-        fig_qty = go.Figure()
-
-        for i, lijn_naam in enumerate(geselecteerde_lijnen):
-            lijn_data = df_filtered[df_filtered['Lijn'] == lijn_naam]
-            if lijn_data.empty: continue
-
-            if modus == "Single":
-                c_oee, c_qty = '#1f77b4', 'orange'
-                c_trend_linear_oee = 'red'
-                c_trend_linear_qty = 'darkorange'
-            else:
-                c = kleuren_palet[i % len(kleuren_palet)]
-                c_oee, c_qty = c, c
-                c_trend_linear_oee = c
-                c_trend_linear_qty = c
-
-            cd_oee = lijn_data[hover_cols_basis + ['Hoeveelheid']]
-            cd_qty = lijn_data[hover_cols_basis + ['OEE']]
-
-            # 1. Ruwe Plots
-            fig_oee.add_trace(go.Scatter(
-                x=lijn_data['Datum'], y=lijn_data['OEE'], name=f"Lijn {lijn_naam}",
-                mode='lines+markers', customdata=cd_oee,
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>OEE: %{{y:.2f}}%<br><b>Hoeveelheid: %{{customdata[3]}}</b><br>Lid: %{{customdata[0]}}<extra></extra>",
-                opacity=0.4 if (toon_linear or toon_week_gem) else 1,
-                line=dict(color=c_oee, width=3)
-            ))
-
-            fig_oee.update_xaxes(tickangle=-45)
-            fig_oee.update_yaxes(showgrid=True, gridwidth=2, gridcolor='LightGrey', minor=dict(showgrid=True, gridwidth=1, gridcolor='WhiteSmoke'))
-            # Verticale lijnen (x-as): dikke hoofdlijnen en dunne tussenlijnen
-            fig_oee.update_xaxes(
-                showgrid=True, 
-                gridwidth=1,           # Dikte verticale hoofdlijnen
-                gridcolor='LightGrey', 
-                minor=dict(
-                    showgrid=True, 
-                    gridwidth=0.3,       # Dikte verticale tussenlijnen
-                    gridcolor='WhiteSmoke'
-                )
-            )
-            
-            fig_qty.add_trace(go.Scatter(
-                x=lijn_data['Datum'], y=lijn_data['Hoeveelheid'], name=f"Lijn {lijn_naam}",
-                mode='lines', customdata=cd_qty,
-                hovertemplate=f"<b>Lijn {lijn_naam}</b><br>Datum: %{{x}}<br>Hoeveelheid: %{{y}}<br><b>OEE: %{{customdata[3]:.2f}}%</b><br>Product: %{{customdata[1]}}<extra></extra>",
-                opacity=0.4 if (toon_linear or toon_week_gem) else 1,
-                line=dict(color=c_qty, width=2),
-            ))
-
-            fig_qty.update_xaxes(tickangle=-45)
-            fig_qty.update_yaxes(showgrid=True, gridwidth=2, gridcolor='LightGrey', minor=dict(showgrid=True, gridwidth=1, gridcolor='WhiteSmoke'))
-            fig_qty.update_xaxes(
-                showgrid=True, 
-                gridwidth=1,           # Dikte verticale hoofdlijnen
-                gridcolor='LightGrey', 
-                minor=dict(
-                    showgrid=True, 
-                    gridwidth=0.3,       # Dikte verticale tussenlijnen
-                    gridcolor='WhiteSmoke'
-                )
-            )
-
-            # 2. WEEKGEMIDDELDE (GroupBy Year+Week)
-            if toon_week_gem:
-                # OEE
-                t_oee = lijn_data.groupby([lijn_data['DD-MM-YY'].dt.isocalendar().year, 
-                                           lijn_data['DD-MM-YY'].dt.isocalendar().week])['OEE'].transform('mean')
-                fig_oee.add_trace(go.Scatter(x=lijn_data['DD-MM-YY'], y=t_oee, name=f"Weekgem. {lijn_naam}",
-                                             line=dict(color=c_oee, width=2, dash='solid'), hoverinfo='skip'))
-                # Qty
-                t_qty = lijn_data.groupby([lijn_data['DD-MM-YY'].dt.isocalendar().year, 
-                                           lijn_data['DD-MM-YY'].dt.isocalendar().week])['Hoeveelheid'].transform('mean')
-                fig_qty.add_trace(go.Scatter(x=lijn_data['DD-MM-YY'], y=t_qty, name=f"Weekgem. {lijn_naam}",
-                                             line=dict(color=c_qty, width=2, dash='solid'), hoverinfo='skip'))
-
-            # 3. LINEAR REGRESSION
-            if toon_linear and len(lijn_data) > 1:
-                # OEE Trend
-                tx_oee, ty_oee = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'OEE')
-                if tx_oee is not None:
-                    fig_oee.add_trace(go.Scatter(
-                        x=tx_oee, y=ty_oee, name=f"Trend {lijn_naam}",
-                        line=dict(color=c_trend_linear_oee, width=4, dash='longdash'), 
-                        opacity=1, hoverinfo='skip'
-                    ))
-                
-                # Hoeveelheid Trend
-                tx_qty, ty_qty = bereken_lineaire_trend(lijn_data, 'DD-MM-YY', 'Hoeveelheid')
-                if tx_qty is not None:
-                    fig_qty.add_trace(go.Scatter(
-                        x=tx_qty, y=ty_qty, name=f"Trend {lijn_naam}",
-                        line=dict(color=c_trend_linear_qty, width=4, dash='longdash'),
-                        opacity=1, hoverinfo='skip'
-                    ))
-
-        if toon_gemiddelde:
-            fig_oee.add_hline(y=df_filtered['OEE'].mean(), line_color="green", line_dash="dash", annotation_text="Gem. OEE")
-            fig_qty.add_hline(y=df_filtered['Hoeveelheid'].mean(), line_color="green", line_dash="dash", annotation_text="Gem. H")
-
-        fig_oee.update_layout(title="OEE Percentage (%)", height=400, hovermode="x unified", legend=dict(orientation="h", y=1.1, x=1, xanchor="right"), yaxis=dict(range=[0, 105]))
-        fig_qty.update_layout(title="Hoeveelheid (G)", height=400, hovermode="x unified", legend=dict(orientation="h", y=1.1, x=1, xanchor="right"))
-
+        fig_oee, fig_qty = onthoud(maak_figuren_apart, df_filtered, geselecteerde_lijnen, modus, toon_week_gem, toon_linear, toon_gemiddelde, raster=True)
         st.plotly_chart(fig_oee, use_container_width=True, config=plot_config)
-        st.plotly_chart(fig_qty, use_container_width=True, config=plot_config)
\ No newline at end of file
+        st.plotly_chart(fig_qty, use_container_width=True, config=plot_config)
+
+toon_meting(meting)
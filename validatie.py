@@ -0,0 +1,193 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from data import LOGBOEK_VERSIES, detecteer_versie, lees_nieuwe_regels
+
+# Datakwaliteit van de logboeken en het werkboek. Elke regel is één gevectoriseerd
+# masker over het hele frame; er wordt nergens per rij in Python geloopt.
+
+FOUT = 'fout'
+WAARSCHUWING = 'waarschuwing'
+
+ONBEKENDE_NAMEN = ['?', '-', '', 'nan', 'None', 'onbekend']
+MAX_MINUTEN = 24 * 60
+
+GEPLANDE_STOPS = ['Stilstand Opstart', 'Stilstand Ombouw', 'Stilstand Schoonmaak']
+ONGEPLANDE_STOPS = ['Stilstand Monteur', 'Stilstand QC', 'Stilstand Product', 'Stilstand Divers']
+MINUTEN_KOLOMMEN = ['Totaal Diensttijd', 'Pauze', 'Geplande Tijd', 'Werkelijke Draaitijd'] + GEPLANDE_STOPS + ONGEPLANDE_STOPS
+
+PROBLEEM_KOLOMMEN = ['rij', 'regel', 'ernst', 'kolom', 'waarde']
+
+MELDINGEN = {
+    'negatieve_minuten': "Negatief aantal minuten",
+    'onmogelijke_minuten': "Meer minuten dan een etmaal",
+    'stilstand_groter_dan_gepland': "Ongeplande stilstand is groter dan de geplande productietijd",
+    'stilstand_groter_dan_dienst': "Pauze en geplande stilstand zijn groter dan de diensttijd",
+    'prestatie_boven_100': "Prestatie boven 100% (klopt de norm snelheid?)",
+    'oee_negatief': "Negatieve OEE",
+    'oee_boven_100': "OEE boven 100% (klopt de norm snelheid?)",
+    'goed_groter_dan_totaal': "Meer goede producten dan totaal geproduceerd",
+    'negatief_aantal': "Meer afkeur dan totaal geproduceerd",
+    'norm_snelheid_ontbreekt': "Norm snelheid ontbreekt",
+    'onbekende_bandleider': "Bandleider onbekend of niet ingevuld",
+    'product_nummer_als_getal': "Productnummer opgeslagen als getal",
+    'formulier_slecht_ingevuld': "Formulier slecht ingevuld volgens opmerking",
+    'dubbele_invoer': "Dubbele invoer voor dezelfde datum en machine",
+    'hoeveelheid_ontbreekt': "Hoeveelheid ontbreekt",
+    'bezetting_ontbreekt': "Aantal personen ontbreekt",
+    'schema_drift': "Kolommen wijken af van de logboekversie",
+}
+
+
+# ==========================================
+# HULPFUNCTIES
+# ==========================================
+def _bool(masker):
+    # Vergelijkingen op nullable kolommen geven NA; die tellen als "geen probleem"
+    if isinstance(masker, pd.Series):
+        return masker.fillna(False).to_numpy(dtype=bool)
+    return np.asarray(masker, dtype=bool)
+
+
+def _tekst_masker(reeks, functie):
+    # Bij een category alleen de (weinige) categorieën controleren en via de codes terugmappen
+    if isinstance(reeks.dtype, pd.CategoricalDtype):
+        per_categorie = _bool(functie(reeks.cat.categories.to_series().astype(str)))
+        codes = reeks.cat.codes.to_numpy()
+        return np.where(codes >= 0, per_categorie[codes], False)
+    return _bool(functie(reeks.astype(str)))
+
+
+def _onbekende_naam(reeks):
+    return _tekst_masker(reeks, lambda s: s.str.strip().isin(ONBEKENDE_NAMEN)) | reeks.isna().to_numpy()
+
+
+def _som(df, kolommen):
+    aanwezig = [c for c in kolommen if c in df.columns]
+    if not aanwezig:
+        return None
+    return df[aanwezig].fillna(0).sum(axis=1)
+
+
+def _naar_tabel(df, regels):
+    delen = []
+    for regel, ernst, kolom, masker in regels:
+        idx = np.flatnonzero(_bool(masker))
+        if len(idx):
+            delen.append(pd.DataFrame({
+                'rij': df.index[idx],
+                'regel': regel,
+                'ernst': ernst,
+                'kolom': kolom,
+                'waarde': df[kolom].iloc[idx].astype(str).to_numpy(),
+            }))
+    if not delen:
+        return pd.DataFrame(columns=PROBLEEM_KOLOMMEN)
+    return pd.concat(delen, ignore_index=True).sort_values(['rij', 'ernst'], kind='stable', ignore_index=True)
+
+
+def sleutels_logboek(df):
+    # (datum, machine) als één tekstsleutel voor de dubbele-invoer controle
+    return df['Datum'].dt.strftime('%Y-%m-%d') + '|' + df['Machine Nummer'].astype(str)
+
+
+# ==========================================
+# LOGBOEKEN (OEE.py / rodepet.py)
+# ==========================================
+def _regels_logboek(df, bekende_sleutels):
+    for col in MINUTEN_KOLOMMEN:
+        if col in df.columns:
+            yield 'negatieve_minuten', FOUT, col, df[col] < 0
+            yield 'onmogelijke_minuten', FOUT, col, df[col] > MAX_MINUTEN
+
+    ongepland = _som(df, ONGEPLANDE_STOPS)
+    if ongepland is not None and 'Geplande Tijd' in df.columns:
+        yield 'stilstand_groter_dan_gepland', FOUT, 'Geplande Tijd', ongepland > df['Geplande Tijd']
+
+    gepland = _som(df, GEPLANDE_STOPS)
+    if gepland is not None and {'Totaal Diensttijd', 'Pauze'} <= set(df.columns):
+        yield 'stilstand_groter_dan_dienst', FOUT, 'Totaal Diensttijd', gepland + df['Pauze'] > df['Totaal Diensttijd']
+
+    if 'Prestatie %' in df.columns:
+        yield 'prestatie_boven_100', WAARSCHUWING, 'Prestatie %', df['Prestatie %'] > 100
+    if 'OEE %' in df.columns:
+        # Boven 100 kan alleen via een prestatie boven 100 (korte order): net als die een waarschuwing
+        yield 'oee_negatief', FOUT, 'OEE %', df['OEE %'] < 0
+        yield 'oee_boven_100', WAARSCHUWING, 'OEE %', df['OEE %'] > 100
+    if {'Goede Producten', 'Totaal Geproduceerd'} <= set(df.columns):
+        yield 'goed_groter_dan_totaal', FOUT, 'Goede Producten', df['Goede Producten'] > df['Totaal Geproduceerd']
+        yield 'negatief_aantal', FOUT, 'Goede Producten', df['Goede Producten'] < 0
+    if 'Norm Snelheid' in df.columns:
+        yield 'norm_snelheid_ontbreekt', FOUT, 'Norm Snelheid', ~(df['Norm Snelheid'] > 0)
+
+    if 'Bandleider' in df.columns:
+        yield 'onbekende_bandleider', WAARSCHUWING, 'Bandleider', _onbekende_naam(df['Bandleider'])
+    if 'Product Nummer' in df.columns:
+        yield 'product_nummer_als_getal', WAARSCHUWING, 'Product Nummer', \
+            _tekst_masker(df['Product Nummer'], lambda s: s.str.fullmatch(r'\d+\.0'))
+    if 'Opmerking' in df.columns:
+        yield 'formulier_slecht_ingevuld', WAARSCHUWING, 'Opmerking', \
+            _tekst_masker(df['Opmerking'], lambda s: s.str.contains('slecht ingevuld', case=False))
+
+    if {'Datum', 'Machine Nummer'} <= set(df.columns):
+        sleutels = sleutels_logboek(df)
+        dubbel = sleutels.duplicated(keep=False)
+        if bekende_sleutels:
+            dubbel |= sleutels.isin(bekende_sleutels)
+        yield 'dubbele_invoer', WAARSCHUWING, 'Machine Nummer', dubbel
+
+
+def valideer_logboek(df, bekende_sleutels=None):
+    # bekende_sleutels: (datum|machine) van eerder gevalideerde rijen, voor incrementeel gebruik
+    return _naar_tabel(df, _regels_logboek(df, bekende_sleutels))
+
+
+def controleer_schema(kolommen, versie=None):
+    # Schema drift: ontbrekende kolommen zijn fouten, extra kolommen waarschuwingen
+    versie = versie if versie in LOGBOEK_VERSIES else detecteer_versie(kolommen)
+    verwacht = LOGBOEK_VERSIES[versie]
+    rijen = [(pd.NA, 'schema_drift', FOUT, c, f"ontbreekt t.o.v. {versie}") for c in verwacht if c not in kolommen]
+    rijen += [(pd.NA, 'schema_drift', WAARSCHUWING, c, f"onverwacht in {versie}") for c in kolommen if c not in verwacht]
+    return pd.DataFrame(rijen, columns=PROBLEEM_KOLOMMEN)
+
+
+def versie_uit_bestandsnaam(file_path):
+    gevonden = re.search(r'_(v\d+)', os.path.basename(file_path))
+    return gevonden.group(1) if gevonden else None
+
+
+def valideer_logboek_incrementeel(file_path, staat):
+    # Alleen de regels die sinds de vorige aanroep zijn toegevoegd worden gecontroleerd.
+    # staat is een dict (bijv. uit st.session_state) die tussen aanroepen bewaard blijft.
+    df_nieuw, volledig = lees_nieuwe_regels(file_path, staat)
+    if volledig:
+        staat['sleutels'] = set()
+        staat['problemen'] = controleer_schema(list(df_nieuw.columns), versie_uit_bestandsnaam(file_path))
+
+    nieuw = valideer_logboek(df_nieuw, staat['sleutels'])
+    if {'Datum', 'Machine Nummer'} <= set(df_nieuw.columns):
+        staat['sleutels'].update(sleutels_logboek(df_nieuw).dropna())
+    if not nieuw.empty:
+        staat['problemen'] = pd.concat([staat['problemen'], nieuw], ignore_index=True)
+    return staat['problemen']
+
+
+# ==========================================
+# WERKBOEK (Data Lijnen boven OEE)
+# ==========================================
+def _regels_werkboek(df):
+    yield 'oee_negatief', FOUT, 'OEE', df['OEE'] < 0
+    yield 'oee_boven_100', WAARSCHUWING, 'OEE', df['OEE'] > 100
+    if 'Hoeveelheid' in df.columns:
+        yield 'hoeveelheid_ontbreekt', WAARSCHUWING, 'Hoeveelheid', ~(df['Hoeveelheid'] > 0)
+    if 'Aantal personen' in df.columns:
+        yield 'bezetting_ontbreekt', WAARSCHUWING, 'Aantal personen', ~(df['Aantal personen'] > 0)
+    if 'Bandleidster' in df.columns:
+        yield 'onbekende_bandleider', WAARSCHUWING, 'Bandleidster', _onbekende_naam(df['Bandleidster'])
+    yield 'dubbele_invoer', WAARSCHUWING, 'Lijn', df.duplicated(['DD-MM-YY', 'Lijn'], keep=False)
+
+
+def valideer_werkboek(df):
+    return _naar_tabel(df, _regels_werkboek(df))
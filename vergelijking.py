@@ -0,0 +1,119 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Is het verschil in OEE tussen lijnen, bandleiders of bezettingen echt, of ruis?
+# Per groep een bootstrap betrouwbaarheidsinterval van het gemiddelde, en per groep
+# t.o.v. de referentie (de grootste groep) het verschil met interval en een
+# permutatietoets. Hersteekproeven zijn indexmatrices (B x n) in NumPy; de cellen
+# worden over worker-processen verdeeld.
+#
+#   vergelijk(df, 'Lijn')                              # lijnen onderling
+#   vergelijk(df, 'Aantal personen', binnen='Lijn')    # bezetting per lijn
+
+# --- CONFIGURATIE ---
+HERHALINGEN = 10_000
+ALFA = 0.05
+MIN_N = 5                    # kleinere groepen worden niet getoetst
+ZAAD = 20240601              # vaste seed: dezelfde selectie geeft dezelfde uitkomst
+MAX_ELEMENTEN = 5_000_000    # per blok (B x n) in het geheugen
+PARALLEL_VANAF = 12          # cellen; minder is in dit proces sneller dan een pool starten
+
+
+# ==========================================
+# HERSTEEKPROEVEN (GEVECTORISEERD)
+# ==========================================
+def _blokken(herhalingen, n):
+    stap = max(1, MAX_ELEMENTEN // max(n, 1))
+    return [min(stap, herhalingen - b) for b in range(0, herhalingen, stap)]
+
+
+def bootstrap_gemiddelden(waarden, herhalingen, rng):
+    # B gemiddelden van steekproeven met teruglegging: één indexmatrix per blok
+    n = len(waarden)
+    return np.concatenate([waarden[rng.integers(0, n, size=(b, n))].mean(axis=1) for b in _blokken(herhalingen, n)])
+
+
+def permutatie_p(a, b, herhalingen, rng):
+    # Tweezijdige p-waarde voor het verschil in gemiddelden (met +1 correctie)
+    samen = np.concatenate([a, b])
+    na, totaal = len(a), samen.sum()
+    waargenomen = abs(a.mean() - b.mean())
+    extremer = 0
+    for blok in _blokken(herhalingen, len(samen)):
+        geschud = rng.permuted(np.broadcast_to(samen, (blok, len(samen))), axis=1)
+        som_a = geschud[:, :na].sum(axis=1)
+        verschil = som_a / na - (totaal - som_a) / len(b)
+        extremer += int((np.abs(verschil) >= waargenomen - 1e-12).sum())
+    return (extremer + 1) / (herhalingen + 1)
+
+
+def _cel(taak):
+    # Eén groep t.o.v. de referentie; draait ook in een worker
+    waarden, referentie, herhalingen, zaad = taak
+    rng = np.random.default_rng(zaad)
+    gem = bootstrap_gemiddelden(waarden, herhalingen, rng)
+    uit = {'ci_onder': np.quantile(gem, ALFA / 2), 'ci_boven': np.quantile(gem, 1 - ALFA / 2)}
+    if referentie is not None:
+        verschil = gem - bootstrap_gemiddelden(referentie, herhalingen, rng)
+        uit.update(verschil=waarden.mean() - referentie.mean(),
+                   verschil_onder=np.quantile(verschil, ALFA / 2), verschil_boven=np.quantile(verschil, 1 - ALFA / 2),
+                   p_waarde=permutatie_p(waarden, referentie, herhalingen, rng))
+    return uit
+
+
+def _holm(p):
+    # Holm-Bonferroni: bij veel vergelijkingen tegelijk niet elke p < 0.05 geloven
+    p = np.asarray(p, dtype=float)
+    volgorde = np.argsort(p)
+    aangepast = np.minimum(1, np.maximum.accumulate(p[volgorde] * (len(p) - np.arange(len(p)))))
+    uit = np.empty_like(aangepast)
+    uit[volgorde] = aangepast
+    return uit
+
+
+# ==========================================
+# VERGELIJKEN
+# ==========================================
+def vergelijk(df, groep, binnen=None, waarde='OEE', herhalingen=HERHALINGEN, referentie=None, workers=None):
+    # Tabel per (binnen, groep): n, gemiddelde, interval, en t.o.v. de referentiegroep het
+    # verschil met interval, de p-waarde en de Holm-gecorrigeerde p-waarde per segment
+    data = df[[c for c in [binnen, groep, waarde] if c]].dropna()
+    segmenten = data.groupby(binnen, observed=True) if binnen else [(None, data)]
+
+    cellen, taken = [], []
+    zaden = np.random.SeedSequence(ZAAD)
+    for segment, deel in segmenten:
+        groepen = {naam: g[waarde].to_numpy('float64') for naam, g in deel.groupby(groep, observed=True)
+                   if len(g) >= MIN_N}
+        if not groepen:
+            continue
+        ref = referentie if referentie in groepen else max(groepen, key=lambda k: len(groepen[k]))
+        for naam, waarden in groepen.items():
+            cellen.append({'segment': segment, 'groep': naam, 'referentie': ref, 'n': len(waarden),
+                           'gemiddelde': waarden.mean()})
+            taken.append((waarden, None if naam == ref else groepen[ref], herhalingen, zaden.spawn(1)[0]))
+
+    if len(taken) >= PARALLEL_VANAF:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultaten = list(pool.map(_cel, taken))
+    else:
+        resultaten = [_cel(t) for t in taken]
+
+    kolommen = ['groep', 'n', 'gemiddelde', 'ci_onder', 'ci_boven', 'referentie', 'verschil', 'verschil_onder',
+                'verschil_boven', 'p_waarde', 'p_holm', 'significant']
+    if not cellen:
+        return pd.DataFrame(columns=([binnen] if binnen else []) + kolommen)
+    tabel = pd.DataFrame([{**c, **r} for c, r in zip(cellen, resultaten)])
+    for kolom in ['verschil', 'verschil_onder', 'verschil_boven', 'p_waarde']:
+        if kolom not in tabel:
+            tabel[kolom] = np.nan
+    tabel['p_holm'] = np.nan
+    for _, idx in tabel.groupby('segment', dropna=False).groups.items():
+        getoetst = tabel.loc[idx, 'p_waarde'].dropna()
+        if not getoetst.empty:
+            tabel.loc[getoetst.index, 'p_holm'] = _holm(getoetst)
+    tabel['significant'] = tabel['p_holm'] < ALFA
+    tabel = tabel.rename(columns={'segment': binnen}) if binnen else tabel.drop(columns='segment')
+    return tabel[([binnen] if binnen else []) + kolommen]
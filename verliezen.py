@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# Verliesboom per dienst in minuten: diensttijd -> pauze -> geplande stilstand per
+# soort -> ongeplande stilstand per soort -> snelheidsverlies -> kwaliteitsverlies ->
+# effectieve tijd (goede producten x normtijd). Alles met kolombewerkingen over de hele
+# selectie, zonder lus per rij, en op te tellen per lijn, week, maand of rollup.
+#
+#   stappen = ontleed(df)                   # per dienst, alleen diensten met tijden
+#   tabel = waterval(df, per='Lijn')        # minuten per stap per lijn (+ OEE, diensten)
+#
+# Alleen de logboeken (OEE.py, rodepet.py) hebben tijden; werkboekregels vallen weg.
+# v5 regels hebben geen geplande stilstand en beginnen bij de geplande tijd. Wat niet
+# in een soort past (bijv. 'overnemen' uit rodepet.py of een afrondingsverschil) komt
+# in 'Gepland overig' / 'Ongepland overig', zodat de stappen altijd sluiten:
+# effectieve tijd / geplande tijd = OEE.
+
+# --- CONFIGURATIE ---
+GEPLAND = ['Opstart', 'Ombouw', 'Schoonmaak']
+ONGEPLAND = ['Monteur', 'QC', 'Product', 'Divers']
+
+# (stap, soort); 'totaal' en 'subtotaal' zijn niveaus, de rest zijn verliezen
+STAPPEN = [
+    ('Diensttijd', 'totaal'),
+    ('Pauze', 'gepland'),
+    *[(c, 'gepland') for c in GEPLAND],
+    ('Gepland overig', 'gepland'),
+    ('Geplande tijd', 'subtotaal'),
+    *[(c, 'ongepland') for c in ONGEPLAND],
+    ('Ongepland overig', 'ongepland'),
+    ('Draaitijd', 'subtotaal'),
+    ('Snelheidsverlies', 'snelheid'),
+    ('Kwaliteitsverlies', 'kwaliteit'),
+    ('Effectieve tijd', 'subtotaal'),
+]
+SOORT = dict(STAPPEN)
+PERIODES = {'Week': 'W-SUN', 'Maand': 'M'}
+
+
+def _kolom(df, naam):
+    if naam not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return df[naam].astype('float64')
+
+
+# ==========================================
+# PER DIENST
+# ==========================================
+def ontleed(df):
+    # DataFrame met per stap de minuten, index = de diensten van df waarvoor het kan
+    # (draaitijd, een normsnelheid en een geplande of totale diensttijd bekend)
+    draai = _kolom(df, 'Werkelijke Draaitijd')
+    goed = _kolom(df, 'Hoeveelheid')
+    totaal = _kolom(df, 'Totaal Geproduceerd').fillna(goed + _kolom(df, 'Foute Producten').fillna(0))
+    # Normsnelheid (stuks/min); de oude dagtotalen hebben alleen de prestatie %
+    norm = _kolom(df, 'Norm Snelheid')
+    norm = norm.where(norm > 0, totaal / (draai * _kolom(df, 'Prestatie') / 100))
+
+    pauze = _kolom(df, 'Pauze').fillna(0)
+    gepland = {c: _kolom(df, f"Stilstand {c}").fillna(0) for c in GEPLAND}
+    ongepland = {c: _kolom(df, f"Stilstand {c}").fillna(0) for c in ONGEPLAND}
+    som_gepland = pauze + sum(gepland.values())
+
+    dienst = _kolom(df, 'Totaal Diensttijd')
+    geplande_tijd = _kolom(df, 'Geplande Tijd')
+    geplande_tijd = geplande_tijd.fillna(dienst - _kolom(df, 'Geplande Stilstand')).fillna(dienst - som_gepland)
+    dienst = dienst.fillna(geplande_tijd + som_gepland)
+
+    stappen = pd.DataFrame({
+        'Diensttijd': dienst,
+        'Pauze': pauze,
+        **gepland,
+        'Gepland overig': dienst - geplande_tijd - som_gepland,
+        'Geplande tijd': geplande_tijd,
+        **ongepland,
+        'Ongepland overig': geplande_tijd - draai - sum(ongepland.values()),
+        'Draaitijd': draai,
+        'Snelheidsverlies': draai - totaal / norm,
+        'Kwaliteitsverlies': (totaal - goed) / norm,
+        'Effectieve tijd': goed / norm,
+    }, index=df.index)
+    bruikbaar = (dienst > 0) & (draai >= 0) & np.isfinite(norm) & (norm > 0) & goed.notna()
+    return stappen[bruikbaar.to_numpy()]
+
+
+# ==========================================
+# OPTELLEN
+# ==========================================
+def _groepen(df, per):
+    if per in PERIODES:
+        return df['DD-MM-YY'].dt.to_period(PERIODES[per]).dt.start_time.rename(per)
+    return df[per].astype(str)
+
+
+def waterval(df, per=None):
+    # Minuten per stap opgeteld per groep ('Lijn', 'Week', 'Maand' of een kolom; None:
+    # de hele selectie als één groep 'Selectie'), met het aantal diensten en de OEE
+    # uit de opgetelde minuten (tijdgewogen, niet het gemiddelde van de dag-OEE's)
+    stappen = ontleed(df)
+    if stappen.empty:
+        return pd.DataFrame(columns=[s for s, _ in STAPPEN] + ['Diensten', 'OEE'])
+    if per is None:
+        tabel = stappen.sum().to_frame('Selectie').T
+        tabel['Diensten'] = len(stappen)
+    else:
+        groepen = stappen.groupby(_groepen(df.loc[stappen.index], per), observed=True, sort=True)
+        tabel = groepen.sum()
+        tabel['Diensten'] = groepen.size()
+    tabel['OEE'] = 100 * tabel['Effectieve tijd'] / tabel['Geplande tijd'].where(tabel['Geplande tijd'] > 0)
+    return tabel
+
+
+def percentages(tabel):
+    # Elke stap als % van de diensttijd van zijn groep
+    stappen = [s for s, _ in STAPPEN]
+    return tabel[stappen].div(tabel['Diensttijd'].where(tabel['Diensttijd'] > 0), axis=0) * 100
@@ -0,0 +1,151 @@
+import argparse
+import os
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from profiel import importeer
+from schijfcache import aanwezig, onthoud
+
+# Voorspelling van OEE en Hoeveelheid per lijn voor de komende weken, met
+# voorspelinterval. Per reeks (lijn x kenmerk) het gemiddelde per productiedag per
+# week, met exponential smoothing (ETS: gedempte trend, seizoen zodra er twee jaar
+# historie is). Alle reeksen worden in een procespool gefit; een reeks die sinds de
+# vorige keer niet veranderd is komt uit de gedeelde schijfcache, een verlengde
+# reeks start vanaf de parameters van de vorige fit.
+#
+#   df_voorspelling = voorspel(df, lijnen=['24', '25'], horizon=8)
+#   python voorspelling.py --horizon 8 --uit voorspelling.csv
+
+# --- CONFIGURATIE ---
+KENMERKEN = ['OEE', 'Hoeveelheid']
+HORIZON = 8                # weken
+BETROUWBAARHEID = 0.9      # breedte van het voorspelinterval
+MIN_WEKEN = 8              # korter: vlak gemiddelde met de spreiding als interval
+SEIZOEN_WEKEN = 52
+WEEK_FREQ = 'W-MON'        # weken beginnen op maandag, zoals de ISO week in het werkboek
+PARALLEL_VANAF = 8         # minder reeksen (die gefit moeten worden): in dit proces
+
+
+# ==========================================
+# REEKSEN
+# ==========================================
+def weekreeksen(df, sleutels=('Lijn',), kenmerken=KENMERKEN):
+    # {(sleutelwaarden, kenmerk): pd.Series per week}; weken zonder productie geïnterpoleerd
+    # Periode 'W-SUN' loopt van maandag t/m zondag; het label is de maandag
+    week = df['DD-MM-YY'].dt.to_period('W-SUN').dt.start_time
+    groepen = df.groupby([df[s].astype(str) for s in sleutels] + [week.rename('Week')], observed=True)[kenmerken].mean()
+    reeksen = {}
+    for sleutel, deel in groepen.groupby(level=list(range(len(sleutels))), observed=True):
+        deel = deel.droplevel(list(range(len(sleutels))))
+        deel = deel.asfreq(WEEK_FREQ) if len(deel) > 1 else deel
+        sleutel = sleutel if isinstance(sleutel, tuple) else (sleutel,)
+        for kenmerk in kenmerken:
+            reeks = deel[kenmerk].astype('float64').interpolate(limit_area='inside')
+            if reeks.notna().any():
+                reeksen[(sleutel, kenmerk)] = reeks.dropna()
+    return reeksen
+
+
+# ==========================================
+# FIT PER REEKS
+# ==========================================
+def _vlak(reeks, horizon):
+    # Te weinig weken voor een model: gemiddelde met de normale spreiding eromheen
+    z = NormalDist().inv_cdf(0.5 + BETROUWBAARHEID / 2)
+    sd = reeks.std() if len(reeks) > 1 else 0.0
+    return np.full(horizon, reeks.mean()), np.full(horizon, z * sd), None
+
+
+def fit_reeks(reeks, horizon=HORIZON, start_params=None):
+    # Geeft (voorspelling, halve intervalbreedte, parameters) terug
+    if len(reeks) < MIN_WEKEN:
+        return _vlak(reeks, horizon)
+    ets = importeer('statsmodels.tsa.exponential_smoothing.ets')
+    seizoen = 'add' if len(reeks) >= 2 * SEIZOEN_WEKEN else None
+    model = ets.ETSModel(reeks.reset_index(drop=True), error='add', trend='add', damped_trend=True,
+                         seasonal=seizoen, seasonal_periods=SEIZOEN_WEKEN if seizoen else None)
+    try:
+        # Warme start vanaf de vorige fit (zelfde modelvorm): minder iteraties bij een week extra data
+        fit = model.fit(disp=False, start_params=start_params) if start_params is not None and \
+            len(start_params) == len(model.param_names) else model.fit(disp=False)
+    except (ValueError, np.linalg.LinAlgError):
+        return _vlak(reeks, horizon)
+    voorspelling = fit.get_prediction(start=len(reeks), end=len(reeks) + horizon - 1).summary_frame(alpha=1 - BETROUWBAARHEID)
+    return voorspelling['mean'].to_numpy(), (voorspelling['pi_upper'] - voorspelling['mean']).to_numpy(), np.asarray(fit.params)
+
+
+# Sleutel = reeks + horizon + instellingen; de startparameters versnellen alleen de fit
+CACHE_NAAM = f"voorspelling:{BETROUWBAARHEID}:{MIN_WEKEN}:{SEIZOEN_WEKEN}"
+
+
+def _fit_taak(taak):
+    # Draait in een worker; het resultaat komt ook in de gedeelde schijfcache
+    reeks, horizon, start_params = taak
+    return onthoud(lambda r, h: fit_reeks(r, h, start_params), reeks, horizon, cache_naam=CACHE_NAAM)
+
+
+# ==========================================
+# ALLE REEKSEN
+# ==========================================
+def voorspel(df, lijnen=None, horizon=HORIZON, sleutels=('Lijn',), staat=None, workers=None):
+    # 'staat' (dict, optioneel) onthoudt per reeks de laatste parameters voor een warme start
+    if lijnen is not None:
+        df = df[df['Lijn'].astype(str).isin([str(l) for l in lijnen])]
+    staat = {} if staat is None else staat
+    reeksen = weekreeksen(df, sleutels)
+    taken = {naam: (reeks, horizon, staat.get(naam)) for naam, reeks in reeksen.items()}
+
+    # Alleen reeksen die niet in de cache staan hoeven gefit te worden
+    missers = [naam for naam, (reeks, h, _) in taken.items() if not aanwezig(fit_reeks, reeks, h, cache_naam=CACHE_NAAM)]
+    resultaten = {}
+    if len(missers) >= PARALLEL_VANAF:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultaten = dict(zip(missers, pool.map(_fit_taak, [taken[m] for m in missers])))
+    for naam, taak in taken.items():
+        if naam not in resultaten:
+            resultaten[naam] = _fit_taak(taak)
+
+    rijen = []
+    for (sleutel, kenmerk), (waarden, marge, params) in resultaten.items():
+        if params is not None:
+            staat[(sleutel, kenmerk)] = params
+        weken = pd.date_range(reeksen[(sleutel, kenmerk)].index[-1], periods=horizon + 1, freq=WEEK_FREQ)[1:]
+        deel = pd.DataFrame({'Week': weken, 'Kenmerk': kenmerk, 'Voorspelling': waarden,
+                             'Onder': waarden - marge, 'Boven': waarden + marge})
+        for s, w in zip(sleutels, sleutel):
+            deel[s] = w
+        rijen.append(deel)
+    if not rijen:
+        return pd.DataFrame(columns=list(sleutels) + ['Kenmerk', 'Week', 'Voorspelling', 'Onder', 'Boven'])
+    uit = pd.concat(rijen, ignore_index=True)[list(sleutels) + ['Kenmerk', 'Week', 'Voorspelling', 'Onder', 'Boven']]
+    # OEE kan niet buiten 0-100 en een hoeveelheid niet onder 0
+    uit[['Voorspelling', 'Onder', 'Boven']] = uit[['Voorspelling', 'Onder', 'Boven']].clip(lower=0)
+    is_oee = uit['Kenmerk'] == 'OEE'
+    uit.loc[is_oee, ['Voorspelling', 'Onder', 'Boven']] = uit.loc[is_oee, ['Voorspelling', 'Onder', 'Boven']].clip(upper=100)
+    return uit
+
+
+# ==========================================
+# COMMAND LINE (PLANNING)
+# ==========================================
+def main(argv=None):
+    from dataset import laad_dataset
+
+    parser = argparse.ArgumentParser(description="Weekvoorspelling van OEE en Hoeveelheid per lijn")
+    parser.add_argument('--horizon', type=int, default=HORIZON, help="Aantal weken vooruit (standaard 8)")
+    parser.add_argument('--lijnen', nargs='*', default=None)
+    parser.add_argument('--per-product', action='store_true', help="Per lijn en product in plaats van per lijn")
+    parser.add_argument('--uit', default='voorspelling.csv')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    sleutels = ('Lijn', 'Product') if args.per_product else ('Lijn',)
+    df = voorspel(laad_dataset(), args.lijnen, args.horizon, sleutels, workers=args.workers)
+    df.to_csv(args.uit, sep=';', index=False, decimal=',')
+    print(f"{df.groupby(list(sleutels) + ['Kenmerk']).ngroups} reeksen voorspeld -> {os.path.abspath(args.uit)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+import io
+import json
+import os
+import pickle
+from datetime import date, datetime, time
+
+import pandas as pd
+from data import (LOGBOEK_TEKST_KOLOMMEN, SCHEMA_LOGBOEK, als_tekst, lees_nieuwe_regels, lees_opnieuw_vanaf, pas_schema_toe,
+                  voeg_regels_toe, wijzig_regels)
+from schijfcache import bestandsslot
+
+# Wijzigingslog voor de logboeken (Beheer in OEE.py, Data Beheren in rodepet.py). Elke
+# wijziging komt als regel in een log dat alleen groeit: per veld oud -> nieuw, met
+# auteur en tijd; een verwijderde of ingevoegde regel in zijn geheel. Om de zoveel
+# stappen een momentopname van het logboek, zodat 'het logboek op datum X' de laatste
+# momentopname daarvóór is plus de stappen erna (niet de hele historie).
+#
+#   wijzig(pad, {12: {'OEE %': 61.5}}, auteur='Shirley')   # in plaats van data.wijzig_regels
+#   maak_ongedaan(pad, auteur='Shirley')                   # de laatste Beheer-wijziging terug
+#   op_datum(pad, '2025-11-01')                            # zoals het logboek toen was
+#   geschiedenis(pad)                                      # alle wijzigingen per veld
+#
+# Bestanden in '<logboek>.historie/': log.jsonl, momentopnames (Parquet) en de leesstand.
+# Nieuwe regels van de invoerschermen worden als 'invoer' vastgelegd (volg_invoer),
+# een buiten het log om herschreven logboek krijgt een nieuwe momentopname.
+
+# --- CONFIGURATIE ---
+MOMENTOPNAME_ELKE = 500   # stappen in het log tussen twee momentopnames
+
+
+# ==========================================
+# OPSLAG
+# ==========================================
+def _map(pad):
+    return pad + '.historie'
+
+
+def _nu():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _lees_staat(m):
+    try:
+        with open(os.path.join(m, 'staat.pkl'), 'rb') as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _schrijf_staat(m, staat):
+    tmp = os.path.join(m, 'staat.pkl.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump(staat, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, os.path.join(m, 'staat.pkl'))
+
+
+def _momentopnames(m):
+    try:
+        with open(os.path.join(m, 'momentopnames.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _maak_momentopname(m, staat, df, reden):
+    naam = f"momentopname_{staat['nr']:08d}.parquet"
+    df.to_parquet(os.path.join(m, naam + '.tmp'), index=False)
+    os.replace(os.path.join(m, naam + '.tmp'), os.path.join(m, naam))
+    log = os.path.join(m, 'log.jsonl')
+    index = _momentopnames(m) + [{'nr': staat['nr'], 'tijd': _nu(), 'reden': reden, 'bestand': naam,
+                                  'log_offset': os.path.getsize(log) if os.path.exists(log) else 0}]
+    with open(os.path.join(m, 'momentopnames.json.tmp'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=1)
+    os.replace(os.path.join(m, 'momentopnames.json.tmp'), os.path.join(m, 'momentopnames.json'))
+    staat['sinds_momentopname'] = 0
+
+
+def _schrijf_log(m, staat, stappen, groep, auteur, bron, **extra):
+    if not stappen:
+        return
+    tijd = _nu()
+    with open(os.path.join(m, 'log.jsonl'), 'a', encoding='utf-8') as f:
+        for stap in stappen:
+            staat['nr'] += 1
+            regel = {'nr': staat['nr'], 'groep': groep, 'tijd': tijd, 'auteur': auteur, 'bron': bron, **extra, **stap}
+            f.write(json.dumps(regel, ensure_ascii=False) + '\n')
+    staat['sinds_momentopname'] += len(stappen)
+
+
+def _lees_log(m, offset=0):
+    try:
+        with open(os.path.join(m, 'log.jsonl'), encoding='utf-8') as f:
+            f.seek(offset)
+            for regel in f:
+                yield json.loads(regel)
+    except FileNotFoundError:
+        return
+
+
+# ==========================================
+# BIJHOUDEN
+# ==========================================
+def _open(pad):
+    # Staat van het log; de eerste keer een momentopname van het logboek als basis
+    m = _map(pad)
+    os.makedirs(m, exist_ok=True)
+    staat = _lees_staat(m)
+    if staat is None:
+        staat = {'lees': {}, 'nr': 0, 'groep': 0, 'sinds_momentopname': 0}
+        df, _ = lees_nieuwe_regels(pad, staat['lees'], tekst=True)
+        _maak_momentopname(m, staat, df, 'begin')
+    return m, staat
+
+
+def _volg(pad, m, staat, auteur, bron):
+    # Regels die achteraan zijn bijgekomen sinds de vorige stap in het log
+    nieuw, volledig = lees_nieuwe_regels(pad, staat['lees'], tekst=True)
+    if volledig:
+        # Buiten het log om herschreven: niet na te gaan wat er veranderd is, dus een nieuwe basis
+        _maak_momentopname(m, staat, nieuw, 'herschreven')
+    elif not nieuw.empty:
+        staat['groep'] += 1
+        _schrijf_log(m, staat, _invoegingen(nieuw), staat['groep'], auteur, bron)
+
+
+def _invoegingen(nieuw):
+    return [{'soort': 'invoeg', 'rij': int(rij), 'regel': regel} for rij, regel in nieuw.to_dict('index').items()]
+
+
+def _label(regel):
+    machine = regel.get('Machine Nummer', regel.get('Machine', ''))
+    return f"{regel.get('Datum', '')} {machine}".strip()
+
+
+def _stappen(oud, wijzigingen, verwijderd, ingevoegd):
+    # Wat wijzig_regels gedaan heeft als stappen die na elkaar afgespeeld kunnen worden:
+    # eerst de velden, dan verwijderen van achteren naar voren, dan invoegen van voren naar achteren
+    na, stappen = oud.copy(), []
+    for rij in sorted(wijzigingen):
+        if rij not in na.index:
+            continue
+        velden = {}
+        for kolom, waarde in wijzigingen[rij].items():
+            if kolom in na.columns and als_tekst(waarde) != na.at[rij, kolom]:
+                velden[kolom] = [na.at[rij, kolom], als_tekst(waarde)]
+                na.at[rij, kolom] = als_tekst(waarde)
+        if velden:
+            stappen.append({'soort': 'wijzig', 'rij': int(rij), 'label': _label(na.loc[rij]), 'velden': velden})
+    for rij in sorted(set(verwijderd), reverse=True):
+        if rij in na.index:
+            stappen.append({'soort': 'verwijder', 'rij': int(rij), 'regel': na.loc[rij].to_dict()})
+    for rij in sorted(ingevoegd or {}):
+        stappen.append({'soort': 'invoeg', 'rij': int(rij),
+                        'regel': {k: als_tekst(ingevoegd[rij].get(k)) for k in oud.columns}})
+    return stappen
+
+
+def _pas_toe(pad, staat, wijzigingen, verwijderd, ingevoegd):
+    oud = wijzig_regels(pad, wijzigingen, verwijderd, leesstaat=staat['lees'], ingevoegd=ingevoegd)
+    if oud is None:
+        return []
+    # De leesstand wijst nu naar de eerste gewijzigde regel: de herschreven staart overslaan
+    lees_nieuwe_regels(pad, staat['lees'], tekst=True)
+    return _stappen(oud, wijzigingen, verwijderd, ingevoegd)
+
+
+def _uitvoeren(pad, auteur, bron, stappen_lijst, toegevoegd=(), leesstaat=None, **extra):
+    # stappen_lijst: [(wijzigingen, verwijderd, ingevoegd), ...], na elkaar als één groep.
+    # 'leesstaat' van een lezer (bijv. tabellen.logboek) die bij was, leest daarna alleen
+    # de regels vanaf de eerste wijziging opnieuw
+    with bestandsslot(_map(pad) + '.lock'):
+        lezer_bij = leesstaat is not None and leesstaat.get('offset') == os.path.getsize(pad)
+        m, staat = _open(pad)
+        _volg(pad, m, staat, 'invoer', 'invoer')
+        staat['groep'] += 1
+        groep, alle = staat['groep'], []
+        for wijzigingen, verwijderd, ingevoegd in stappen_lijst:
+            alle += _pas_toe(pad, staat, wijzigingen, verwijderd, ingevoegd)
+        if toegevoegd:
+            voeg_regels_toe(pad, pd.DataFrame(list(toegevoegd)))
+            nieuw, volledig = lees_nieuwe_regels(pad, staat['lees'], tekst=True)
+            if volledig:
+                # Nieuwe kolommen: voeg_regels_toe heeft het hele bestand herschreven
+                _maak_momentopname(m, staat, nieuw, 'herschreven')
+            else:
+                alle += _invoegingen(nieuw)
+        _schrijf_log(m, staat, alle, groep, auteur, bron, **extra)
+        if staat['sinds_momentopname'] >= MOMENTOPNAME_ELKE:
+            df, _ = lees_nieuwe_regels(pad, {}, tekst=True)
+            _maak_momentopname(m, staat, df, 'periodiek')
+        _schrijf_staat(m, staat)
+
+        if lezer_bij and alle:
+            leesstaat.update(staat['lees'])
+            lees_opnieuw_vanaf(pad, leesstaat, min(stap['rij'] for stap in alle))
+        elif leesstaat is not None and not lezer_bij:
+            leesstaat.clear()
+    return groep if alle else None
+
+
+# ==========================================
+# WIJZIGEN, ONGEDAAN MAKEN
+# ==========================================
+def wijzig(pad, wijzigingen=None, verwijderd=(), toegevoegd=(), auteur=None, leesstaat=None):
+    # Zelfde als data.wijzig_regels (+ voeg_regels_toe voor 'toegevoegd'), met een regel in het
+    # log per gewijzigd veld / verwijderde / nieuwe regel. Geeft het groepnummer (of None)
+    return _uitvoeren(pad, auteur or 'onbekend', 'beheer', [(wijzigingen or {}, verwijderd, None)],
+                      toegevoegd=toegevoegd, leesstaat=leesstaat)
+
+
+def volg_invoer(pad, auteur='invoer'):
+    # Na het opslaan in een invoerscherm: de nieuwe regels met de juiste tijd in het log
+    with bestandsslot(_map(pad) + '.lock'):
+        m, staat = _open(pad)
+        _volg(pad, m, staat, auteur, 'invoer')
+        _schrijf_staat(m, staat)
+
+
+def _laatste_groep(m):
+    # Laatste Beheer-groep die nog niet ongedaan is gemaakt
+    groepen, ongedaan = {}, set()
+    for stap in _lees_log(m):
+        if stap['bron'] == 'beheer':
+            groepen.setdefault(stap['groep'], []).append(stap)
+        elif stap['bron'] == 'ongedaan':
+            ongedaan.add(stap['ongedaan_van'])
+    over = [g for g in groepen if g not in ongedaan]
+    return (over[-1], groepen[over[-1]]) if over else (None, [])
+
+
+def maak_ongedaan(pad, auteur=None, leesstaat=None):
+    # De laatste Beheer-wijziging terugdraaien, zelf weer als groep in het log.
+    # Geeft het nummer van de teruggedraaide groep (of None)
+    m = _map(pad)
+    groep, stappen = _laatste_groep(m)
+    if groep is None:
+        return None
+    # Omgekeerde volgorde: eerst nieuwe regels weg en verwijderde terug, dan de oude veldwaarden
+    weg = [s['rij'] for s in stappen if s['soort'] == 'invoeg']
+    terug = {s['rij']: s['regel'] for s in stappen if s['soort'] == 'verwijder'}
+    oude = {s['rij']: {k: v[0] for k, v in s['velden'].items()} for s in stappen if s['soort'] == 'wijzig'}
+    _uitvoeren(pad, auteur or 'onbekend', 'ongedaan', [({}, weg, terug), (oude, (), None)],
+               leesstaat=leesstaat, ongedaan_van=groep)
+    return groep
+
+
+# ==========================================
+# TERUGKIJKEN
+# ==========================================
+def _tijd(tijd):
+    # Een datum zonder tijd: het einde van die dag
+    if isinstance(tijd, str):
+        tijd = datetime.fromisoformat(tijd) if 'T' in tijd or ' ' in tijd else date.fromisoformat(tijd)
+    if not isinstance(tijd, datetime):
+        tijd = datetime.combine(tijd, time.max)
+    return tijd.isoformat(timespec='seconds')
+
+
+def _speel_af(rijen, stap):
+    if stap['soort'] == 'wijzig':
+        rijen[stap['rij']].update({k: v[1] for k, v in stap['velden'].items()})
+    elif stap['soort'] == 'verwijder':
+        del rijen[stap['rij']]
+    else:
+        rijen.insert(stap['rij'], stap['regel'])
+
+
+def op_datum(pad, tijd, tekst=False):
+    # Het logboek zoals het was op 'tijd': de laatste momentopname daarvóór plus de stappen
+    # erna tot 'tijd'. Zelfde types als data.laad_logboek, of de velden als tekst
+    m, tot = _map(pad), _tijd(tijd)
+    momentopnames = [s for s in _momentopnames(m) if s['tijd'] <= tot]
+    if not momentopnames:
+        raise ValueError(f"Geen historie van vóór {tot[:10]}: het wijzigingslog begint later")
+    basis = momentopnames[-1]
+    df = pd.read_parquet(os.path.join(m, basis['bestand']))
+    kolommen, rijen = list(df.columns), df.to_dict('records')
+    for stap in _lees_log(m, basis['log_offset']):
+        if stap['tijd'] > tot:
+            break
+        _speel_af(rijen, stap)
+    df = pd.DataFrame(rijen, columns=kolommen)
+    if tekst:
+        return df
+    df = pd.read_csv(io.StringIO(df.to_csv(sep=';', index=False)), sep=';', dtype=LOGBOEK_TEKST_KOLOMMEN)
+    return pas_schema_toe(df, SCHEMA_LOGBOEK)
+
+
+def geschiedenis(pad):
+    # Eén rij per gewijzigd veld (of per verwijderde / nieuwe regel), oudste eerst
+    rijen = []
+    for stap in _lees_log(_map(pad)):
+        basis = {'Tijd': stap['tijd'], 'Auteur': stap['auteur'], 'Bron': stap['bron'], 'Groep': stap['groep'],
+                 'Soort': stap['soort'], 'Rij': stap['rij']}
+        if stap['soort'] == 'wijzig':
+            rijen += [{**basis, 'Regel': stap['label'], 'Kolom': k, 'Oud': oud, 'Nieuw': nieuw}
+                      for k, (oud, nieuw) in stap['velden'].items()]
+        else:
+            rijen.append({**basis, 'Regel': _label(stap['regel'])})
+    return pd.DataFrame(rijen, columns=['Tijd', 'Auteur', 'Bron', 'Groep', 'Soort', 'Rij', 'Regel', 'Kolom', 'Oud', 'Nieuw'])